@@ -53,6 +53,7 @@ public:
 private:
     Coax &_coax;
     Indicators &_indicators;
+    uint16_t _messageId;
 
     void handleReset(uint8_t *buffer, size_t bufferCount);
     void handleTransmitReceive(uint8_t *buffer, size_t bufferCount);
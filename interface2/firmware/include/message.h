@@ -19,7 +19,6 @@
 
 enum MessageReceiverError {
     MESSAGE_RECEIVER_ERROR_DATA_OVERFLOW,
-    MESSAGE_RECEIVER_ERROR_MESSAGE_OVERFLOW,
     MESSAGE_RECEIVER_ERROR_TIMEOUT
 };
 
@@ -28,8 +27,7 @@ enum MessageReceiverState {
     MESSAGE_RECEIVER_STATE_DATA,
     MESSAGE_RECEIVER_STATE_ESCAPE,
     MESSAGE_RECEIVER_STATE_AVAILABLE,
-    MESSAGE_RECEIVER_STATE_DATA_OVERFLOW,
-    MESSAGE_RECEIVER_STATE_MESSAGE_OVERFLOW
+    MESSAGE_RECEIVER_STATE_DATA_OVERFLOW
 };
 
 class MessageReceiver
@@ -37,9 +35,10 @@ class MessageReceiver
 public:
     MessageReceiver(volatile uint8_t *buffer, size_t bufferSize,
             void (*messageCallback)(const uint8_t *, size_t),
-            void (*errorCallback)(MessageReceiverError));
+            void (*errorCallback)(MessageReceiverError),
+            void (*resumeCallback)());
 
-    void load(const uint8_t *buffer, size_t bufferCount);
+    bool load(const uint8_t *buffer, size_t bufferCount);
     bool dispatch();
 
 private:
@@ -49,12 +48,15 @@ private:
     size_t _bufferSize;
     volatile size_t _bufferCount;
     volatile MessageReceiverState _state;
+    const uint8_t *_pendingBuffer;
+    volatile size_t _pendingCount;
     void (*_messageCallback)(const uint8_t *, size_t);
     void (*_errorCallback)(MessageReceiverError);
+    void (*_resumeCallback)();
 };
 
 class MessageSender
 {
 public:
-    static bool send(const uint8_t *buffer, size_t bufferCount);
+    static bool send(const uint8_t *buffer, size_t bufferCount, uint16_t id = 0);
 };
@@ -24,6 +24,8 @@
 
 /* USER CODE BEGIN INCLUDE */
 
+#include <stdbool.h>
+
 /* USER CODE END INCLUDE */
 
 /* Private typedef -----------------------------------------------------------*/
@@ -51,7 +53,7 @@
 
 /* USER CODE BEGIN PRIVATE_TYPES */
 
-extern void handleMessageData(const uint8_t *buffer, size_t bufferCount);
+extern bool handleMessageData(const uint8_t *buffer, size_t bufferCount);
 
 /* USER CODE END PRIVATE_TYPES */
 
@@ -264,9 +266,11 @@ static int8_t CDC_Control_FS(uint8_t cmd, uint8_t* pbuf, uint16_t length)
 static int8_t CDC_Receive_FS(uint8_t* Buf, uint32_t *Len)
 {
   /* USER CODE BEGIN 6 */
-  handleMessageData(Buf, *Len);
-
-  USBD_CDC_ReceivePacket(&hUsbDeviceFS);
+  // The next packet is not received until all data has been loaded, this
+  // allows the host to send messages while a message is being processed.
+  if (handleMessageData(Buf, *Len)) {
+    USBD_CDC_ReceivePacket(&hUsbDeviceFS);
+  }
 
   return (USBD_OK);
   /* USER CODE END 6 */
@@ -323,6 +327,11 @@ static int8_t CDC_TransmitCplt_FS(uint8_t *Buf, uint32_t *Len, uint8_t epnum)
 
 /* USER CODE BEGIN PRIVATE_FUNCTIONS_IMPLEMENTATION */
 
+void resumeMessageData()
+{
+  USBD_CDC_ReceivePacket(&hUsbDeviceFS);
+}
+
 /* USER CODE END PRIVATE_FUNCTIONS_IMPLEMENTATION */
 
 /**
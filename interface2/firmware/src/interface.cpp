@@ -28,7 +28,7 @@
 
 #include "interface.h"
 
-void sendErrorMessage(uint8_t code, const char *description)
+void sendErrorMessage(uint16_t id, uint8_t code, const char *description)
 {
     uint8_t message[2 + 62 + 1] = { 0x02, code };
     size_t count = 2;
@@ -39,13 +39,15 @@ void sendErrorMessage(uint8_t code, const char *description)
         count += strlen(description);
     }
 
-    MessageSender::send(message, count);
+    MessageSender::send(message, count, id);
 }
 
 Interface::Interface(Coax &coax, Indicators &indicators) :
     _coax(coax),
     _indicators(indicators)
 {
+    _messageId = 0;
+
     _coax.setTXProtocol(CoaxProtocol::_3270);
     _coax.setRXProtocol(CoaxProtocol::_3270);
     _coax.setParity(CoaxParity::Even);
@@ -53,20 +55,26 @@ Interface::Interface(Coax &coax, Indicators &indicators) :
 
 void Interface::handleMessage(uint8_t *buffer, size_t bufferCount)
 {
+    _messageId = 0;
+
     if (bufferCount < 4) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_MESSAGE_BUFFER_COUNT_4");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_MESSAGE_BUFFER_COUNT_4");
         return;
     }
 
+    // The message identifier in the footer is returned in the response footer,
+    // allowing the host to match responses to messages.
+    _messageId = (buffer[bufferCount - 2] << 8) | buffer[bufferCount - 1];
+
     size_t count = (buffer[0] << 8) | buffer[1];
 
     if (bufferCount - 4 != count) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_MESSAGE_BUFFER_COUNT_MISMATCH");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_MESSAGE_BUFFER_COUNT_MISMATCH");
         return;
     }
 
     if (count < 1) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_COMMAND_BUFFER_COUNT_1");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_COMMAND_BUFFER_COUNT_1");
         return;
     }
 
@@ -85,14 +93,15 @@ void Interface::handleMessage(uint8_t *buffer, size_t bufferCount)
     } else if (command == COMMAND_DFU) {
         handleDFU(buffer + 3, count - 1);
     } else {
-        sendErrorMessage(ERROR_UNKNOWN_COMMAND, NULL);
+        sendErrorMessage(_messageId, ERROR_UNKNOWN_COMMAND, NULL);
     }
 }
 
 void Interface::handleError(MessageReceiverError error)
 {
     if (error == MESSAGE_RECEIVER_ERROR_TIMEOUT) {
-        sendErrorMessage(ERROR_MESSAGE_TIMEOUT, NULL);
+        // The error is not related to a complete message.
+        sendErrorMessage(0, ERROR_MESSAGE_TIMEOUT, NULL);
     } else {
         Debug::trap(401, "error = %d", error);
     }
@@ -104,13 +113,13 @@ void Interface::handleReset(uint8_t *buffer, size_t bufferCount)
 
     uint8_t response[] = { 0x01, 0x32, 0x70 };
 
-    MessageSender::send(response, 3);
+    MessageSender::send(response, 3, _messageId);
 }
 
 void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
 {
     if (bufferCount < 6) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_TXRX_BUFFER_COUNT_6");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_TXRX_BUFFER_COUNT_6");
         return;
     }
 
@@ -124,7 +133,7 @@ void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
     uint16_t receiveTimeout = (buffer[bufferCount - 2] << 8) | buffer[bufferCount - 1];
 
     if (transmitBufferCount < 1) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_TXRX_TX_BUFFER_COUNT_1");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_TXRX_TX_BUFFER_COUNT_1");
         return;
     }
 
@@ -161,9 +170,9 @@ void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
 
         // Convert the error to legacy interface error for compatability.
         if (transmitCount == COAX_ERROR_TX_RECEIVER_ACTIVE) {
-            sendErrorMessage(101, NULL);
+            sendErrorMessage(_messageId, 101, NULL);
         } else {
-            sendErrorMessage(105, NULL);
+            sendErrorMessage(_messageId, 105, NULL);
         }
 
         return;
@@ -182,13 +191,13 @@ void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
 
         // Convert the error to legacy interface error for compatability.
         if (receiveCount == COAX_ERROR_RX_LOSS_OF_MID_BIT_TRANSITION) {
-            sendErrorMessage(104, "Loss of mid bit transition");
+            sendErrorMessage(_messageId, 104, "Loss of mid bit transition");
         } else if (receiveCount == COAX_ERROR_RX_PARITY) {
-            sendErrorMessage(104, "Parity error");
+            sendErrorMessage(_messageId, 104, "Parity error");
         } else if (receiveCount == COAX_ERROR_RX_INVALID_END_SEQUENCE) {
-            sendErrorMessage(104, "Invalid end sequence");
+            sendErrorMessage(_messageId, 104, "Invalid end sequence");
         } else {
-            sendErrorMessage(104, NULL);
+            sendErrorMessage(_messageId, 104, NULL);
         }
 
         return;
@@ -196,7 +205,7 @@ void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
 
     // Convert timeout to legacy interface error for compatability.
     if (receiveCount == 0) {
-        sendErrorMessage(102, NULL);
+        sendErrorMessage(_messageId, 102, NULL);
         return;
     }
 
@@ -205,13 +214,13 @@ void Interface::handleTransmitReceive(uint8_t *buffer, size_t bufferCount)
     // Send the response message.
     buffer[1] = 0x01;
 
-    MessageSender::send(buffer + 1, 1 + (receiveCount * 2));
+    MessageSender::send(buffer + 1, 1 + (receiveCount * 2), _messageId);
 }
 
 void Interface::handleInfo(uint8_t *buffer, size_t bufferCount)
 {
     if (bufferCount < 1) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_INFO_BUFFER_COUNT_1");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_INFO_BUFFER_COUNT_1");
         return;
     }
 
@@ -225,13 +234,13 @@ void Interface::handleInfo(uint8_t *buffer, size_t bufferCount)
         buffer[4] = INFO_MESSAGE_BUFFER_SIZE;
         buffer[5] = INFO_FEATURES;
 
-        MessageSender::send(buffer, 6);
+        MessageSender::send(buffer, 6, _messageId);
     } else if (query == INFO_HARDWARE_TYPE) {
         buffer[0] = 0x01;
 
         int length = snprintf(reinterpret_cast<char *>(buffer + 1), 64, "interface2");
 
-        MessageSender::send(buffer, length + 1);
+        MessageSender::send(buffer, length + 1, _messageId);
     } else if (query == INFO_FIRMWARE_VERSION) {
         buffer[0] = 0x01;
 
@@ -239,7 +248,7 @@ void Interface::handleInfo(uint8_t *buffer, size_t bufferCount)
                 "%d.%d.%d (build %s)", VERSION_MAJOR, VERSION_MINOR, VERSION_PATCH,
                 FIRMWARE_BUILD_WHAT);
 
-        MessageSender::send(buffer, length + 1);
+        MessageSender::send(buffer, length + 1, _messageId);
     } else if (query == INFO_MESSAGE_BUFFER_SIZE) {
         buffer[0] = 0x01;
 
@@ -247,14 +256,14 @@ void Interface::handleInfo(uint8_t *buffer, size_t bufferCount)
 
         memcpy(buffer + 1, &size, sizeof(uint32_t));
 
-        MessageSender::send(buffer, 5);
+        MessageSender::send(buffer, 5, _messageId);
     } else if (query == INFO_FEATURES) {
         buffer[0] = 0x01;
         buffer[1] = FEATURE_PROTOCOL_3299;
 
-        MessageSender::send(buffer, 2);
+        MessageSender::send(buffer, 2, _messageId);
     } else {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_INFO_UNKNOWN_QUERY");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_INFO_UNKNOWN_QUERY");
         return;
     }
 }
@@ -262,7 +271,7 @@ void Interface::handleInfo(uint8_t *buffer, size_t bufferCount)
 void Interface::handleTest(uint8_t *buffer, size_t bufferCount)
 {
     if (bufferCount < 1) {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_TEST_BUFFER_COUNT_1");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_TEST_BUFFER_COUNT_1");
         return;
     }
 
@@ -272,9 +281,9 @@ void Interface::handleTest(uint8_t *buffer, size_t bufferCount)
         buffer[0] = 0x01;
         buffer[1] = TEST_SUPPORTED_TESTS;
 
-        MessageSender::send(buffer, 2);
+        MessageSender::send(buffer, 2, _messageId);
     } else {
-        sendErrorMessage(ERROR_INVALID_MESSAGE, "HANDLE_TEST_UNKNOWN_TEST");
+        sendErrorMessage(_messageId, ERROR_INVALID_MESSAGE, "HANDLE_TEST_UNKNOWN_TEST");
         return;
     }
 }
@@ -285,7 +294,7 @@ void Interface::handleDFU(uint8_t *buffer, size_t bufferCount)
 {
     buffer[0] = 0x01;
 
-    MessageSender::send(buffer, 1);
+    MessageSender::send(buffer, 1, _messageId);
 
     // Wait before resetting to allow the response to be sent.
     HAL_Delay(1000);
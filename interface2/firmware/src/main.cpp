@@ -31,6 +31,8 @@
 void handleMessage(const uint8_t *, size_t);
 void handleMessageReceiverError(MessageReceiverError);
 
+extern "C" void resumeMessageData();
+
 extern "C" void SystemClock_Config();
 
 Indicators indicators;
@@ -50,7 +52,7 @@ Coax coax(spiCoaxTransceiver, coaxBuffer, COAX_BUFFER_SIZE);
 volatile uint8_t messageBuffer[MESSAGE_BUFFER_SIZE];
 
 MessageReceiver messageReceiver(messageBuffer, MESSAGE_BUFFER_SIZE, handleMessage,
-        handleMessageReceiverError);
+        handleMessageReceiverError, resumeMessageData);
 
 Interface interface(coax, indicators);
 
@@ -116,9 +118,9 @@ int main(void)
     }
 }
 
-extern "C" void handleMessageData(const uint8_t *buffer, size_t bufferCount)
+extern "C" bool handleMessageData(const uint8_t *buffer, size_t bufferCount)
 {
-    messageReceiver.load(buffer, bufferCount);
+    return messageReceiver.load(buffer, bufferCount);
 }
 
 void handleMessage(const uint8_t *buffer, size_t bufferCount)
@@ -27,24 +27,40 @@
 
 MessageReceiver::MessageReceiver(volatile uint8_t *buffer, size_t bufferSize,
         void (*messageCallback)(const uint8_t *, size_t),
-        void (*errorCallback)(MessageReceiverError)) :
+        void (*errorCallback)(MessageReceiverError),
+        void (*resumeCallback)()) :
     _buffer(buffer),
     _bufferSize(bufferSize),
     _messageCallback(messageCallback),
-    _errorCallback(errorCallback)
+    _errorCallback(errorCallback),
+    _resumeCallback(resumeCallback)
 {
     _timeout = 1000;
     _lastReceiveTime = -1;
 
     _bufferCount = 0;
     _state = MESSAGE_RECEIVER_STATE_WAIT_START;
+
+    _pendingBuffer = NULL;
+    _pendingCount = 0;
 }
 
-void MessageReceiver::load(const uint8_t *buffer, size_t bufferCount)
+// Returns false if loading was paused because a message is available, the
+// remaining data is held and loaded once the message has been dispatched. The
+// caller should not provide more data until resumed, this applies back pressure
+// to the host allowing it to send messages without waiting for each response.
+bool MessageReceiver::load(const uint8_t *buffer, size_t bufferCount)
 {
     _lastReceiveTime = HAL_GetTick();
 
     for (size_t index = 0; index < bufferCount; index++) {
+        if (_state == MESSAGE_RECEIVER_STATE_AVAILABLE) {
+            _pendingBuffer = buffer + index;
+            _pendingCount = bufferCount - index;
+
+            return false;
+        }
+
         uint8_t byte = buffer[index];
 
         if (_state == MESSAGE_RECEIVER_STATE_WAIT_START) {
@@ -86,22 +102,18 @@ void MessageReceiver::load(const uint8_t *buffer, size_t bufferCount)
             } else {
                 _state = MESSAGE_RECEIVER_STATE_WAIT_START;
             }
-        } else if (_state == MESSAGE_RECEIVER_STATE_AVAILABLE) {
-            _state = MESSAGE_RECEIVER_STATE_MESSAGE_OVERFLOW;
         }
     }
+
+    return true;
 }
 
 bool MessageReceiver::dispatch()
 {
-    if (_state == MESSAGE_RECEIVER_STATE_AVAILABLE || _state == MESSAGE_RECEIVER_STATE_MESSAGE_OVERFLOW) {
-        // In the case of a message overflow the message is still valid.
+    // A message cannot be overwritten while it is dispatched as load() holds
+    // any further data until it has been dispatched.
+    if (_state == MESSAGE_RECEIVER_STATE_AVAILABLE) {
         _messageCallback(const_cast<uint8_t *>(_buffer), _bufferCount);
-
-        // A message overflow could occur during the above callback.
-        if (_state == MESSAGE_RECEIVER_STATE_MESSAGE_OVERFLOW) {
-            _errorCallback(MESSAGE_RECEIVER_ERROR_MESSAGE_OVERFLOW);
-        }
     } else if (_state == MESSAGE_RECEIVER_STATE_DATA_OVERFLOW) {
         _errorCallback(MESSAGE_RECEIVER_ERROR_DATA_OVERFLOW);
     } else {
@@ -123,6 +135,19 @@ bool MessageReceiver::dispatch()
 
     _state = MESSAGE_RECEIVER_STATE_WAIT_START;
 
+    // Load any data held while the message was dispatched, and resume receiving
+    // once it has all been loaded.
+    if (_pendingCount > 0) {
+        const uint8_t *pendingBuffer = _pendingBuffer;
+        size_t pendingCount = _pendingCount;
+
+        _pendingCount = 0;
+
+        if (load(pendingBuffer, pendingCount)) {
+            _resumeCallback();
+        }
+    }
+
     return true;
 }
 
@@ -194,12 +219,11 @@ inline size_t encode(uint8_t *buffer, size_t size, uint8_t byte)
 #define PACKET_SIZE 64
 
 // In order to simplify the breaking up of a message into multiple packets we reserve
-// space at the end of every packet for the footer and end symbol. If the packet
-// contained a real checksum in the footer then this would be at worst case 5 to
-// allow for the encoding.
-#define RESERVED 3
+// space at the end of every packet for the footer and end symbol. The footer contains
+// the message identifier, so at worst case 5 to allow for the encoding.
+#define RESERVED 5
 
-bool MessageSender::send(const uint8_t *buffer, size_t bufferCount)
+bool MessageSender::send(const uint8_t *buffer, size_t bufferCount, uint16_t id)
 {
     uint8_t packet[PACKET_SIZE];
 
@@ -246,8 +270,9 @@ bool MessageSender::send(const uint8_t *buffer, size_t bufferCount)
     }
 
     // Add the footer (space has been reserved), end the message and transmit the packet.
-    packet[packetCount++] = 0;
-    packet[packetCount++] = 0;
+    packetCount += encode(&packet[packetCount], 2, (u_int8_t) (id >> 8));
+    packetCount += encode(&packet[packetCount], 2, (u_int8_t) id);
+
     packet[packetCount++] = MESSAGE_END;
 
     if (!transmit(packet, packetCount, 1000)) {
@@ -0,0 +1,81 @@
+import context
+
+from coax.interface import Interface
+from coax.protocol import Poll, ReadStatus, ReadMultiple, LoadAddressCounterHi, LoadAddressCounterLo, WriteData
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.instrumentation import MetricsObserver
+
+from bench_protocol import SCREEN_SIZE, SCREEN
+
+SCREEN_ADDRESS = 80
+
+class NullInterface(Interface):
+    """Interface that responds to every frame with a TT/AR, isolating the
+    execute overhead from any transport.
+    """
+
+    def _transmit_receive(self, outbound_frames, response_lengths, timeout):
+        return [[0] for _ in outbound_frames]
+
+def write_screen_commands():
+    return [LoadAddressCounterHi(SCREEN_ADDRESS >> 8), LoadAddressCounterLo(SCREEN_ADDRESS & 0xff), WriteData(SCREEN)]
+
+def read_screen_commands():
+    # The terminal reads up to the next 32 byte boundary for each READ_MULTIPLE.
+    count = ((SCREEN_ADDRESS + SCREEN_SIZE + 31) // 32) - (SCREEN_ADDRESS // 32)
+
+    return [LoadAddressCounterHi(SCREEN_ADDRESS >> 8), LoadAddressCounterLo(SCREEN_ADDRESS & 0xff),
+            *[ReadMultiple() for _ in range(count)]]
+
+def bench_execute_poll():
+    interface = NullInterface()
+
+    command = Poll()
+
+    yield lambda: interface.execute(command)
+
+def bench_execute_poll_observed():
+    interface = NullInterface()
+
+    interface.add_observer(MetricsObserver())
+
+    command = Poll()
+
+    yield lambda: interface.execute(command)
+
+def bench_execute_addressed_poll():
+    interface = NullInterface()
+
+    command = (0x10, Poll())
+
+    yield lambda: interface.execute(command)
+
+def bench_execute_list():
+    interface = NullInterface()
+
+    commands = [Poll(), ReadStatus(), (0x10, Poll()), (0x10, ReadStatus())]
+
+    yield lambda: interface.execute(commands)
+
+def bench_execute_batch():
+    interface = NullInterface()
+
+    commands = [(None, Poll()), (None, ReadStatus()), (0x10, Poll()), (0x10, ReadStatus())]
+
+    yield lambda: interface.execute_batch(commands)
+
+def bench_simulated_write_screen():
+    interface = SimulatedInterface(SimulatedTerminal(power_on_reset=False))
+
+    commands = write_screen_commands()
+
+    yield lambda: interface.execute(commands)
+
+def bench_simulated_read_screen():
+    interface = SimulatedInterface(SimulatedTerminal(power_on_reset=False))
+
+    interface.execute(write_screen_commands())
+
+    commands = read_screen_commands()
+
+    yield lambda: interface.execute(commands)
@@ -0,0 +1,49 @@
+import context
+
+from coax.protocol import Poll, ReadStatus, WriteData, pack_data_word, pack_data_words, unpack_data_words
+from coax.interface import normalize_frame
+from coax.parity import odd_parity
+
+# A full model 2 screen, excluding the status line.
+SCREEN_SIZE = 1920
+
+SCREEN = bytes(range(256)) * 7 + bytes(SCREEN_SIZE - (256 * 7))
+
+def bench_odd_parity():
+    yield lambda: odd_parity(0xc1)
+
+def bench_pack_data_word():
+    yield lambda: pack_data_word(0xc1)
+
+def bench_pack_data_words_screen():
+    yield lambda: pack_data_words(SCREEN)
+
+def bench_unpack_data_words_screen():
+    words = pack_data_words(SCREEN)
+
+    yield lambda: unpack_data_words(words)
+
+def bench_unpack_data_words_screen_check_parity():
+    words = pack_data_words(SCREEN)
+
+    yield lambda: unpack_data_words(words, check_parity=True)
+
+def bench_normalize_frame_poll():
+    frame = Poll().pack_outbound_frame()
+
+    yield lambda: normalize_frame(None, frame)
+
+def bench_normalize_frame_addressed_read_status():
+    frame = ReadStatus().pack_outbound_frame()
+
+    yield lambda: normalize_frame(0x10, frame)
+
+def bench_normalize_frame_write_data_screen():
+    frame = WriteData(SCREEN).pack_outbound_frame()
+
+    yield lambda: normalize_frame(None, frame)
+
+def bench_normalize_frame_write_data_repeat():
+    frame = WriteData((b'\x00', SCREEN_SIZE)).pack_outbound_frame()
+
+    yield lambda: normalize_frame(None, frame)
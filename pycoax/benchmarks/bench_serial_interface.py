@@ -0,0 +1,80 @@
+from serial import Serial
+
+import context
+
+from coax.protocol import Poll, WriteData, pack_data_words
+from coax.serial_interface import SerialInterface, _pack_transmit_receive_message, \
+                                  _unpack_transmit_receive_response
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.tools.firmware_standin import FirmwareStandIn
+
+from bench_protocol import SCREEN
+from bench_interface import write_screen_commands, read_screen_commands
+
+def bench_pack_transmit_receive_message_poll():
+    frame = Poll().pack_outbound_frame()
+
+    yield lambda: _pack_transmit_receive_message(None, frame, 1, 0)
+
+def bench_pack_transmit_receive_message_addressed_poll():
+    frame = Poll().pack_outbound_frame()
+
+    yield lambda: _pack_transmit_receive_message(0x10, frame, 1, 0)
+
+def bench_pack_transmit_receive_message_write_data_screen():
+    frame = WriteData(SCREEN).pack_outbound_frame()
+
+    yield lambda: _pack_transmit_receive_message(None, frame, 1, 0)
+
+def bench_unpack_transmit_receive_response_poll():
+    response = bytes(2)
+
+    yield lambda: _unpack_transmit_receive_response(response)
+
+def bench_unpack_transmit_receive_response_screen():
+    response = b''.join(word.to_bytes(2, 'little') for word in pack_data_words(SCREEN))
+
+    yield lambda: _unpack_transmit_receive_response(response)
+
+def _firmware_stand_in_interface(pipeline_depth=1):
+    terminal = SimulatedTerminal(power_on_reset=False)
+
+    stand_in = FirmwareStandIn(SimulatedInterface(terminal))
+
+    stand_in.start()
+
+    serial = Serial(stand_in.port, 115200, timeout=1)
+
+    interface = SerialInterface(serial, pipeline_depth=pipeline_depth)
+
+    interface.reset()
+
+    return (interface, stand_in, serial)
+
+def bench_firmware_stand_in_poll():
+    (interface, stand_in, serial) = _firmware_stand_in_interface()
+
+    yield lambda: interface.execute(Poll())
+
+    serial.close()
+    stand_in.close()
+
+def bench_firmware_stand_in_write_screen():
+    (interface, stand_in, serial) = _firmware_stand_in_interface()
+
+    commands = write_screen_commands()
+
+    yield lambda: interface.execute(commands)
+
+    serial.close()
+    stand_in.close()
+
+def bench_firmware_stand_in_read_screen():
+    (interface, stand_in, serial) = _firmware_stand_in_interface(pipeline_depth=4)
+
+    commands = read_screen_commands()
+
+    yield lambda: interface.execute(commands)
+
+    serial.close()
+    stand_in.close()
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import glob
+import timeit
+import fnmatch
+import inspect
+import argparse
+import platform
+import importlib
+from contextlib import contextmanager
+
+import context
+
+def discover(pattern=None):
+    """Find benchmarks in the bench_*.py modules alongside this runner.
+
+    A benchmark is a generator function named bench_* that performs any setup,
+    yields the callable to be timed and then performs any teardown.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    benchmarks = []
+
+    for path in sorted(glob.glob(os.path.join(directory, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+
+        module = importlib.import_module(module_name)
+
+        for (name, function) in inspect.getmembers(module, inspect.isgeneratorfunction):
+            if not name.startswith('bench_') or function.__module__ != module_name:
+                continue
+
+            name = f'{module_name[6:]}.{name[6:]}'
+
+            if pattern is None or fnmatch.fnmatch(name, pattern):
+                benchmarks.append((name, contextmanager(function)))
+
+    return benchmarks
+
+def run_benchmark(benchmark, repeat, min_time):
+    """Time a benchmark, returning the best time per call in seconds and the
+    number of calls per repeat.
+    """
+    with benchmark() as function:
+        timer = timeit.Timer(function)
+
+        (number, time_taken) = timer.autorange()
+
+        # Scale the number of calls so that each repeat runs for at least the
+        # minimum time, this reduces the effect of timer resolution and noise.
+        if time_taken < min_time:
+            number = int(number * (min_time / time_taken)) + 1
+
+        times = timer.repeat(repeat, number)
+
+    return (min(times) / number, number)
+
+def run_benchmarks(benchmarks, repeat, min_time, output=sys.stdout):
+    results = {}
+
+    for (name, benchmark) in benchmarks:
+        (seconds, number) = run_benchmark(benchmark, repeat, min_time)
+
+        results[name] = {'seconds': seconds, 'number': number, 'repeat': repeat}
+
+        print(f'{name:<64} {_format_seconds(seconds):>12}', file=output, flush=True)
+
+    return results
+
+def compare(results, baseline, threshold):
+    """Compare results to a baseline, returning a list of (name, baseline,
+    current, change) tuples and a list of the names that regressed by more
+    than the threshold.
+
+    The change is the relative change in time per call, positive values are
+    slower than the baseline.
+    """
+    comparisons = []
+    regressions = []
+
+    for (name, result) in results.items():
+        if name not in baseline:
+            comparisons.append((name, None, result['seconds'], None))
+            continue
+
+        baseline_seconds = baseline[name]['seconds']
+
+        change = (result['seconds'] - baseline_seconds) / baseline_seconds
+
+        comparisons.append((name, baseline_seconds, result['seconds'], change))
+
+        if change > threshold:
+            regressions.append(name)
+
+    return (comparisons, regressions)
+
+def load_results(path):
+    with open(path, 'r') as file:
+        return json.load(file)['results']
+
+def save_results(path, results):
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results
+    }
+
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=4, sort_keys=True)
+
+        file.write('\n')
+
+def _format_seconds(seconds):
+    if seconds < 1e-6:
+        return f'{seconds * 1e9:.1f} ns'
+
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.2f} us'
+
+    return f'{seconds * 1e3:.2f} ms'
+
+def _format_comparison(name, baseline_seconds, seconds, change):
+    if baseline_seconds is None:
+        return f'{name:<64} {"-":>12} {_format_seconds(seconds):>12} {"new":>9}'
+
+    return f'{name:<64} {_format_seconds(baseline_seconds):>12} {_format_seconds(seconds):>12} {change:>+9.1%}'
+
+def main():
+    parser = argparse.ArgumentParser(description='pycoax benchmarks')
+
+    parser.add_argument('-k', dest='pattern', help='Only run benchmarks matching the glob pattern')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timing repeats')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum time of each repeat in seconds')
+    parser.add_argument('--save', metavar='FILE', help='Save the results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare the results to a baseline saved with --save')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown, compared to the baseline, considered a regression')
+
+    args = parser.parse_args()
+
+    benchmarks = discover(args.pattern)
+
+    if not benchmarks:
+        sys.exit('No benchmarks found')
+
+    results = run_benchmarks(benchmarks, args.repeat, args.min_time)
+
+    if args.save:
+        save_results(args.save, results)
+
+    if not args.baseline:
+        return
+
+    (comparisons, regressions) = compare(results, load_results(args.baseline), args.threshold)
+
+    print()
+    print(f'{"":<64} {"baseline":>12} {"current":>12} {"change":>9}')
+
+    for comparison in comparisons:
+        print(_format_comparison(*comparison))
+
+    if regressions:
+        print()
+        print(f'{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:')
+
+        for name in regressions:
+            print(f'    {name}')
+
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 from .__about__ import __version__
 
 from .interface import InterfaceFeature
-from .serial_interface import SerialInterface, open_serial_interface
+from .serial_interface import SerialInterface, Program, open_serial_interface
+from .async_serial_interface import AsyncSerialInterface, open_async_serial_interface
+from .scheduler import CommandScheduler, Priority
+from .instrumentation import Execution, Histogram, MetricsObserver
+from .trace import TraceRecorder, ReplaySerial, save_trace, load_trace, open_replay_interface
 
 from .protocol import (
     PollAction,
@@ -40,7 +44,8 @@ from .protocol import (
     EABReadMultiple,
     EABWriteUnderMask,
     EABReadStatus,
-    Data
+    Data,
+    Slot
 )
 
 from .features import (
@@ -49,12 +54,19 @@ from .features import (
     parse_features
 )
 
-from .multiplexer import get_device_address
+from .multiplexer import get_device_address, MultiplexerPoller
+
+from .poll import AdaptivePollInterval, PollDriver
+
+from .screen import Screen
+from .session import Session
+from .simulator import SimulatedInterface, SimulatedTerminal
 
 from .exceptions import (
     InterfaceError,
     ReceiveError,
     InterfaceTimeout,
     ReceiveTimeout,
-    ProtocolError
+    ProtocolError,
+    ReplayError
 )
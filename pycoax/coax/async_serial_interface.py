@@ -0,0 +1,402 @@
+"""
+coax.async_serial_interface
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+import os
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from sliplib import encode, ProtocolError
+
+from .interface import InterfaceFeature, _normalize_commands, _get_execute_result, \
+                       _pack_outbound_frames, _unpack_inbound_frames
+from .serial_interface import WindowsSafeSerial, SlipDecoder, _MessageIds, _pack_message, \
+                              _unpack_message, _parse_reset_response, _parse_supported_queries_response, \
+                              _pack_transmit_receive_message, _parse_transmit_receive_response, \
+                              _split_outbound_frames, _merge_split_responses, _compile_program, \
+                              INFO_SUPPORTED_QUERIES, INFO_FEATURES, _NEGOTIATED_INFO_QUERIES
+from .optimizer import optimize_commands, map_optimized_responses
+from .exceptions import InterfaceError, InterfaceTimeout
+
+class AsyncSerialInterface:
+    """Serial attached 3270 coax interface for use with asyncio.
+
+    The serial port file descriptor is registered with the running event loop
+    and must be non-blocking, as a result this is only supported on POSIX
+    platforms. The timeout, in seconds, applies to each interface response.
+
+    The pipeline depth and compression are as for SerialInterface.
+    """
+
+    def __init__(self, serial, pipeline_depth=1, timeout=None, compress=False):
+        if serial is None:
+            raise ValueError('Serial port is required')
+
+        if pipeline_depth < 1:
+            raise ValueError('Pipeline depth must be at least 1')
+
+        self.serial = serial
+        self.pipeline_depth = pipeline_depth
+        self.timeout = timeout
+        self.compress = compress
+
+        self.features = set()
+
+        self.legacy_firmware_detected = None
+        self.legacy_firmware_version = None
+
+        self.hardware_type = None
+        self.firmware_version = None
+        self.message_buffer_size = None
+
+        self._loop = asyncio.get_running_loop()
+        self._fd = serial.fileno()
+
+        self._decoder = SlipDecoder()
+        self._message_ids = _MessageIds()
+
+        # Futures for the responses to messages in flight, in the order the
+        # messages were sent.
+        self._response_futures = deque()
+
+        self._write_buffer = bytearray()
+        self._is_writer_registered = False
+
+        # Only one exchange is active at a time, messages from concurrent
+        # exchanges are not interleaved.
+        self._lock = asyncio.Lock()
+
+        self._loop.add_reader(self._fd, self._handle_readable)
+
+        self._is_closed = False
+
+    def close(self):
+        """Stop using the serial port."""
+        if self._is_closed:
+            return
+
+        self._loop.remove_reader(self._fd)
+
+        if self._is_writer_registered:
+            self._loop.remove_writer(self._fd)
+
+            self._is_writer_registered = False
+
+        self._abandon(InterfaceError('Interface closed'))
+
+        self._is_closed = True
+
+    async def reset(self):
+        """Reset the interface."""
+        async with self._lock:
+            self.serial.reset_input_buffer()
+
+            self._decoder.clear()
+
+            self._abandon()
+
+            message = await self._exchange(bytes([0x01]), 5)
+
+            (self.legacy_firmware_detected, self.legacy_firmware_version) = _parse_reset_response(message)
+
+            self.features = set()
+
+            self.hardware_type = None
+            self.firmware_version = None
+            self.message_buffer_size = None
+
+            # Query capabilities, if this is not a legacy firmware.
+            if not self.legacy_firmware_detected:
+                await self._negotiate()
+
+    async def _negotiate(self):
+        try:
+            supported_queries = await self._get_info(INFO_SUPPORTED_QUERIES, _parse_supported_queries_response)
+        except InterfaceError:
+            supported_queries = {INFO_FEATURES}
+
+        for (query, (name, parse)) in _NEGOTIATED_INFO_QUERIES.items():
+            if query not in supported_queries:
+                continue
+
+            try:
+                setattr(self, name, await self._get_info(query, parse))
+            except InterfaceError:
+                pass
+
+    async def _get_info(self, query, parse):
+        message = await self._exchange(bytes([0xf0, query]), self.timeout)
+
+        return parse(message)
+
+    async def execute(self, commands, timeout=None, optimize=False):
+        """Execute one or more commands, see Interface.execute()."""
+        (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
+
+        if optimize:
+            (optimized_commands, response_indexes) = optimize_commands(normalized_commands)
+        else:
+            (optimized_commands, response_indexes) = (normalized_commands, None)
+
+        (outbound_frames, response_lengths) = _pack_outbound_frames(optimized_commands)
+
+        inbound_frames = await self._transmit_receive(outbound_frames, response_lengths, timeout)
+
+        responses = _unpack_inbound_frames(inbound_frames, optimized_commands)
+
+        if response_indexes is not None:
+            responses = map_optimized_responses(responses, response_indexes)
+
+        return _get_execute_result(responses, has_multiple_commands)
+
+    async def execute_batch(self, commands, timeout=None):
+        """Execute a list of (address, command) tuples, see
+        Interface.execute_batch()."""
+        (outbound_frames, response_lengths) = _pack_outbound_frames(commands)
+
+        inbound_frames = await self._transmit_receive(outbound_frames, response_lengths, timeout)
+
+        return _unpack_inbound_frames(inbound_frames, commands)
+
+    async def _transmit_receive(self, outbound_frames, response_lengths, timeout):
+        if len(response_lengths) != len(outbound_frames):
+            raise ValueError('Response lengths length must equal outbound frames length')
+
+        if any(address is not None for (address, _) in outbound_frames) and InterfaceFeature.PROTOCOL_3299 not in self.features:
+            raise NotImplementedError('Interface does not support 3299 protocol')
+
+        # Split frames that would overflow the interface message buffer.
+        (outbound_frames, response_lengths, split_counts) = _split_outbound_frames(outbound_frames, response_lengths,
+                                                                                   self.message_buffer_size, self.compress)
+
+        # Pack all messages before sending.
+        timeout_milliseconds = self._calculate_timeout_milliseconds(timeout)
+
+        messages = [_pack_transmit_receive_message(address, frame, response_length, timeout_milliseconds)
+                    for ((address, frame), response_length) in zip(outbound_frames, response_lengths)]
+
+        responses = await self._transmit_receive_messages(messages, self._send_message)
+
+        return _merge_split_responses(responses, split_counts)
+
+    def compile(self, commands, timeout=None):
+        """Compile one or more commands into a program, see
+        SerialInterface.compile()."""
+        (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
+
+        if any(address is not None for (address, _) in normalized_commands) and InterfaceFeature.PROTOCOL_3299 not in self.features:
+            raise NotImplementedError('Interface does not support 3299 protocol')
+
+        timeout_milliseconds = self._calculate_timeout_milliseconds(timeout)
+
+        return _compile_program(normalized_commands, has_multiple_commands, timeout_milliseconds,
+                                self.message_buffer_size, self.compress)
+
+    async def execute_program(self, program, values=None):
+        """Execute a compiled program, values maps each slot name to a data
+        byte."""
+        values = program.check_values(values)
+
+        responses = await self._transmit_receive_messages(program.messages,
+                                                          lambda message: self._send_compiled_message(message, values))
+
+        inbound_frames = _merge_split_responses(responses, program.split_counts)
+
+        responses = _unpack_inbound_frames(inbound_frames, program.commands)
+
+        return _get_execute_result(responses, program.has_multiple_commands)
+
+    async def _transmit_receive_messages(self, messages, send_message):
+        async with self._lock:
+            responses = []
+
+            send_index = 0
+            in_flight_futures = deque()
+            interface_error = None
+
+            try:
+                while in_flight_futures or (interface_error is None and send_index < len(messages)):
+                    while (interface_error is None and send_index < len(messages)
+                           and len(in_flight_futures) < self.pipeline_depth):
+                        in_flight_futures.append(send_message(messages[send_index]))
+
+                        send_index += 1
+
+                    self._write()
+
+                    message = await self._receive_message(in_flight_futures.popleft(), self.timeout)
+
+                    response = _parse_transmit_receive_response(message)
+
+                    if isinstance(response, InterfaceError):
+                        if interface_error is None:
+                            interface_error = response
+
+                        continue
+
+                    responses.append(response)
+            except BaseException:
+                # Any responses to messages in flight will be discarded as stale.
+                self._abandon()
+                raise
+
+        if interface_error is not None:
+            raise interface_error
+
+        return responses
+
+    def _calculate_timeout_milliseconds(self, timeout):
+        milliseconds = 0
+
+        if timeout:
+            if self.timeout and timeout > self.timeout:
+                raise ValueError('Timeout cannot be greater than interface timeout')
+
+            milliseconds = int(timeout * 1000)
+
+        return milliseconds
+
+    async def _exchange(self, message, timeout):
+        future = self._send_message(message)
+
+        self._write()
+
+        try:
+            return await self._receive_message(future, timeout)
+        except BaseException:
+            self._abandon()
+            raise
+
+    def _send_message(self, message):
+        message_id = self._message_ids.allocate()
+
+        return self._send_packet(encode(_pack_message(message, message_id)))
+
+    def _send_compiled_message(self, message, values):
+        message_id = self._message_ids.allocate()
+
+        return self._send_packet(message.encode(values, message_id))
+
+    def _send_packet(self, packet):
+        self._write_buffer += packet
+
+        future = self._loop.create_future()
+
+        self._response_futures.append(future)
+
+        return future
+
+    async def _receive_message(self, future, timeout):
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise InterfaceTimeout()
+
+    def _abandon(self, error=None):
+        self._message_ids.clear()
+
+        while self._response_futures:
+            future = self._response_futures.popleft()
+
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.cancel()
+
+    def _write(self):
+        if not self._write_buffer:
+            return
+
+        try:
+            count = os.write(self._fd, self._write_buffer)
+        except BlockingIOError:
+            count = 0
+
+        del self._write_buffer[:count]
+
+        # Wait for the serial port to be writable if not all the data was written.
+        if self._write_buffer and not self._is_writer_registered:
+            self._loop.add_writer(self._fd, self._handle_writable)
+
+            self._is_writer_registered = True
+
+    def _handle_writable(self):
+        self._write()
+
+        if not self._write_buffer and self._is_writer_registered:
+            self._loop.remove_writer(self._fd)
+
+            self._is_writer_registered = False
+
+    def _handle_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as error:
+            self._abandon(InterfaceError(f'Serial port error: {error}'))
+            return
+
+        if not data:
+            return
+
+        self._decoder.feed(data)
+
+        while True:
+            try:
+                message = self._decoder.decode_msg()
+            except ProtocolError:
+                self._set_response(InterfaceError('SLIP protocol error'))
+                continue
+
+            if message is None:
+                break
+
+            try:
+                (message, message_id) = _unpack_message(message)
+
+                if not self._message_ids.match(message_id):
+                    continue
+            except InterfaceError as error:
+                self._set_response(error)
+                continue
+
+            self._set_response(message)
+
+    def _set_response(self, response):
+        if not self._response_futures:
+            return
+
+        future = self._response_futures.popleft()
+
+        if future.done():
+            return
+
+        if isinstance(response, BaseException):
+            future.set_exception(response)
+        else:
+            future.set_result(response)
+
+@asynccontextmanager
+async def open_async_serial_interface(serial_port, reset=True, pipeline_depth=1, timeout=None, compress=False):
+    """Opens serial port and initializes serial attached 3270 coax interface for use with asyncio."""
+    with WindowsSafeSerial(serial_port, 115200, timeout=0) as serial:
+        serial.reset_input_buffer()
+        serial.reset_output_buffer()
+
+        # Allow the interface firmware time to start, this is only required for the
+        # original Arduino Mega based interface.
+        if 'COAX_FAST_START' not in os.environ:
+            await asyncio.sleep(3)
+
+        interface = AsyncSerialInterface(serial, pipeline_depth=pipeline_depth, timeout=timeout, compress=compress)
+
+        try:
+            if reset:
+                await interface.reset()
+
+            yield interface
+        finally:
+            interface.close()
@@ -17,3 +17,6 @@ class ReceiveTimeout(Exception):
 
 class ProtocolError(Exception):
     """A protocol error occurred."""
+
+class ReplayError(Exception):
+    """The messages sent do not match the trace being replayed."""
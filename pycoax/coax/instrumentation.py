@@ -0,0 +1,298 @@
+"""
+coax.instrumentation
+~~~~~~~~~~~~~~~~~~~~
+
+Execution observers, latency histograms and metrics.
+
+Observers are added to an interface with add_observer() and are called with
+an Execution record after each execute. When no observer is attached the
+interface does not record anything.
+"""
+
+from bisect import bisect_left
+
+from .protocol import FrameFormat
+from .exceptions import ReceiveTimeout
+
+class Execution:
+    """Record of a single execute.
+
+    Timestamps are time.perf_counter() values: start is before the commands
+    are packed, packed is after the commands are packed into frames (and
+    messages), written is when the first message was written, first_byte is
+    when the first byte of the first response was received, received is when
+    the last response was received and decoded is after the responses are
+    decoded. The written and first_byte timestamps are only recorded by
+    serial interfaces.
+
+    For each command, command_times contains the written, first_byte and
+    received timestamps of the message(s) that carried it.
+    """
+
+    __slots__ = ['commands', 'responses', 'error', 'start', 'packed', 'written', 'first_byte', 'received',
+                 'decoded', 'command_times', 'bytes_written', 'bytes_read', 'words_written', 'words_read']
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.responses = None
+        self.error = None
+
+        self.start = None
+        self.packed = None
+        self.written = None
+        self.first_byte = None
+        self.received = None
+        self.decoded = None
+
+        self.command_times = None
+
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.words_written = 0
+        self.words_read = 0
+
+    def __repr__(self):
+        return (f'<Execution commands={len(self.commands)}, error={self.error}, '
+                f'bytes_written={self.bytes_written}, bytes_read={self.bytes_read}>')
+
+# Exponential latency bucket upper bounds from 1 microsecond to 16 seconds.
+DEFAULT_LATENCY_BOUNDS = tuple(1e-6 * (2 ** exponent) for exponent in range(25))
+
+class Histogram:
+    """Fixed bucket histogram.
+
+    Each bucket counts the values less than or equal to its upper bound, and
+    greater than the previous bound - the last bucket counts values greater
+    than all bounds.
+    """
+
+    def __init__(self, bounds=DEFAULT_LATENCY_BOUNDS):
+        if not bounds or any(a >= b for (a, b) in zip(bounds, bounds[1:])):
+            raise ValueError('Bounds must be increasing')
+
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        """Add a value to the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile, returning the upper bound of the bucket that
+        contains it or None if the histogram is empty."""
+        if q < 0 or q > 1:
+            raise ValueError('Quantile must be between 0 and 1')
+
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative_count = 0
+
+        for (index, count) in enumerate(self.counts):
+            cumulative_count += count
+
+            if count and cumulative_count >= rank:
+                return self.bounds[index] if index < len(self.bounds) else float('inf')
+
+        return float('inf')
+
+    def to_dict(self):
+        """Export the histogram as a dictionary."""
+        return {
+            'bounds': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum
+        }
+
+class CommandMetrics:
+    """Metrics for a command class and 3299 address."""
+
+    def __init__(self, bounds=DEFAULT_LATENCY_BOUNDS):
+        self.latency = Histogram(bounds)
+        self.count = 0
+        self.receive_timeouts = 0
+        self.errors = 0
+
+    def to_dict(self):
+        """Export the metrics as a dictionary."""
+        return {
+            'latency': self.latency.to_dict(),
+            'count': self.count,
+            'receive_timeouts': self.receive_timeouts,
+            'errors': self.errors
+        }
+
+class MetricsObserver:
+    """Observer that aggregates latency histograms and wire counters.
+
+    Per command latency is from the command being written to its response
+    being received, commands are keyed by (command class name, address).
+    """
+
+    def __init__(self, bounds=DEFAULT_LATENCY_BOUNDS):
+        self.bounds = bounds
+
+        self.commands = {}
+
+        self.pack_latency = Histogram(bounds)
+        self.first_byte_latency = Histogram(bounds)
+        self.decode_latency = Histogram(bounds)
+        self.execute_latency = Histogram(bounds)
+
+        self.executions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.words_written = 0
+        self.words_read = 0
+
+        self.errors = {}
+
+    def __call__(self, execution):
+        self.executions += 1
+
+        self.bytes_written += execution.bytes_written
+        self.bytes_read += execution.bytes_read
+        self.words_written += execution.words_written
+        self.words_read += execution.words_read
+
+        self.pack_latency.observe(execution.packed - execution.start)
+
+        if execution.written is not None and execution.first_byte is not None:
+            self.first_byte_latency.observe(execution.first_byte - execution.written)
+
+        # The responses are not available if the execute raised an error.
+        if execution.error is not None:
+            name = type(execution.error).__name__
+
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return
+
+        self.decode_latency.observe(execution.decoded - execution.received)
+        self.execute_latency.observe(execution.decoded - execution.start)
+
+        for ((address, command), response, (written, _, received)) in zip(execution.commands, execution.responses,
+                                                                          execution.command_times):
+            key = (type(command).__name__, address)
+
+            metrics = self.commands.get(key)
+
+            if metrics is None:
+                metrics = self.commands[key] = CommandMetrics(self.bounds)
+
+            metrics.count += 1
+            metrics.latency.observe(received - written)
+
+            if isinstance(response, ReceiveTimeout):
+                metrics.receive_timeouts += 1
+            elif isinstance(response, BaseException):
+                metrics.errors += 1
+
+    def to_dict(self):
+        """Export the metrics as a dictionary."""
+        return {
+            'executions': self.executions,
+            'bytes_written': self.bytes_written,
+            'bytes_read': self.bytes_read,
+            'words_written': self.words_written,
+            'words_read': self.words_read,
+            'errors': dict(self.errors),
+            'pack_latency': self.pack_latency.to_dict(),
+            'first_byte_latency': self.first_byte_latency.to_dict(),
+            'decode_latency': self.decode_latency.to_dict(),
+            'execute_latency': self.execute_latency.to_dict(),
+            'commands': [{'command': command, 'address': address, **metrics.to_dict()}
+                         for ((command, address), metrics) in self.commands.items()]
+        }
+
+    def to_text(self, prefix='coax'):
+        """Export the metrics in the Prometheus text exposition format."""
+        # Samples are grouped by metric family, each preceded by its type.
+        families = {}
+
+        def add_sample(family, metric_type, name, value, labels):
+            (_, samples) = families.setdefault(family, (metric_type, []))
+
+            samples.append(f'{prefix}_{name}{_format_labels(labels)} {value}')
+
+        def add_counter(name, value, labels=None):
+            add_sample(name, 'counter', name, value, labels)
+
+        def add_histogram(name, histogram, labels=None):
+            labels = labels or {}
+
+            cumulative_count = 0
+
+            for (bound, count) in zip(self.bounds, histogram.counts):
+                cumulative_count += count
+
+                add_sample(name, 'histogram', f'{name}_bucket', cumulative_count, {**labels, 'le': repr(bound)})
+
+            add_sample(name, 'histogram', f'{name}_bucket', histogram.count, {**labels, 'le': '+Inf'})
+            add_sample(name, 'histogram', f'{name}_sum', repr(histogram.sum), labels)
+            add_sample(name, 'histogram', f'{name}_count', histogram.count, labels)
+
+        add_counter('executions_total', self.executions)
+
+        add_counter('wire_bytes_total', self.bytes_written, {'direction': 'written'})
+        add_counter('wire_bytes_total', self.bytes_read, {'direction': 'read'})
+        add_counter('wire_words_total', self.words_written, {'direction': 'written'})
+        add_counter('wire_words_total', self.words_read, {'direction': 'read'})
+
+        for (name, count) in self.errors.items():
+            add_counter('execute_errors_total', count, {'error': name})
+
+        for (phase, histogram) in [('pack', self.pack_latency), ('first_byte', self.first_byte_latency),
+                                   ('decode', self.decode_latency), ('execute', self.execute_latency)]:
+            add_histogram('phase_latency_seconds', histogram, {'phase': phase})
+
+        for ((command, address), metrics) in self.commands.items():
+            labels = {'command': command, 'address': '' if address is None else str(address)}
+
+            add_counter('commands_total', metrics.count, labels)
+            add_counter('receive_timeouts_total', metrics.receive_timeouts, labels)
+            add_counter('command_errors_total', metrics.errors, labels)
+
+            add_histogram('command_latency_seconds', metrics.latency, labels)
+
+        lines = []
+
+        for (family, (metric_type, samples)) in families.items():
+            lines.append(f'# TYPE {prefix}_{family} {metric_type}')
+            lines.extend(samples)
+
+        return '\n'.join(lines) + '\n'
+
+def count_frame_words(address, frame):
+    """Count the words sent on the wire for an outbound frame, including the
+    3299 address and any repeated words."""
+    count = 1 if address is not None else 0
+
+    if frame[0] == FrameFormat.WORDS:
+        count += _count_repeated(frame[1])
+    elif frame[0] == FrameFormat.WORD_DATA:
+        count += 1
+
+        if len(frame) > 2:
+            count += _count_repeated(frame[2])
+    elif frame[0] == FrameFormat.DATA:
+        count += _count_repeated(frame[1])
+
+    return count
+
+def _count_repeated(data):
+    if isinstance(data, tuple):
+        return len(data[0]) * data[1]
+
+    return len(data)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{' + ','.join(f'{name}="{value}"' for (name, value) in labels.items()) + '}'
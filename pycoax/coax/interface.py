@@ -3,38 +3,73 @@ coax.interface
 ~~~~~~~~~~~~~~
 """
 
+import time
 from enum import Enum
 
 from .protocol import FrameFormat, pack_data_word
 from .exceptions import ProtocolError
+from .optimizer import optimize_commands, map_optimized_responses
+from .instrumentation import Execution, count_frame_words
 
 class Interface:
     """3270 coax interface."""
 
+    # Observers, and the execution being observed, are class defaults so that
+    # executing without an observer only costs a single check.
+    observers = ()
+
+    _execution = None
+
     def __init__(self):
         self.features = set()
 
+    def add_observer(self, observer):
+        """Add an observer, called with an Execution record after each
+        execute, see coax.instrumentation."""
+        self.observers = (*self.observers, observer)
+
+    def remove_observer(self, observer):
+        """Remove an observer."""
+        if observer not in self.observers:
+            raise ValueError('Observer not found')
+
+        self.observers = tuple(other for other in self.observers if other != observer)
+
     def reset(self):
         """Reset the interface."""
         raise NotImplementedError
 
-    def execute(self, commands, timeout=None):
-        """Execute one or more commands."""
+    def execute(self, commands, timeout=None, optimize=False):
+        """Execute one or more commands.
+
+        If optimize is set, redundant commands are removed and adjacent writes
+        merged before executing - responses still correspond to the commands
+        provided, see coax.optimizer.
+        """
         (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
 
-        responses = self._execute(normalized_commands, timeout)
+        if optimize:
+            (optimized_commands, response_indexes) = optimize_commands(normalized_commands)
 
-        if has_multiple_commands:
-            return responses
+            responses = map_optimized_responses(self._execute(optimized_commands, timeout), response_indexes)
+        else:
+            responses = self._execute(normalized_commands, timeout)
 
-        response = responses[0]
+        return _get_execute_result(responses, has_multiple_commands)
 
-        if isinstance(response, BaseException):
-            raise response
+    def execute_batch(self, commands, timeout=None):
+        """Execute a list of (address, command) tuples, returning a list of
+        responses.
 
-        return response
+        Unlike execute() the commands are not validated, this avoids the
+        per-call overhead for small batches executed repeatedly.
+        """
+        return self._execute(commands, timeout)
 
     def _execute(self, commands, timeout):
+        if self.observers:
+            return self._execute_observed(commands, timeout)
+
         (outbound_frames, response_lengths) = _pack_outbound_frames(commands)
 
         inbound_frames = self._transmit_receive(outbound_frames, response_lengths, timeout)
@@ -43,6 +78,52 @@ class Interface:
 
         return responses
 
+    def _execute_observed(self, commands, timeout):
+        execution = Execution(commands)
+
+        execution.start = time.perf_counter()
+
+        (outbound_frames, response_lengths) = _pack_outbound_frames(commands)
+
+        execution.packed = time.perf_counter()
+
+        execution.words_written = sum(count_frame_words(address, frame) for (address, frame) in outbound_frames)
+
+        # The transport records message timings and byte counts, if supported,
+        # while the execution is set.
+        self._execution = execution
+
+        try:
+            inbound_frames = self._transmit_receive(outbound_frames, response_lengths, timeout)
+        except BaseException as error:
+            execution.error = error
+
+            self._notify_observers(execution)
+            raise
+        finally:
+            self._execution = None
+
+        execution.received = time.perf_counter()
+
+        responses = _unpack_inbound_frames(inbound_frames, commands)
+
+        execution.decoded = time.perf_counter()
+
+        execution.responses = responses
+
+        execution.words_read = sum(len(frame) for frame in inbound_frames if not isinstance(frame, BaseException))
+
+        if execution.command_times is None:
+            execution.command_times = [(execution.packed, None, execution.received)] * len(commands)
+
+        self._notify_observers(execution)
+
+        return responses
+
+    def _notify_observers(self, execution):
+        for observer in self.observers:
+            observer(execution)
+
     def _transmit_receive(self, outbound_frames, response_lengths, timeout):
         raise NotImplementedError
 
@@ -95,34 +176,38 @@ def normalize_frame(address, frame):
 
     return (words, repeat_count, repeat_offset)
 
+# Types known to be commands, to avoid repeating the attribute checks.
+_COMMAND_TYPES = set()
+
 def _is_command(command):
-    return hasattr(command, 'pack_outbound_frame') and hasattr(command, 'unpack_inbound_frame')
+    if type(command) in _COMMAND_TYPES:
+        return True
 
-def _normalize_command(command):
-    if _is_command(command):
-        return (None, command)
+    if hasattr(command, 'pack_outbound_frame') and hasattr(command, 'unpack_inbound_frame'):
+        _COMMAND_TYPES.add(type(command))
+        return True
 
-    if not isinstance(command, tuple):
-        raise TypeError('Invalid command form')
+    return False
 
-    if len(command) != 2:
-        raise TypeError('Invalid command form')
+def _is_normalized_command(command):
+    return (isinstance(command, tuple) and len(command) == 2
+            and (command[0] is None or isinstance(command[0], int)) and _is_command(command[1]))
 
-    if not (command[0] is None or isinstance(command[0], int)):
-        raise TypeError('Invalid command form')
+def _normalize_command(command):
+    if _is_command(command):
+        return (None, command)
 
-    if not _is_command(command[1]):
+    if not _is_normalized_command(command):
         raise TypeError('Invalid command form')
 
     return command
 
 def _normalize_commands(commands):
-    try:
-        command = _normalize_command(commands)
+    if _is_command(commands):
+        return ([(None, commands)], False)
 
-        return ([command], False)
-    except TypeError:
-        pass
+    if _is_normalized_command(commands):
+        return ([commands], False)
 
     try:
         commands = list(commands)
@@ -134,16 +219,20 @@ def _normalize_commands(commands):
 
     return ([_normalize_command(command) for command in commands], True)
 
-def _pack_outbound_frames(commands):
-    frames = []
-    response_lengths = []
+def _get_execute_result(responses, has_multiple_commands):
+    if has_multiple_commands:
+        return responses
+
+    response = responses[0]
 
-    for (address, command) in commands:
-        frame = command.pack_outbound_frame()
-        response_length = command.response_length or 1
+    if isinstance(response, BaseException):
+        raise response
 
-        frames.append((address, frame))
-        response_lengths.append(response_length)
+    return response
+
+def _pack_outbound_frames(commands):
+    frames = [(address, command.pack_outbound_frame()) for (address, command) in commands]
+    response_lengths = [command.response_length or 1 for (_, command) in commands]
 
     return (frames, response_lengths)
 
@@ -3,6 +3,12 @@ coax.multiplexer
 ~~~~~~~~~~~~~~~~
 """
 
+import time
+
+from .protocol import Poll, PollAck
+from .poll import AdaptivePollInterval
+from .exceptions import ReceiveTimeout
+
 PORT_MAP_3299 = [
     # The 3299-2 port numbers appear to be LSB first
     0b000000,
@@ -20,3 +26,121 @@ def get_device_address(port):
         raise ValueError('Port must be between 0 and 7')
 
     return PORT_MAP_3299[port]
+
+class MultiplexerPoller:
+    """POLL terminals attached to a 3299 multiplexer.
+
+    All ports that are due are POLLed in a single execute, along with a
+    POLL_ACK for each port that returned a response in the previous batch.
+    Each port has an adaptive POLL interval, ports that do not respond are
+    considered absent and are POLLed at the absent interval.
+    """
+
+    def __init__(self, interface, ports=range(8), min_interval=0.005, max_interval=0.05,
+                 absent_interval=1, timeout=None):
+        ports = list(ports)
+
+        if not ports:
+            raise ValueError('Ports must not be empty')
+
+        self.interface = interface
+        self.absent_interval = absent_interval
+        self.timeout = timeout
+
+        self._ports = {port: _Port(get_device_address(port), AdaptivePollInterval(min_interval, max_interval))
+                       for port in ports}
+
+    def time_until_next_poll(self, now=None):
+        """Time, in seconds, until the next port is due to be POLLed."""
+        if now is None:
+            now = time.perf_counter()
+
+        if any(port.needs_ack for port in self._ports.values()):
+            return 0
+
+        return max(min(port.next_poll_time for port in self._ports.values()) - now, 0)
+
+    def poll(self, block=True):
+        """POLL all ports that are due, returning a list of port and response
+        tuples for ports that responded.
+
+        If block is true, this waits until at least one port is due.
+        """
+        if block:
+            delay = self.time_until_next_poll()
+
+            if delay > 0:
+                time.sleep(delay)
+
+        now = time.perf_counter()
+
+        commands = []
+        polled_ports = []
+
+        for (number, port) in self._ports.items():
+            if port.needs_ack or port.next_poll_time <= now:
+                if port.needs_ack:
+                    commands.append((port.address, PollAck()))
+
+                commands.append((port.address, Poll()))
+
+                polled_ports.append((number, port))
+
+        if not commands:
+            return []
+
+        responses = self.interface.execute(commands, timeout=self.timeout)
+
+        events = []
+
+        is_ack_failed = False
+
+        for ((_, command), response) in zip(commands, responses):
+            if isinstance(command, PollAck):
+                is_ack_failed = isinstance(response, BaseException)
+                continue
+
+            (number, port) = polled_ports.pop(0)
+
+            if port.needs_ack:
+                # If the acknowledgement failed the terminal will respond with
+                # the same response again, it is acknowledged in the next batch.
+                if is_ack_failed:
+                    continue
+
+                port.needs_ack = False
+
+            if isinstance(response, ReceiveTimeout):
+                port.is_present = False
+                port.next_poll_time = now + self.absent_interval
+                continue
+
+            if not port.is_present:
+                port.is_present = True
+                port.interval.interval = port.interval.max_interval
+
+            if response is None:
+                port.next_poll_time = now + port.interval.idle()
+                continue
+
+            if not isinstance(response, BaseException):
+                port.needs_ack = True
+
+            port.next_poll_time = now + port.interval.activity()
+
+            events.append((number, response))
+
+        return events
+
+    def is_present(self, port):
+        """Did the port respond to the last POLL?"""
+        return self._ports[port].is_present
+
+class _Port:
+    def __init__(self, address, interval):
+        self.address = address
+        self.interval = interval
+
+        self.is_present = True
+        self.needs_ack = False
+        self.next_poll_time = 0
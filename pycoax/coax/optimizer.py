@@ -0,0 +1,245 @@
+"""
+coax.optimizer
+~~~~~~~~~~~~~~
+
+Peephole optimization of command batches.
+
+The optimizer assumes the address counter is incremented on write, unless
+step inhibit is set by a LOAD_CONTROL_REGISTER in the batch.
+
+Fills are not replaced with CLEAR: CLEAR clears from the address counter to
+the end of the buffer, rather than a given length, and completes
+asynchronously so it would have to be followed by polling READ_STATUS until
+the terminal is no longer busy. Long fills are instead sent as repeated data
+by an interface that supports it.
+"""
+
+from .protocol import ReadStatus, LoadControlRegister, LoadSecondaryControl, LoadMask, \
+                      LoadAddressCounterHi, LoadAddressCounterLo, WriteData, EABLoadMask, Data
+
+def optimize_commands(commands):
+    """Optimize a list of normalized commands.
+
+    Returns the optimized commands and, for each original command, the indexes
+    of the optimized commands that it maps to.
+    """
+    entries = [_Entry(address, command, [index]) for (index, (address, command)) in enumerate(commands)]
+
+    entries = _drop_overwritten_loads(entries)
+    entries = _collapse_read_status(entries)
+    entries = _merge_writes(entries)
+
+    optimized_commands = []
+    response_indexes = [[] for _ in commands]
+
+    for (index, entry) in enumerate(entries):
+        optimized_commands.append((entry.address, entry.command))
+
+        for source in entry.sources:
+            response_indexes[source].append(index)
+
+    return (optimized_commands, response_indexes)
+
+def map_optimized_responses(responses, response_indexes):
+    """Map responses to optimized commands back to the original commands.
+
+    The response for each original command is the first error, or the last
+    response, of the optimized commands it maps to.
+    """
+    mapped_responses = []
+
+    for indexes in response_indexes:
+        command_responses = [responses[index] for index in indexes]
+
+        mapped_responses.append(next((response for response in command_responses if isinstance(response, BaseException)),
+                                     command_responses[-1] if command_responses else None))
+
+    return mapped_responses
+
+class _Entry:
+    def __init__(self, address, command, sources):
+        self.address = address
+        self.command = command
+        self.sources = sources
+
+def _get_load_register(command):
+    if isinstance(command, LoadAddressCounterHi):
+        return 'address_counter_hi'
+
+    if isinstance(command, LoadAddressCounterLo):
+        return 'address_counter_lo'
+
+    if isinstance(command, LoadControlRegister):
+        return 'control'
+
+    if isinstance(command, LoadSecondaryControl):
+        return 'secondary_control'
+
+    if isinstance(command, LoadMask):
+        return 'mask'
+
+    if isinstance(command, EABLoadMask):
+        return ('eab_mask', command.feature_address)
+
+    return None
+
+def _drop_overwritten_loads(entries):
+    optimized_entries = []
+
+    for (index, entry) in enumerate(entries):
+        register = _get_load_register(entry.command)
+
+        overwriting_entry = None
+
+        # Look ahead, past loads of other registers, for a load of the same
+        # register.
+        if register is not None:
+            for next_entry in entries[index + 1:]:
+                next_register = _get_load_register(next_entry.command)
+
+                if next_register is None or next_entry.address != entry.address:
+                    break
+
+                if next_register == register:
+                    overwriting_entry = next_entry
+                    break
+
+        if overwriting_entry is not None:
+            overwriting_entry.sources = entry.sources + overwriting_entry.sources
+        else:
+            optimized_entries.append(entry)
+
+    return optimized_entries
+
+def _collapse_read_status(entries):
+    optimized_entries = []
+
+    for entry in entries:
+        previous_entry = optimized_entries[-1] if optimized_entries else None
+
+        if (isinstance(entry.command, ReadStatus) and previous_entry is not None
+                and isinstance(previous_entry.command, ReadStatus) and previous_entry.address == entry.address):
+            previous_entry.sources += entry.sources
+        else:
+            optimized_entries.append(entry)
+
+    return optimized_entries
+
+def _merge_writes(entries):
+    optimized_entries = []
+
+    model = _TerminalModel()
+
+    # Address counter following the last write, and the index of the entry
+    # following it.
+    last_write_address_counter = None
+    last_write_next_index = None
+
+    for entry in entries:
+        if isinstance(entry.command, (WriteData, Data)) and last_write_next_index is not None:
+            intermediate_entries = optimized_entries[last_write_next_index:]
+
+            # Consecutive writes, or writes separated only by loads that move the
+            # address counter to where the previous write finished - unaccompanied
+            # data can only be merged with the write it directly follows.
+            is_adjacent = not intermediate_entries or (
+                isinstance(entry.command, WriteData)
+                and last_write_address_counter is not None
+                and model.get_address_counter() == last_write_address_counter
+                and all(other_entry.address == entry.address
+                        and isinstance(other_entry.command, (LoadAddressCounterHi, LoadAddressCounterLo))
+                        for other_entry in intermediate_entries))
+
+            write_entry = optimized_entries[last_write_next_index - 1]
+
+            if is_adjacent and write_entry.address == entry.address:
+                del optimized_entries[last_write_next_index:]
+
+                write_entry.command = WriteData(_get_data(write_entry.command) + _get_data(entry.command))
+
+                for other_entry in intermediate_entries:
+                    write_entry.sources += other_entry.sources
+
+                write_entry.sources += entry.sources
+
+                model.apply(entry.address, entry.command)
+
+                last_write_address_counter = model.get_address_counter()
+                last_write_next_index = len(optimized_entries)
+                continue
+
+        optimized_entries.append(entry)
+
+        model.apply(entry.address, entry.command)
+
+        if isinstance(entry.command, WriteData):
+            last_write_address_counter = model.get_address_counter()
+            last_write_next_index = len(optimized_entries)
+        elif not isinstance(entry.command, (LoadAddressCounterHi, LoadAddressCounterLo)):
+            last_write_next_index = None
+
+    return optimized_entries
+
+class _TerminalModel:
+    def __init__(self):
+        self.address = None
+
+        self.hi = None
+        self.lo = None
+
+        self.is_step_inhibited = False
+        self.mask = None
+
+    def get_address_counter(self):
+        if self.hi is None or self.lo is None:
+            return None
+
+        return (self.hi << 8) | self.lo
+
+    def apply(self, address, command):
+        # Only a single device address is tracked at a time.
+        if address != self.address:
+            self.__init__()
+
+            self.address = address
+
+        if isinstance(command, LoadAddressCounterHi):
+            self.hi = command.address
+        elif isinstance(command, LoadAddressCounterLo):
+            self.lo = command.address
+        elif isinstance(command, LoadControlRegister):
+            self.is_step_inhibited = command.control.step_inhibit
+        elif isinstance(command, LoadMask):
+            self.mask = command.mask
+        elif isinstance(command, (WriteData, Data)):
+            address_counter = self.get_address_counter()
+
+            if self.is_step_inhibited:
+                return
+
+            if address_counter is None or address_counter + _get_data_length(command.data) > 0xffff:
+                self.hi = None
+                self.lo = None
+                return
+
+            address_counter += _get_data_length(command.data)
+
+            self.hi = address_counter >> 8
+            self.lo = address_counter & 0xff
+        elif _get_load_register(command) is None:
+            self.hi = None
+            self.lo = None
+
+def _get_data(command):
+    data = command.data
+
+    if isinstance(data, tuple):
+        return bytes(data[0]) * data[1]
+
+    return bytes(data)
+
+def _get_data_length(data):
+    if isinstance(data, tuple):
+        return len(data[0]) * data[1]
+
+    return len(data)
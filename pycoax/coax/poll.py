@@ -0,0 +1,215 @@
+"""
+coax.poll
+~~~~~~~~~
+"""
+
+import time
+import queue
+import asyncio
+import threading
+
+from .protocol import PollResponse, Poll, PollAck
+from .exceptions import ReceiveTimeout
+
+class AdaptivePollInterval:
+    """Adaptive POLL interval.
+
+    The interval is reset to the minimum interval on activity and backs off
+    exponentially to the maximum interval while idle, this keeps keystroke
+    latency low while typing without polling an idle terminal continuously.
+    """
+
+    def __init__(self, min_interval=0.005, max_interval=0.05, backoff=2):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError('Invalid POLL interval range')
+
+        if backoff < 1:
+            raise ValueError('Backoff must be at least 1')
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        self.interval = min_interval
+
+    def activity(self):
+        """Reset the interval following activity."""
+        self.interval = self.min_interval
+
+        return self.interval
+
+    def idle(self):
+        """Back off the interval following an idle POLL."""
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        return self.interval
+
+class PollDriver:
+    """POLL a terminal, producing a stream of POLL responses.
+
+    Each event is a PollResponse, such as a KeystrokePollResponse, or a
+    ReceiveTimeout if the terminal did not respond. A POLL_ACK is sent in the
+    same execute as the following POLL, so acknowledging a response does not
+    cost an additional round trip.
+
+    Events can be consumed through a callback, by iterating or, for asyncio
+    interfaces, by asynchronous iteration - in these cases POLLing is paused
+    while the consumer is busy. Alternatively, start POLLing in a background
+    thread with events buffered up to max_events; POLLing is paused while the
+    buffer is full, unacknowledged keystrokes are held by the terminal.
+    """
+
+    def __init__(self, interface, address=None, min_interval=0.005, max_interval=0.05,
+                 timeout=None, max_events=64):
+        self.interface = interface
+        self.address = address
+        self.interval = AdaptivePollInterval(min_interval, max_interval)
+        self.timeout = timeout
+
+        self.needs_ack = False
+
+        self._events = queue.Queue(max_events)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """POLL once, acknowledging the previous response if required, and
+        return the event or None if there was no response."""
+        commands = self._get_commands()
+
+        responses = self.interface.execute(commands, timeout=self.timeout)
+
+        return self._handle_responses(responses)
+
+    async def poll_async(self):
+        """POLL once using an asyncio interface, see poll()."""
+        commands = self._get_commands()
+
+        responses = await self.interface.execute(commands, timeout=self.timeout)
+
+        return self._handle_responses(responses)
+
+    def __iter__(self):
+        while True:
+            event = self.poll()
+
+            if event is not None:
+                yield event
+
+            # POLL again immediately following a response, to acknowledge it.
+            if not isinstance(event, PollResponse):
+                time.sleep(self.interval.interval)
+
+    async def __aiter__(self):
+        while True:
+            event = await self.poll_async()
+
+            if event is not None:
+                yield event
+
+            # POLL again immediately following a response, to acknowledge it.
+            if not isinstance(event, PollResponse):
+                await asyncio.sleep(self.interval.interval)
+
+    def run(self, callback, stop_event=None):
+        """POLL until the stop event is set, calling callback for each event."""
+        while stop_event is None or not stop_event.is_set():
+            event = self.poll()
+
+            if event is not None:
+                callback(event)
+
+            # POLL again immediately following a response, to acknowledge it.
+            if not isinstance(event, PollResponse):
+                time.sleep(self.interval.interval)
+
+    def start(self):
+        """Start POLLing in a background thread."""
+        if self._thread is not None:
+            raise RuntimeError('POLLing already started')
+
+        self._stop_event.clear()
+
+        self._thread = threading.Thread(target=self._run, name='PollDriver', daemon=True)
+
+        self._thread.start()
+
+    def stop(self):
+        """Stop POLLing in the background thread."""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+
+        self._thread.join()
+
+        self._thread = None
+
+    def get_event(self, timeout=None):
+        """Get the next buffered event, returns None if the timeout expires."""
+        try:
+            event = self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        # Errors raised by the interface are passed through the buffer.
+        if isinstance(event, _PollError):
+            raise event.error
+
+        return event
+
+    def _run(self):
+        try:
+            self.run(self._put_event, self._stop_event)
+        except Exception as error:
+            self._put_event(_PollError(error))
+
+    def _put_event(self, event):
+        while not self._stop_event.is_set():
+            try:
+                self._events.put(event, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _get_commands(self):
+        commands = []
+
+        if self.needs_ack:
+            commands.append((self.address, PollAck()))
+
+        commands.append((self.address, Poll()))
+
+        return commands
+
+    def _handle_responses(self, responses):
+        if self.needs_ack:
+            # If the acknowledgement failed the terminal will respond with the
+            # same response again.
+            if isinstance(responses[0], BaseException):
+                return None
+
+            self.needs_ack = False
+
+        response = responses[-1]
+
+        if response is None:
+            self.interval.idle()
+            return None
+
+        if isinstance(response, ReceiveTimeout):
+            self.interval.idle()
+            return response
+
+        if isinstance(response, BaseException):
+            raise response
+
+        self.needs_ack = True
+
+        self.interval.activity()
+
+        return response
+
+class _PollError:
+    def __init__(self, error):
+        self.error = error
@@ -3,7 +3,9 @@ coax.protocol
 ~~~~~~~~~~~~~
 """
 
+import sys
 from enum import Enum
+from array import array
 
 from .parity import odd_parity
 from .exceptions import ProtocolError
@@ -62,8 +64,46 @@ class PollAction(Enum):
     ENABLE_KEYBOARD_CLICKER = 0x3
     DISABLE_KEYBOARD_CLICKER = 0x1
 
-class PollResponse:
-    """Terminal POLL response."""
+class _Immutable:
+    """Base class for immutable objects, attributes can only be set when
+    initializing - until _freeze() is called at the end of __init__()."""
+
+    __slots__ = ('_is_frozen',)
+
+    def _freeze(self):
+        object.__setattr__(self, '_is_frozen', True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_is_frozen', False):
+            raise AttributeError(f'{type(self).__name__} is immutable')
+
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    # Copying an immutable object returns the object itself, unpickling
+    # restores the attributes without going through __setattr__().
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __setstate__(self, state):
+        (_, slots) = state
+
+        for (name, value) in slots.items():
+            object.__setattr__(self, name, value)
+
+class PollResponse(_Immutable):
+    """Terminal POLL response.
+
+    Responses are immutable, responses unpacked by POLL are shared from a
+    table of all response words.
+    """
+
+    __slots__ = ('value',)
 
     @staticmethod
     def is_power_on_reset_complete(value):
@@ -78,9 +118,13 @@ class PollResponse:
     def __init__(self, value):
         self.value = value
 
+        self._freeze()
+
 class PowerOnResetCompletePollResponse(PollResponse):
     """Terminal power-on-reset complete poll response."""
 
+    __slots__ = ()
+
     def __init__(self, value):
         if not PollResponse.is_power_on_reset_complete(value):
             raise ValueError(f'Invalid POR poll response: {value}')
@@ -90,28 +134,38 @@ class PowerOnResetCompletePollResponse(PollResponse):
 class KeystrokePollResponse(PollResponse):
     """Terminal keystroke poll response."""
 
+    __slots__ = ('scan_code',)
+
     def __init__(self, value):
         if not PollResponse.is_keystroke(value):
             raise ValueError(f'Invalid keystroke poll response: {value}')
 
-        super().__init__(value)
-
+        # The scan code is set before the response is frozen.
         self.scan_code = (value >> 2) & 0xff
 
+        super().__init__(value)
+
     def __repr__(self):
         return f'<KeystrokePollResponse scan_code={self.scan_code}>'
 
-class Status:
-    """Terminal status."""
+class Status(_Immutable):
+    """Terminal status.
+
+    Status is immutable, status unpacked by READ_STATUS is shared from a table
+    of all status values.
+    """
+
+    __slots__ = ('value', 'monocase', 'busy', 'feature_error', 'operation_complete')
 
     def __init__(self, value):
         self.value = value
-
         self.monocase = bool(value & 0x80)
         self.busy = not bool(value & 0x20)
         self.feature_error = bool(value & 0x04)
         self.operation_complete = bool(value & 0x02)
 
+        self._freeze()
+
     def __repr__(self):
         return (f'<Status monocase={self.monocase}, busy={self.busy}, '
                 f'feature_error={self.feature_error}, '
@@ -123,8 +177,14 @@ class TerminalType(Enum):
     CUT = 1
     DFT = 2
 
-class TerminalId:
-    """Terminal model and keyboard."""
+class TerminalId(_Immutable):
+    """Terminal model and keyboard.
+
+    Terminal identifiers are immutable, identifiers unpacked by
+    READ_TERMINAL_ID are shared from a table of all valid identifiers.
+    """
+
+    __slots__ = ('value', 'type', 'model', 'keyboard')
 
     _MODEL_MAP = {
         0b010: 2,
@@ -134,25 +194,26 @@ class TerminalId:
     }
 
     def __init__(self, value):
-        self.value = value
-
         if (value & 0x1) == 0:
-            self.type = TerminalType.CUT
-
             model = (value & 0x0e) >> 1
 
             if model not in TerminalId._MODEL_MAP:
                 raise ValueError(f'Invalid model: {model}')
 
+            self.value = value
+            self.type = TerminalType.CUT
             self.model = TerminalId._MODEL_MAP[model]
             self.keyboard = (value & 0xf0) >> 4
         elif value == 1:
+            self.value = value
             self.type = TerminalType.DFT
             self.model = None
             self.keyboard = None
         else:
             raise ValueError(f'Invalid terminal identifier: {value}')
 
+        self._freeze()
+
     def __repr__(self):
         return (f'<TerminalId type={self.type.name}, model={self.model}, '
                 f'keyboard={self.keyboard}>')
@@ -243,13 +304,12 @@ class Poll(ReadCommand):
 
         word = words[0]
 
-        if PollResponse.is_power_on_reset_complete(word):
-            return PowerOnResetCompletePollResponse(word)
+        poll_response = _lookup_word(_POLL_RESPONSE_TABLE, word)
 
-        if PollResponse.is_keystroke(word):
-            return KeystrokePollResponse(word)
+        if poll_response is None:
+            return _unpack_poll_response(word)
 
-        return PollResponse(word)
+        return poll_response
 
 class PollAck(WriteCommand):
     """POLL_ACK command."""
@@ -273,7 +333,12 @@ class ReadStatus(ReadCommand):
         if len(words) != 1:
             raise ProtocolError(f'Expected 1 word READ_STATUS response: {words}')
 
-        return Status(unpack_data_word(words[0]))
+        status = _lookup_word(_STATUS_TABLE, words[0])
+
+        if status is None:
+            return Status(unpack_data_word(words[0]))
+
+        return status
 
 class ReadTerminalId(ReadCommand):
     """READ_TERMINAL_ID command."""
@@ -289,7 +354,12 @@ class ReadTerminalId(ReadCommand):
         if len(words) != 1:
             raise ProtocolError(f'Expected 1 word READ_TERMINAL_ID response: {words}')
 
-        return TerminalId(unpack_data_word(words[0]))
+        terminal_id = _lookup_word(_TERMINAL_ID_TABLE, words[0])
+
+        if terminal_id is None:
+            return TerminalId(unpack_data_word(words[0]))
+
+        return terminal_id
 
 class ReadExtendedId(ReadCommand):
     """READ_EXTENDED_ID command."""
@@ -637,6 +707,24 @@ class Data(WriteCommand):
     def pack_outbound_frame(self):
         return (FrameFormat.DATA, self.data)
 
+class Slot(int):
+    """Named placeholder for a data byte in a compiled program, such as an
+    address counter value, provided each time the program is executed.
+
+    A slot is accepted anywhere a data byte value is, it has the value 0.
+    """
+
+    def __new__(cls, name):
+        return super().__new__(cls, 0)
+
+    def __init__(self, name):
+        super().__init__()
+
+        self.name = name
+
+    def __repr__(self):
+        return f'<Slot name={self.name}>'
+
 def pack_command_word(command, feature_address=None):
     """Pack a command into a 10-bit command word."""
     if feature_address is not None and (feature_address < 2 or feature_address > 15):
@@ -677,4 +765,95 @@ def pack_data_words(bytes_, set_parity=True):
 
 def unpack_data_words(words, check_parity=False):
     """Unpack the data bytes from 10-bit data words."""
+    # Words received by an interface are an array, which is unpacked directly
+    # from its buffer.
+    if isinstance(words, array) and words.typecode == 'H':
+        bytes_ = _unpack_data_word_buffer(words.tobytes(), check_parity)
+
+        if bytes_ is not None:
+            return bytes_
+    else:
+        table = _UNPACK_DATA_WORD_PARITY_TABLE if check_parity else _UNPACK_DATA_WORD_TABLE
+
+        try:
+            return bytes(map(table.__getitem__, words))
+        except (IndexError, TypeError):
+            pass
+
+    # Invalid words are unpacked individually to determine the error.
     return bytes([unpack_data_word(word, check_parity=check_parity) for word in words])
+
+def _unpack_data_word_buffer(buffer, check_parity):
+    # Split the native order 16-bit words into low and high bytes.
+    if sys.byteorder == 'little':
+        (lo, hi) = (buffer[0::2], buffer[1::2])
+    else:
+        (lo, hi) = (buffer[1::2], buffer[0::2])
+
+    # Check that all words are 10-bit words with the data word bit clear.
+    if lo.translate(None, _DATA_WORD_LO_BYTES) or hi.translate(None, _DATA_WORD_HI_BYTES):
+        return None
+
+    # The data byte is the low 6 bits of the data from the low byte and the
+    # high 2 bits from the high byte, these are combined as integers.
+    bytes_ = (int.from_bytes(lo.translate(_UNPACK_DATA_WORD_LO_TABLE), 'little') |
+              int.from_bytes(hi.translate(_UNPACK_DATA_WORD_HI_TABLE), 'little')).to_bytes(len(lo), 'little')
+
+    if check_parity and lo.translate(_PARITY_BIT_TABLE) != bytes_.translate(_ODD_PARITY_TABLE):
+        return None
+
+    return bytes_
+
+def _unpack_data_word_table(check_parity):
+    table = []
+
+    for word in range(1024):
+        try:
+            table.append(unpack_data_word(word, check_parity=check_parity))
+        except ProtocolError:
+            table.append(None)
+
+    return table
+
+_UNPACK_DATA_WORD_TABLE = _unpack_data_word_table(False)
+_UNPACK_DATA_WORD_PARITY_TABLE = _unpack_data_word_table(True)
+
+# Tables for unpacking the low and high bytes of data words in bulk.
+_DATA_WORD_LO_BYTES = bytes(range(0, 256, 2))
+_DATA_WORD_HI_BYTES = bytes(range(4))
+
+_UNPACK_DATA_WORD_LO_TABLE = bytes([byte >> 2 for byte in range(256)])
+_UNPACK_DATA_WORD_HI_TABLE = bytes([(byte & 0x3) << 6 for byte in range(256)])
+
+_PARITY_BIT_TABLE = bytes([(byte >> 1) & 0x1 for byte in range(256)])
+_ODD_PARITY_TABLE = bytes([odd_parity(byte) for byte in range(256)])
+
+def _unpack_poll_response(word):
+    if PollResponse.is_power_on_reset_complete(word):
+        return PowerOnResetCompletePollResponse(word)
+
+    if PollResponse.is_keystroke(word):
+        return KeystrokePollResponse(word)
+
+    return PollResponse(word)
+
+def _lookup_word(table, word):
+    if 0 <= word < len(table):
+        return table[word]
+
+    return None
+
+def _terminal_id_or_none(value):
+    try:
+        return TerminalId(value)
+    except ValueError:
+        return None
+
+# Shared responses for each 10-bit word - words that are not valid data words,
+# or terminal identifiers, are None and unpacked individually to determine the
+# error.
+_POLL_RESPONSE_TABLE = [_unpack_poll_response(word) for word in range(1024)]
+
+_STATUS_TABLE = [Status(value) if value is not None else None for value in _UNPACK_DATA_WORD_TABLE]
+
+_TERMINAL_ID_TABLE = [_terminal_id_or_none(value) if value is not None else None for value in _UNPACK_DATA_WORD_TABLE]
@@ -0,0 +1,186 @@
+"""
+coax.scheduler
+~~~~~~~~~~~~~~
+"""
+
+import heapq
+import threading
+from enum import IntEnum
+from itertools import count
+from concurrent.futures import Future
+
+from .interface import _normalize_commands, _get_execute_result
+
+class Priority(IntEnum):
+    """Command batch priority, lower values are executed first."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+class CommandScheduler:
+    """Thread-safe command queue for a single interface.
+
+    A worker thread owns the interface and executes batches of commands
+    submitted from any thread, in priority order. Batches are split at command
+    boundaries and executed in steps of at most max_step_commands commands, so
+    a high priority batch only ever waits for the step in progress - this
+    defaults to the interface pipeline depth.
+
+    Higher priority batches can be executed between any two steps of a batch,
+    and may change terminal state such as the address counter or mask. A batch
+    that depends on terminal state across step boundaries, for example loading
+    the address counter and then writing data, must be submitted as atomic -
+    an atomic batch is executed to completion once started.
+    """
+
+    def __init__(self, interface, max_step_commands=None):
+        if max_step_commands is None:
+            max_step_commands = getattr(interface, 'pipeline_depth', 1)
+
+        if max_step_commands < 1:
+            raise ValueError('Maximum step commands must be at least 1')
+
+        self.interface = interface
+        self.max_step_commands = max_step_commands
+
+        self._queue = []
+        self._sequence = count()
+        self._condition = threading.Condition()
+        self._is_closed = False
+
+        self._thread = threading.Thread(target=self._run, name='CommandScheduler', daemon=True)
+
+        self._thread.start()
+
+    def submit(self, commands, priority=Priority.NORMAL, timeout=None, atomic=False):
+        """Submit one or more commands for execution, returning a future.
+
+        If atomic is true no other batch is executed between the steps of this
+        batch.
+        """
+        (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
+
+        batch = _Batch(normalized_commands, has_multiple_commands, timeout, atomic)
+
+        with self._condition:
+            if self._is_closed:
+                raise RuntimeError('Scheduler is closed')
+
+            # The sequence number keeps batches of equal priority in submission order.
+            heapq.heappush(self._queue, (priority, next(self._sequence), batch))
+
+            self._condition.notify()
+
+        return batch.future
+
+    def execute(self, commands, priority=Priority.NORMAL, timeout=None, atomic=False):
+        """Execute one or more commands, waiting for the result."""
+        return self.submit(commands, priority, timeout, atomic).result()
+
+    def close(self):
+        """Stop the worker thread, cancelling any batches not started."""
+        with self._condition:
+            self._is_closed = True
+
+            self._condition.notify()
+
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        # Started atomic batch, which is executed before any other batch.
+        atomic_entry = None
+
+        while True:
+            with self._condition:
+                while not self._queue and not self._is_closed:
+                    self._condition.wait()
+
+                if self._is_closed:
+                    break
+
+                entry = atomic_entry if atomic_entry is not None else self._queue[0]
+
+                (_, _, batch) = entry
+
+                if not batch.is_started:
+                    if not batch.future.set_running_or_notify_cancel():
+                        heapq.heappop(self._queue)
+                        continue
+
+                    batch.is_started = True
+
+            self._execute_step(batch)
+
+            # The batch keeps its place in the queue until it is complete, even
+            # if other batches were submitted during the step.
+            if batch.is_complete:
+                atomic_entry = None
+
+                with self._condition:
+                    self._queue.remove(entry)
+
+                    heapq.heapify(self._queue)
+            elif batch.is_atomic:
+                atomic_entry = entry
+
+        self._cancel_pending()
+
+    def _execute_step(self, batch):
+        commands = batch.commands[batch.index:batch.index + self.max_step_commands]
+
+        try:
+            responses = self.interface._execute(commands, batch.timeout)
+        except BaseException as error:
+            batch.is_complete = True
+
+            batch.future.set_exception(error)
+            return
+
+        batch.responses.extend(responses)
+        batch.index += len(commands)
+
+        if batch.index < len(batch.commands):
+            return
+
+        batch.is_complete = True
+
+        try:
+            result = _get_execute_result(batch.responses, batch.has_multiple_commands)
+        except BaseException as error:
+            batch.future.set_exception(error)
+            return
+
+        batch.future.set_result(result)
+
+    def _cancel_pending(self):
+        with self._condition:
+            for (_, _, batch) in self._queue:
+                if batch.is_started:
+                    batch.future.set_exception(RuntimeError('Scheduler is closed'))
+                else:
+                    batch.future.cancel()
+
+            self._queue.clear()
+
+class _Batch:
+    def __init__(self, commands, has_multiple_commands, timeout, is_atomic):
+        self.commands = commands
+        self.has_multiple_commands = has_multiple_commands
+        self.timeout = timeout
+        self.is_atomic = is_atomic
+
+        self.future = Future()
+
+        self.index = 0
+        self.responses = []
+
+        self.is_started = False
+        self.is_complete = False
@@ -0,0 +1,220 @@
+"""
+coax.screen
+~~~~~~~~~~~
+"""
+
+from heapq import merge
+
+from .protocol import LoadAddressCounterHi, LoadAddressCounterLo, WriteData, EABWriteAlternate, \
+                      EABLoadMask, EABWriteUnderMask
+
+class Screen:
+    """Host-side shadow of a terminal regen buffer.
+
+    The shadow covers size bytes of the regen buffer starting at address, an
+    update only writes the changed bytes. Changed runs are merged when the
+    gap between them is shorter than the address cost - the cost, in bytes,
+    of loading the address counter and starting a new WRITE_DATA.
+
+    If the EAB feature address is provided, the extended attribute buffer is
+    also shadowed. Each changed run is written using WRITE_DATA if only the
+    regen buffer changed and EAB_WRITE_ALTERNATE if both changed. If only the
+    EAB changed, and the changed bits are covered by the mask loaded using
+    load_eab_mask, the cheaper of EAB_WRITE_ALTERNATE and EAB_WRITE_UNDER_MASK
+    is used - the frame cost is the cost, in words, of each additional
+    command.
+
+    The shadow assumes the address counter is incremented on write, it is
+    unknown until the first update and must be invalidated if the regen
+    buffer is written by other means.
+    """
+
+    def __init__(self, size, address=0, device_address=None, address_cost=24,
+                 eab_feature_address=None, frame_cost=8):
+        if size < 1:
+            raise ValueError('Size must be at least 1')
+
+        if address < 0 or address + size > 0xffff:
+            raise ValueError('Address is out of range')
+
+        self.size = size
+        self.address = address
+        self.device_address = device_address
+        self.address_cost = address_cost
+        self.eab_feature_address = eab_feature_address
+        self.frame_cost = frame_cost
+
+        self.buffer = None
+        self.eab_buffer = None
+        self.eab_mask = None
+
+    def invalidate(self):
+        """Mark the terminal regen buffer as unknown, the next update will
+        write all bytes."""
+        self.buffer = None
+        self.eab_buffer = None
+        self.eab_mask = None
+
+    def plan(self, frame, eab_frame=None):
+        """Get the commands required to update the terminal to the frame."""
+        (frame, eab_frame) = self._validate_frames(frame, eab_frame)
+
+        commands = []
+
+        address_counter = None
+
+        for (start, end) in self._get_changed_runs(frame, eab_frame):
+            address = self.address + start
+
+            if address_counter is None or (address >> 8) != (address_counter >> 8):
+                commands.append(LoadAddressCounterHi(address >> 8))
+
+            if address_counter is None or (address & 0xff) != (address_counter & 0xff):
+                commands.append(LoadAddressCounterLo(address & 0xff))
+
+            self._plan_run(commands, frame, eab_frame, start, end)
+
+            address_counter = self.address + end
+
+        if self.device_address is not None:
+            commands = [(self.device_address, command) for command in commands]
+
+        return commands
+
+    def update(self, interface, frame, eab_frame=None):
+        """Update the terminal to the frame, returning the commands executed."""
+        (frame, eab_frame) = self._validate_frames(frame, eab_frame)
+
+        commands = self.plan(frame, eab_frame)
+
+        if not commands:
+            return commands
+
+        try:
+            responses = interface.execute(commands)
+        except BaseException:
+            self.invalidate()
+            raise
+
+        error = next((response for response in responses if isinstance(response, BaseException)), None)
+
+        if error is not None:
+            self.invalidate()
+            raise error
+
+        self.buffer = frame
+        self.eab_buffer = eab_frame
+
+        return commands
+
+    def load_eab_mask(self, interface, mask):
+        """Load the EAB mask, allowing changes to only the masked EAB bits to
+        be written using EAB_WRITE_UNDER_MASK."""
+        command = EABLoadMask(self.eab_feature_address, mask)
+
+        if self.device_address is not None:
+            command = (self.device_address, command)
+
+        self.eab_mask = None
+
+        interface.execute(command)
+
+        self.eab_mask = mask
+
+    def _validate_frames(self, frame, eab_frame):
+        frame = bytes(frame)
+
+        if len(frame) != self.size:
+            raise ValueError(f'Frame must be {self.size} bytes')
+
+        if self.eab_feature_address is None:
+            if eab_frame is not None:
+                raise ValueError('EAB frame requires EAB feature address')
+
+            return (frame, None)
+
+        if eab_frame is None:
+            raise ValueError('EAB frame is required')
+
+        eab_frame = bytes(eab_frame)
+
+        if len(eab_frame) != self.size:
+            raise ValueError(f'EAB frame must be {self.size} bytes')
+
+        return (frame, eab_frame)
+
+    def _get_changed_runs(self, frame, eab_frame):
+        if self.buffer is None:
+            return [(0, self.size)]
+
+        changes = _find_changes(self.buffer, frame)
+
+        if eab_frame is not None:
+            changes = merge(changes, _find_changes(self.eab_buffer, eab_frame))
+
+        runs = []
+
+        for index in changes:
+            # Merge with the previous run if the gap is cheaper to resend than
+            # to address.
+            if runs and index - runs[-1][1] < self.address_cost:
+                runs[-1][1] = max(runs[-1][1], index + 1)
+            else:
+                runs.append([index, index + 1])
+
+        return [(start, end) for (start, end) in runs]
+
+    def _plan_run(self, commands, frame, eab_frame, start, end):
+        data = frame[start:end]
+
+        if eab_frame is None:
+            commands.append(WriteData(data))
+            return
+
+        eab_data = eab_frame[start:end]
+
+        if self.buffer is not None:
+            if self.eab_buffer[start:end] == eab_data:
+                commands.append(WriteData(data))
+                return
+
+            if self.buffer[start:end] == data:
+                mask = 0
+
+                for (old, new) in zip(self.eab_buffer[start:end], eab_data):
+                    mask |= old ^ new
+
+                # Costs in words, each EAB_WRITE_UNDER_MASK is a command word
+                # and data word.
+                alternate_cost = self.frame_cost + 1 + (len(data) * 2)
+                under_mask_cost = len(data) * (self.frame_cost + 2)
+
+                # The loaded mask can be used if it covers all changed bits.
+                if self.eab_mask is not None and (mask & ~self.eab_mask) == 0 and under_mask_cost < alternate_cost:
+                    commands.extend(EABWriteUnderMask(self.eab_feature_address, byte) for byte in eab_data)
+                    return
+
+        commands.append(EABWriteAlternate(self.eab_feature_address, _interleave(data, eab_data)))
+
+def _interleave(data, eab_data):
+    interleaved = bytearray(len(data) * 2)
+
+    interleaved[0::2] = data
+    interleaved[1::2] = eab_data
+
+    return bytes(interleaved)
+
+# Unchanged blocks are skipped by comparing slices, only changed blocks are
+# compared byte by byte.
+_BLOCK_SIZE = 64
+
+def _find_changes(a, b):
+    for block_start in range(0, len(a), _BLOCK_SIZE):
+        block_end = block_start + _BLOCK_SIZE
+
+        if a[block_start:block_end] == b[block_start:block_end]:
+            continue
+
+        for index in range(block_start, min(block_end, len(a))):
+            if a[index] != b[index]:
+                yield index
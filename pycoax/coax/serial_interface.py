@@ -3,33 +3,62 @@ coax.serial_interface
 ~~~~~~~~~~~~~~~~~~~~~
 """
 
+import sys
 import time
 import os
+import re
 import struct
+from array import array
 from copy import copy
+from collections import deque
 from contextlib import contextmanager
 from serial import Serial, SerialException
-from sliplib import SlipWrapper, ProtocolError
+from sliplib import encode, ProtocolError
 
-from .interface import Interface, InterfaceFeature, normalize_frame
+from .interface import Interface, InterfaceFeature, _normalize_commands, _get_execute_result, \
+                       _pack_outbound_frames, _unpack_inbound_frames
+from .protocol import FrameFormat, Command, Slot, pack_data_word
 from .exceptions import InterfaceError, InterfaceTimeout, ReceiveError, ReceiveTimeout
 
 class SerialInterface(Interface):
-    """Serial attached 3270 coax interface."""
+    """Serial attached 3270 coax interface.
 
-    def __init__(self, serial):
+    The pipeline depth controls how many messages are sent to the interface
+    before waiting for a response, this requires interface firmware that
+    applies back pressure while a message is being processed.
+
+    If compress is true, long runs of repeated data in outbound frames are sent
+    as separate repeat frames which are expanded by the interface.
+
+    If a trace recorder is provided all messages sent and received are
+    recorded, see coax.trace.
+    """
+
+    def __init__(self, serial, pipeline_depth=1, compress=False, trace_recorder=None):
         if serial is None:
             raise ValueError('Serial port is required')
 
+        if pipeline_depth < 1:
+            raise ValueError('Pipeline depth must be at least 1')
+
         super().__init__()
 
         self.serial = serial
+        self.pipeline_depth = pipeline_depth
+        self.compress = compress
+        self.trace_recorder = trace_recorder
 
         self.slip_serial = SlipSerial(self.serial)
 
+        self._message_ids = _MessageIds()
+
         self.legacy_firmware_detected = None
         self.legacy_firmware_version = None
 
+        self.hardware_type = None
+        self.firmware_version = None
+        self.message_buffer_size = None
+
     def reset(self):
         """Reset the interface."""
         original_serial_timeout = self.serial.timeout
@@ -38,6 +67,8 @@ class SerialInterface(Interface):
 
         self.serial.reset_input_buffer()
 
+        self._message_ids.clear()
+
         self._write_message(bytes([0x01]))
 
         try:
@@ -47,26 +78,17 @@ class SerialInterface(Interface):
 
             self.serial.reset_input_buffer()
 
-        if message[0] != 0x01:
-            raise _convert_error(message)
+        (self.legacy_firmware_detected, self.legacy_firmware_version) = _parse_reset_response(message)
 
-        if message[1:] == b'\x32\x70':
-            self.legacy_firmware_detected = False
-            self.legacy_firmware_version = None
-        elif len(message) == 4:
-            (major, minor, patch) = struct.unpack('BBB', message[1:])
+        self.features = set()
 
-            self.legacy_firmware_detected = True
-            self.legacy_firmware_version = f'{major}.{minor}.{patch}'
-        else:
-            raise InterfaceError(f'Invalid reset response: {message}')
+        self.hardware_type = None
+        self.firmware_version = None
+        self.message_buffer_size = None
 
-        # Query features, if this is not a legacy firmware.
+        # Query capabilities, if this is not a legacy firmware.
         if not self.legacy_firmware_detected:
-            try:
-                self.features = self._get_features()
-            except InterfaceError:
-                pass
+            self._negotiate()
 
     def enter_dfu_mode(self):
         """Enter device firmware upgrade mode."""
@@ -79,22 +101,31 @@ class SerialInterface(Interface):
         if message[0] != 0x01:
             raise _convert_error(message)
 
-    def _get_features(self):
-        """Get interface features."""
-        message = bytes([0xf0, 0x07])
+    def _negotiate(self):
+        """Query and cache interface capabilities."""
+        try:
+            supported_queries = self._get_info(INFO_SUPPORTED_QUERIES, _parse_supported_queries_response)
+        except InterfaceError:
+            supported_queries = {INFO_FEATURES}
 
-        self._write_message(message)
+        for (query, (name, parse)) in _NEGOTIATED_INFO_QUERIES.items():
+            if query not in supported_queries:
+                continue
 
-        message = self._read_message()
+            try:
+                setattr(self, name, self._get_info(query, parse))
+            except InterfaceError:
+                pass
 
-        if message[0] != 0x01:
-            raise _convert_error(message)
+    def _get_info(self, query, parse):
+        """Get interface information."""
+        message = bytes([0xf0, query])
 
-        known_feature_values = {feature.value for feature in InterfaceFeature}
+        self._write_message(message)
 
-        features = {InterfaceFeature(value) for value in message[1:] if value in known_feature_values}
+        message = self._read_message()
 
-        return features
+        return parse(message)
 
     def _transmit_receive(self, outbound_frames, response_lengths, timeout):
         if len(response_lengths) != len(outbound_frames):
@@ -103,31 +134,128 @@ class SerialInterface(Interface):
         if any(address is not None for (address, _) in outbound_frames) and InterfaceFeature.PROTOCOL_3299 not in self.features:
             raise NotImplementedError('Interface does not support 3299 protocol')
 
+        # Split frames that would overflow the interface message buffer.
+        (outbound_frames, response_lengths, split_counts) = _split_outbound_frames(outbound_frames, response_lengths,
+                                                                                   self.message_buffer_size, self.compress)
+
         # Pack all messages before sending.
         timeout_milliseconds = self._calculate_timeout_milliseconds(timeout)
 
         messages = [_pack_transmit_receive_message(address, frame, response_length, timeout_milliseconds)
                     for ((address, frame), response_length) in zip(outbound_frames, response_lengths)]
 
+        execution = self._execution
+
+        if execution is not None:
+            execution.packed = time.perf_counter()
+
+        responses = self._transmit_receive_messages(messages, self._write_message)
+
+        if execution is not None:
+            execution.command_times = _merge_split_message_times(execution.command_times, split_counts)
+
+        return _merge_split_responses(responses, split_counts)
+
+    def compile(self, commands, timeout=None):
+        """Compile one or more commands into a program that can be executed
+        repeatedly using execute_program().
+
+        Commands are packed, split and SLIP encoded once, data bytes can be
+        provided as a Slot to be filled in when the program is executed. The
+        program is specific to this interface and must be compiled again
+        following a reset.
+        """
+        (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
+
+        if any(address is not None for (address, _) in normalized_commands) and InterfaceFeature.PROTOCOL_3299 not in self.features:
+            raise NotImplementedError('Interface does not support 3299 protocol')
+
+        timeout_milliseconds = self._calculate_timeout_milliseconds(timeout)
+
+        return _compile_program(normalized_commands, has_multiple_commands, timeout_milliseconds,
+                                self.message_buffer_size, self.compress)
+
+    def execute_program(self, program, values=None):
+        """Execute a compiled program, values maps each slot name to a data
+        byte."""
+        values = program.check_values(values)
+
+        responses = self._transmit_receive_messages(program.messages,
+                                                    lambda message: self._write_compiled_message(message, values))
+
+        inbound_frames = _merge_split_responses(responses, program.split_counts)
+
+        responses = _unpack_inbound_frames(inbound_frames, program.commands)
+
+        return _get_execute_result(responses, program.has_multiple_commands)
+
+    def _transmit_receive_messages(self, messages, write_message):
         responses = []
 
-        for message in messages:
-            self._write_message(message)
+        send_index = 0
+        in_flight_count = 0
+        interface_error = None
 
-            message = self._read_message()
+        # Message timings are only recorded while an execution is observed.
+        execution = self._execution
 
-            if message[0] == 0x01:
-                response = _unpack_transmit_receive_response(message[1:])
-            else:
-                error = _convert_error(message)
+        if execution is not None:
+            written_times = []
+            message_times = execution.command_times = []
 
-                if not isinstance(error, (ReceiveError, ReceiveTimeout)):
-                    raise error
+            bytes_sent = self.slip_serial.bytes_sent
+            bytes_received = self.slip_serial.bytes_received
 
-                response = error
+        # Keep up to pipeline_depth messages in flight, responses are returned
+        # by the interface in the order the messages were sent.
+        while in_flight_count > 0 or (interface_error is None and send_index < len(messages)):
+            # Messages sent together are written to the serial port at once.
+            with self.slip_serial.coalesce():
+                while (interface_error is None and send_index < len(messages)
+                       and in_flight_count < self.pipeline_depth):
+                    write_message(messages[send_index])
+
+                    send_index += 1
+                    in_flight_count += 1
+
+            if execution is not None:
+                written_times += [time.perf_counter()] * (send_index - len(written_times))
+
+                execution.written = written_times[0]
+                execution.bytes_written = self.slip_serial.bytes_sent - bytes_sent
+
+            try:
+                message = self._read_message()
+            except BaseException:
+                # Any responses to messages in flight will be discarded as stale.
+                self._message_ids.clear()
+                raise
+
+            in_flight_count -= 1
+
+            if execution is not None:
+                message_times.append((written_times[len(message_times)], self.slip_serial.first_byte_time,
+                                      time.perf_counter()))
+
+                execution.first_byte = message_times[0][1]
+                execution.bytes_read = self.slip_serial.bytes_received - bytes_received
+
+            response = _parse_transmit_receive_response(message)
+
+            if isinstance(response, InterfaceError):
+                # Stop sending but continue to receive the responses for
+                # messages already in flight so that the next exchange
+                # does not receive a stale response.
+                if interface_error is None:
+                    interface_error = response
+
+                continue
 
             responses.append(response)
 
+        if interface_error is not None:
+            raise interface_error
+
         return responses
 
     def _calculate_timeout_milliseconds(self, timeout):
@@ -142,30 +270,42 @@ class SerialInterface(Interface):
         return milliseconds
 
     def _read_message(self):
-        try:
-            message = self.slip_serial.recv_msg()
-        except ProtocolError:
-            raise InterfaceError('SLIP protocol error')
+        while True:
+            try:
+                message = self.slip_serial.recv_msg()
+            except ProtocolError:
+                raise InterfaceError('SLIP protocol error')
 
-        if len(message) < 4:
-            raise InterfaceError(f'Invalid response message: {message}')
+            if self.trace_recorder is not None and message:
+                self.trace_recorder.record(TRACE_RECEIVED, message)
 
-        (length,) = struct.unpack('>H', message[:2])
+            (message, message_id) = _unpack_message(message)
 
-        if length != len(message) - 4:
-            raise InterfaceError('Response message length mismatch')
+            if self._message_ids.match(message_id):
+                return message
 
-        if length < 1:
-            raise InterfaceError('Empty response message')
+    def _write_message(self, message):
+        message_id = self._message_ids.allocate()
 
-        return message[2:-2]
+        message = _pack_message(message, message_id)
 
-    def _write_message(self, message):
-        self.slip_serial.send_msg(struct.pack('>H', len(message)) + message +
-                                  struct.pack('>H', 0))
+        if self.trace_recorder is not None:
+            self.trace_recorder.record(TRACE_SENT, message)
+
+        self.slip_serial.send_msg(message)
+
+    def _write_compiled_message(self, message, values):
+        message_id = self._message_ids.allocate()
+
+        packet = message.encode(values, message_id)
+
+        if self.trace_recorder is not None:
+            self.trace_recorder.record(TRACE_SENT, _slip_unescape(bytes(packet).strip(bytes([SLIP_END]))))
+
+        self.slip_serial.send_bytes(packet)
 
 @contextmanager
-def open_serial_interface(serial_port, reset=True):
+def open_serial_interface(serial_port, reset=True, pipeline_depth=1, compress=False):
     """Opens serial port and initializes serial attached 3270 coax interface."""
     with WindowsSafeSerial(serial_port, 115200) as serial:
         serial.reset_input_buffer()
@@ -176,41 +316,641 @@ def open_serial_interface(serial_port, reset=True):
         if 'COAX_FAST_START' not in os.environ:
             time.sleep(3)
 
-        interface = SerialInterface(serial)
+        interface = SerialInterface(serial, pipeline_depth=pipeline_depth, compress=compress)
 
         if reset:
             interface.reset()
 
         yield interface
 
+# Trace record directions, see coax.trace.
+TRACE_SENT = 0
+TRACE_RECEIVED = 1
+
+class _MessageIds:
+    """Message identifier allocation and response matching."""
+
+    def __init__(self):
+        self.next_id = 1
+        self.in_flight = deque()
+
+        # Set once a response has carried an identifier, that is the firmware
+        # returns message identifiers.
+        self.has_response_ids = False
+
+    def allocate(self):
+        """Allocate an identifier for a message being sent."""
+        message_id = self.next_id
+
+        # Zero is reserved for responses that do not include the identifier.
+        self.next_id = (message_id % 0xffff) + 1
+
+        self.in_flight.append(message_id)
+
+        return message_id
+
+    def match(self, message_id):
+        """Match a response identifier to the oldest message in flight.
+
+        Returns False if the response is stale, that is for a message that is
+        no longer in flight.
+        """
+        # Legacy firmware does not include the message identifier, responses
+        # are matched in order.
+        if message_id == 0 and not self.has_response_ids:
+            if self.in_flight:
+                self.in_flight.popleft()
+
+            return True
+
+        # Otherwise a zero identifier is an unsolicited error, such as a
+        # timeout before the message identifier was received - the message in
+        # flight will still receive its own response.
+        if message_id == 0:
+            return False
+
+        if self.in_flight and message_id == self.in_flight[0]:
+            self.in_flight.popleft()
+
+            self.has_response_ids = True
+
+            return True
+
+        if message_id in self.in_flight:
+            raise InterfaceError(f'Unexpected response message identifier: {message_id}')
+
+        return False
+
+    def clear(self):
+        """Abandon all messages in flight."""
+        self.in_flight.clear()
+
+def _pack_message(message, message_id):
+    return struct.pack('>H', len(message)) + message + struct.pack('>H', message_id)
+
+def _unpack_message(message):
+    if len(message) < 4:
+        raise InterfaceError(f'Invalid response message: {bytes(message)}')
+
+    (length,) = struct.unpack('>H', message[:2])
+
+    if length != len(message) - 4:
+        raise InterfaceError('Response message length mismatch')
+
+    if length < 1:
+        raise InterfaceError('Empty response message')
+
+    (message_id,) = struct.unpack('>H', message[-2:])
+
+    return (message[2:-2], message_id)
+
+def _parse_reset_response(message):
+    if message[0] != 0x01:
+        raise _convert_error(message)
+
+    if message[1:] == b'\x32\x70':
+        return (False, None)
+
+    if len(message) == 4:
+        (major, minor, patch) = struct.unpack('BBB', message[1:])
+
+        return (True, f'{major}.{minor}.{patch}')
+
+    raise InterfaceError(f'Invalid reset response: {bytes(message)}')
+
+def _parse_features_response(message):
+    if message[0] != 0x01:
+        raise _convert_error(message)
+
+    known_feature_values = {feature.value for feature in InterfaceFeature}
+
+    return {InterfaceFeature(value) for value in message[1:] if value in known_feature_values}
+
+def _parse_info_response(message):
+    if message[0] != 0x01:
+        raise _convert_error(message)
+
+    return bytes(message[1:])
+
+def _parse_supported_queries_response(message):
+    return set(_parse_info_response(message))
+
+def _parse_string_info_response(message):
+    return _parse_info_response(message).decode('ascii')
+
+def _parse_message_buffer_size_response(message):
+    info = _parse_info_response(message)
+
+    if len(info) != 4:
+        raise InterfaceError(f'Invalid message buffer size response: {bytes(message)}')
+
+    (size,) = struct.unpack('>I', info)
+
+    return size
+
+INFO_SUPPORTED_QUERIES = 0x01
+INFO_HARDWARE_TYPE = 0x02
+INFO_FIRMWARE_VERSION = 0x05
+INFO_MESSAGE_BUFFER_SIZE = 0x06
+INFO_FEATURES = 0x07
+
+# Interface information queried at reset, the attribute name and response
+# parser for each query.
+_NEGOTIATED_INFO_QUERIES = {
+    INFO_HARDWARE_TYPE: ('hardware_type', _parse_string_info_response),
+    INFO_FIRMWARE_VERSION: ('firmware_version', _parse_string_info_response),
+    INFO_MESSAGE_BUFFER_SIZE: ('message_buffer_size', _parse_message_buffer_size_response),
+    INFO_FEATURES: ('features', _parse_features_response)
+}
+
+# Length, command, repeat, response length, timeout and message identifier -
+# the interface message buffer holds the message after SLIP decoding.
+_TRANSMIT_RECEIVE_MESSAGE_OVERHEAD = 11
+
+def _split_outbound_frames(outbound_frames, response_lengths, message_buffer_size, compress=False):
+    if message_buffer_size is None and not compress:
+        return (outbound_frames, response_lengths, None)
+
+    max_words = None
+
+    if message_buffer_size is not None:
+        max_words = (message_buffer_size - _TRANSMIT_RECEIVE_MESSAGE_OVERHEAD) // 2
+
+    split_frames = []
+    split_response_lengths = []
+    split_counts = []
+
+    for ((address, frame), response_length) in zip(outbound_frames, response_lengths):
+        alignment = _get_data_alignment(frame)
+
+        frames = _compress_frame(frame, address, alignment) if compress else [frame]
+
+        if max_words is not None:
+
+            frames = [split_frame for frame in frames
+                      for split_frame in _split_frame(frame, max_words - (1 if address is not None else 0), alignment)]
+
+        split_frames.extend((address, frame) for frame in frames)
+
+        # Only the last frame returns the command response, continuation frames
+        # are write frames.
+        split_response_lengths.extend([1] * (len(frames) - 1) + [response_length])
+
+        split_counts.append(len(frames))
+
+    if len(split_frames) == len(outbound_frames):
+        return (split_frames, split_response_lengths, None)
+
+    return (split_frames, split_response_lengths, split_counts)
+
+# Shortest run worth sending as a separate repeat frame - each frame costs an
+# additional message.
+_COMPRESS_MIN_RUN_LENGTH = 32
+
+_MAX_REPEAT_COUNT = 0x7fff
+
+# Runs of a repeated byte, or a repeated pair of bytes such as the regen buffer
+# and EAB bytes for EAB_WRITE_ALTERNATE.
+_RUN_PATTERN = re.compile(rb'(.)\1{%d,}|(..)\2{%d,}' % (_COMPRESS_MIN_RUN_LENGTH - 1, _COMPRESS_MIN_RUN_LENGTH // 2 - 1),
+                          re.DOTALL)
+
+# Runs of a repeated pair of bytes only, for data that must remain aligned to
+# pairs.
+_PAIR_RUN_PATTERN = re.compile(rb'(..)\1{%d,}' % (_COMPRESS_MIN_RUN_LENGTH // 2 - 1), re.DOTALL)
+
+def _compress_frame(frame, address=None, alignment=1):
+    if frame[0] == FrameFormat.WORD_DATA and len(frame) > 2:
+        command_word = frame[1]
+        data = frame[2]
+    elif frame[0] == FrameFormat.DATA:
+        command_word = None
+        data = frame[1]
+    else:
+        return [frame]
+
+    if isinstance(data, tuple) or len(data) < _COMPRESS_MIN_RUN_LENGTH:
+        return [frame]
+
+    try:
+        data = bytes(data)
+    except (ValueError, TypeError):
+        # Leave invalid data for the frame packer to report.
+        return [frame]
+
+    chunks = []
+
+    index = 0
+
+    for match in _find_runs(data, alignment):
+        if match.start() > index:
+            chunks.append(data[index:match.start()])
+
+        pattern = match.group(1) or match.group(2)
+
+        count = (match.end() - match.start()) // len(pattern)
+
+        for offset in range(0, count, _MAX_REPEAT_COUNT):
+            chunks.append((pattern, min(count - offset, _MAX_REPEAT_COUNT)))
+
+        index = match.start() + (count * len(pattern))
+
+    if not chunks:
+        return [frame]
+
+    if index < len(data):
+        chunks.append(data[index:])
+
+    frames = [(FrameFormat.DATA, chunk) for chunk in chunks]
+
+    if command_word is not None:
+        # An addressed WORD_DATA frame cannot carry a repeat, see the note in
+        # _pack_transmit_receive_message, so the command word is sent alone
+        # when the data starts with a run.
+        if address is not None and isinstance(chunks[0], tuple):
+            frames.insert(0, (FrameFormat.WORD_DATA, command_word))
+        else:
+            frames[0] = (FrameFormat.WORD_DATA, command_word, chunks[0])
+
+    return frames
+
+def _get_data_alignment(frame):
+    # EAB_WRITE_ALTERNATE data is pairs of regen buffer and EAB bytes, a pair
+    # must not be split across frames.
+    if (frame[0] == FrameFormat.WORD_DATA and (frame[1] >> 6) >= 2
+            and ((frame[1] >> 2) & 0xf) == Command.EAB_WRITE_ALTERNATE.value):
+        return 2
+
+    return 1
+
+def _find_runs(data, alignment):
+    if alignment == 1:
+        yield from _RUN_PATTERN.finditer(data)
+        return
+
+    # Only runs of pairs starting at an aligned offset are matched, a run
+    # found at an unaligned offset is searched for again from the next byte.
+    position = 0
+
+    while True:
+        match = _PAIR_RUN_PATTERN.search(data, position)
+
+        if match is None:
+            return
+
+        if match.start() % alignment != 0:
+            position = match.start() + 1
+            continue
+
+        yield match
+
+        position = match.end()
+
+def _split_frame(frame, max_words, alignment=1):
+    if frame[0] == FrameFormat.WORD_DATA and len(frame) > 2:
+        command_word = frame[1]
+        data = frame[2]
+
+        capacity = max_words - 1
+    elif frame[0] == FrameFormat.DATA:
+        command_word = None
+        data = frame[1]
+
+        capacity = max_words
+    else:
+        return [frame]
+
+    chunks = _split_data(data, capacity - (capacity % alignment), max_words - (max_words % alignment), alignment)
+
+    if chunks is None:
+        return [frame]
+
+    frames = [(FrameFormat.DATA, chunk) for chunk in chunks]
+
+    if command_word is not None:
+        frames[0] = (FrameFormat.WORD_DATA, command_word, chunks[0])
+
+    return frames
+
+def _split_data(data, first_capacity, capacity, alignment=1):
+    if isinstance(data, tuple):
+        (pattern, count) = data
+
+        if len(pattern) * count <= first_capacity:
+            return None
+
+        # Split the repeat count, unless the pattern itself does not fit or
+        # is not aligned.
+        if 0 < len(pattern) <= first_capacity and len(pattern) % alignment == 0:
+            chunks = []
+
+            chunk_count = first_capacity // len(pattern)
+
+            while count > 0:
+                chunks.append((pattern, min(chunk_count, count)))
+
+                count -= chunk_count
+                chunk_count = capacity // len(pattern)
+
+            return chunks
+
+        data = bytes(pattern) * count
+
+    if len(data) <= first_capacity:
+        return None
+
+    chunks = [data[:first_capacity]]
+
+    for index in range(first_capacity, len(data), capacity):
+        chunks.append(data[index:index + capacity])
+
+    return chunks
+
+def _merge_split_responses(responses, split_counts):
+    if split_counts is None:
+        return responses
+
+    merged_responses = []
+
+    index = 0
+
+    # The response to a split frame is the first error, or the response to
+    # the last frame.
+    for count in split_counts:
+        frame_responses = responses[index:index + count]
+
+        merged_responses.append(next((response for response in frame_responses if isinstance(response, BaseException)),
+                                     frame_responses[-1]))
+
+        index += count
+
+    return merged_responses
+
+def _merge_split_message_times(message_times, split_counts):
+    if split_counts is None:
+        return message_times
+
+    # Each frame was written with the first message it was split into, and
+    # received with the last.
+    merged_times = []
+
+    index = 0
+
+    for count in split_counts:
+        merged_times.append((message_times[index][0], message_times[index][1], message_times[index + count - 1][2]))
+
+        index += count
+
+    return merged_times
+
 def _pack_transmit_receive_message(address, frame, response_length, timeout_milliseconds):
-    # Convert the three frame formats to a simple list of 10-bit words with
-    # a repeat count and offset.
-    (words, repeat_count, repeat_offset) = normalize_frame(address, frame)
+    # Split the three frame formats into a command word, 10-bit words or data
+    # bytes with a repeat count and offset - this is equivalent to the frame
+    # normalization routine but avoids converting data bytes to words.
+    command_word = None
+    words = None
+    data = None
+
+    repeat_count = 0
+    repeat_offset = 0
+
+    if frame[0] == FrameFormat.WORDS:
+        if isinstance(frame[1], tuple):
+            (words, repeat_count) = frame[1]
+        else:
+            words = frame[1]
+    elif frame[0] == FrameFormat.WORD_DATA:
+        command_word = frame[1]
+
+        if len(frame) > 2:
+            if isinstance(frame[2], tuple):
+                repeat_offset = 1
+                (data, repeat_count) = frame[2]
+            else:
+                data = frame[2]
+    elif frame[0] == FrameFormat.DATA:
+        if isinstance(frame[1], tuple):
+            (data, repeat_count) = frame[1]
+        else:
+            data = frame[1]
+
+    if address is not None:
+        if address < 0 or address > 63:
+            raise ValueError('Address must be between 0 and 63')
+
+        if repeat_count > 0:
+            repeat_offset += 1
+
+    if data is not None and not isinstance(data, (bytes, bytearray)):
+        data = bytes(data)
+
+    word_count = ((address is not None) + (command_word is not None) +
+                  (len(words) if words is not None else 0) +
+                  (len(data) if data is not None else 0))
+
+    message = bytearray(3 + (word_count * 2) + 4)
 
-    message = bytes([0x06])
+    message[0] = 0x06
 
     # NOTE: Although the frame normalization routine may result in a repeat
     # offset greater than 1 if an addressed WORD_DATA frame has a repeat
     # count, this WILL fail to be packed below as it will overflow the
     # unsigned short field here. Today, oec does not use a repeat with an
     # addressed WORD_DATA frame as the "jumbo write" function will always
-    # expand addressed frames.
-    message += struct.pack('>H', (repeat_offset << 15) | repeat_count)
+    # expand addressed frames, and compression sends the command word of an
+    # addressed frame separately from a leading run.
+    struct.pack_into('>H', message, 1, (repeat_offset << 15) | repeat_count)
+
+    offset = 3
 
     # Set the 3299 mode flag.
     if address is not None:
-        words[0] |= 0x8000
+        struct.pack_into('<H', message, offset, address | 0x8000)
+        offset += 2
+
+    if command_word is not None:
+        struct.pack_into('<H', message, offset, command_word)
+        offset += 2
+
+    if words:
+        struct.pack_into(f'<{len(words)}H', message, offset, *words)
+        offset += len(words) * 2
+
+    if data:
+        end = offset + (len(data) * 2)
+
+        message[offset:end:2] = data.translate(_DATA_WORD_LO)
+        message[offset+1:end:2] = data.translate(_DATA_WORD_HI)
 
-    for word in words:
-        message += struct.pack('<H', word)
+        offset = end
 
-    message += struct.pack('>HH', response_length, timeout_milliseconds)
+    struct.pack_into('>HH', message, offset, response_length, timeout_milliseconds)
 
     return message
 
+class Program:
+    """Compiled program, see SerialInterface.compile().
+
+    Holds the SLIP encoded messages, less the message identifier, and the
+    commands used to unpack the responses.
+    """
+
+    def __init__(self, messages, commands, split_counts, has_multiple_commands):
+        self.messages = tuple(messages)
+        self.commands = tuple(commands)
+        self.split_counts = tuple(split_counts) if split_counts is not None else None
+        self.has_multiple_commands = has_multiple_commands
+
+        self.slot_names = frozenset(slot.name for message in self.messages for slot in message.slots)
+
+    def check_values(self, values):
+        """Check that values provides a data byte for each slot."""
+        if values is None:
+            values = {}
+
+        if values.keys() != self.slot_names:
+            missing_names = self.slot_names - values.keys()
+
+            if missing_names:
+                raise ValueError(f'Missing slot values: {", ".join(sorted(map(str, missing_names)))}')
+
+            raise ValueError(f'Unknown slots: {", ".join(sorted(map(str, values.keys() - self.slot_names)))}')
+
+        if any(not 0 <= value <= 255 for value in values.values()):
+            raise ValueError('Slot value is out of range')
+
+        return values
+
+class _CompiledMessage:
+    def __init__(self, segments, slots):
+        # SLIP encoded segments of the message, separated by the data word for
+        # each slot.
+        self.segments = tuple(segments)
+        self.slots = tuple(slots)
+
+    def encode(self, values, message_id):
+        if not self.slots:
+            return self.segments[0] + _encode_message_id(message_id)
+
+        packet = bytearray(self.segments[0])
+
+        for (slot, segment) in zip(self.slots, self.segments[1:]):
+            packet += _ENCODED_DATA_WORDS[values[slot.name]]
+            packet += segment
+
+        packet += _encode_message_id(message_id)
+
+        return packet
+
+def _compile_program(commands, has_multiple_commands, timeout_milliseconds, message_buffer_size, compress):
+    (outbound_frames, response_lengths) = _pack_outbound_frames(commands)
+
+    messages = []
+    split_counts = []
+
+    for ((address, frame), response_length) in zip(outbound_frames, response_lengths):
+        # Slots would be lost when compressing.
+        (frames, frame_response_lengths, _) = _split_outbound_frames([(address, frame)], [response_length],
+                                                                     message_buffer_size,
+                                                                     compress and not _has_slots(frame))
+
+        for ((address, frame), response_length) in zip(frames, frame_response_lengths):
+            messages.append(_compile_message(address, frame, response_length, timeout_milliseconds))
+
+        split_counts.append(len(frames))
+
+    if len(messages) == len(commands):
+        split_counts = None
+
+    return Program(messages, commands, split_counts, has_multiple_commands)
+
+def _has_slots(frame):
+    for item in frame[1:]:
+        # Repeated words or data.
+        if isinstance(item, tuple):
+            item = item[0]
+
+        if not isinstance(item, int) and any(isinstance(value, Slot) for value in item):
+            return True
+
+    return False
+
+def _compile_message(address, frame, response_length, timeout_milliseconds):
+    # Offset of the first data word in the message, following the length,
+    # command and repeat.
+    data_offset = 5 + (2 if address is not None else 0)
+
+    data = None
+
+    if frame[0] == FrameFormat.WORDS:
+        if _has_slots(frame):
+            raise ValueError('Slots are only supported in data')
+    elif frame[0] == FrameFormat.WORD_DATA:
+        data = frame[2] if len(frame) > 2 else None
+
+        data_offset += 2
+    elif frame[0] == FrameFormat.DATA:
+        data = frame[1]
+
+    slots = []
+    slot_offsets = []
+
+    if isinstance(data, tuple):
+        if any(isinstance(value, Slot) for value in data[0]):
+            raise ValueError('Slots are not supported in repeated data')
+    elif data is not None:
+        for (index, value) in enumerate(data):
+            if isinstance(value, Slot):
+                slots.append(value)
+                slot_offsets.append(data_offset + (index * 2))
+
+    message = _pack_transmit_receive_message(address, frame, response_length, timeout_milliseconds)
+
+    # The message identifier is appended when the message is sent.
+    message = _pack_message(message, 0)[:-2]
+
+    segments = []
+
+    start = 0
+
+    for offset in slot_offsets:
+        segments.append(_slip_escape(message[start:offset]))
+
+        start = offset + 2
+
+    segments.append(_slip_escape(message[start:]))
+
+    segments[0] = bytes([SLIP_END]) + segments[0]
+
+    return _CompiledMessage(segments, slots)
+
+def _parse_transmit_receive_response(message):
+    # Returns the response words or the ReceiveError or ReceiveTimeout for the
+    # command, an InterfaceError is returned for the caller to raise.
+    if message[0] != 0x01:
+        return _convert_error(message)
+
+    try:
+        return _unpack_transmit_receive_response(message[1:])
+    except InterfaceError as error:
+        return error
+
 def _unpack_transmit_receive_response(bytes_):
-    return [(hi << 8) | lo for (lo, hi) in zip(bytes_[::2], bytes_[1::2])]
+    if len(bytes_) % 2 != 0:
+        raise InterfaceError('Invalid response length')
+
+    words = array('H')
+
+    words.frombytes(bytes_)
+
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    return words
+
+# Low and high bytes of the little endian data word, including parity, for each
+# data byte value - used to translate data bytes to data words in bulk.
+_DATA_WORD_LO = bytes([pack_data_word(byte) & 0xff for byte in range(256)])
+_DATA_WORD_HI = bytes([pack_data_word(byte) >> 8 for byte in range(256)])
 
 ERROR_MAP = {
     1: InterfaceError('Invalid request message'),
@@ -224,17 +964,17 @@ ERROR_MAP = {
 
 def _convert_error(message):
     if message[0] != 0x02:
-        return InterfaceError(f'Invalid response: {message}')
+        return InterfaceError(f'Invalid response: {bytes(message)}')
 
     if len(message) < 2:
-        return InterfaceError(f'Invalid error response: {message}')
+        return InterfaceError(f'Invalid error response: {bytes(message)}')
 
     if message[1] in ERROR_MAP:
         error = copy(ERROR_MAP[message[1]])
 
         # Append description if included.
         if len(message) > 2:
-            description = message[2:].decode('ascii')
+            description = bytes(message[2:]).decode('ascii')
 
             if error.args:
                 error.args = (f'{error.args[0]}: {description}', *error.args[1:])
@@ -245,30 +985,176 @@ def _convert_error(message):
 
     return InterfaceError(f'Unknown error: {message[1]}')
 
-class SlipSerial(SlipWrapper):
-    """sliplib wrapper for pySerial."""
+SLIP_END = 0xc0
+SLIP_ESC = 0xdb
+SLIP_ESC_END = 0xdc
+SLIP_ESC_ESC = 0xdd
+
+class SlipDecoder:
+    """Incremental SLIP decoder.
+
+    Received data is added to a buffer that is scanned incrementally for
+    complete messages, which are returned as memoryviews.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan_offset = 0
+
+    def feed(self, data):
+        """Add received data to the buffer."""
+        self._buffer += data
+
+    @property
+    def buffered(self):
+        """Number of bytes buffered."""
+        return len(self._buffer)
+
+    def decode_msg(self):
+        """Decode the next complete message, returns None if there is none."""
+        while True:
+            # Only the data received since the last scan needs to be scanned.
+            end = self._buffer.find(SLIP_END, self._scan_offset)
+
+            if end == -1:
+                self._scan_offset = len(self._buffer)
+                return None
+
+            packet = self._buffer[:end]
+
+            del self._buffer[:end + 1]
+
+            self._scan_offset = 0
+
+            if packet:
+                if SLIP_ESC in packet:
+                    packet = _slip_unescape(packet)
+
+                return memoryview(packet)
+
+    def clear(self):
+        """Discard all buffered data."""
+        self._buffer.clear()
+        self._scan_offset = 0
+
+class SlipSerial:
+    """Buffered SLIP framing for pySerial.
+
+    Received data is read in bulk and decoded using a SlipDecoder.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+        self.decoder = SlipDecoder()
+
+        self._write_buffer = None
+
+        # Byte counts and the time the first byte of the last message received
+        # arrived, for instrumentation.
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.first_byte_time = None
+
+        self._receive_time = None
+
+    def send_msg(self, message):
+        """Sends a message over the serial port."""
+        self.send_bytes(encode(message))
 
     def send_bytes(self, packet):
         """Sends a packet over the serial port."""
+        if self._write_buffer is not None:
+            self._write_buffer += packet
+            return
+
         self.stream.write(packet)
         self.stream.flush()
 
+        self.bytes_sent += len(packet)
+
+    @contextmanager
+    def coalesce(self):
+        """Coalesce packets sent within the context into a single write."""
+        if self._write_buffer is not None:
+            yield
+            return
+
+        self._write_buffer = bytearray()
+
+        try:
+            yield
+        finally:
+            buffer = self._write_buffer
+
+            self._write_buffer = None
+
+            if buffer:
+                self.send_bytes(buffer)
+
+    def recv_msg(self):
+        """Receive a message from the serial port."""
+        # Data already buffered arrived with the previous receive.
+        first_byte_time = self._receive_time if self.decoder.buffered else None
+
+        message = self.decoder.decode_msg()
+
+        while message is None:
+            data = self.recv_bytes()
+
+            if not data:
+                return memoryview(b'')
+
+            self._receive_time = time.perf_counter()
+
+            if first_byte_time is None:
+                first_byte_time = self._receive_time
+
+            self.bytes_received += len(data)
+
+            self.decoder.feed(data)
+
+            message = self.decoder.decode_msg()
+
+        self.first_byte_time = first_byte_time
+
+        return message
+
     def recv_bytes(self):
         """Receive data from the serial port."""
         if self.stream.closed:
             return b''
 
-        count = self.stream.in_waiting
+        # Read everything available in a single call, or block until at least
+        # one byte is available or the serial timeout expires.
+        data = self.stream.read(max(1, self.stream.in_waiting))
 
-        if count:
-            return self.stream.read(count)
+        if not data:
+            raise InterfaceTimeout()
 
-        byte = self.stream.read(1)
+        return data
 
-        if byte == b'':
-            raise InterfaceTimeout()
+def _slip_escape(message):
+    return bytes(message).replace(bytes([SLIP_ESC]), bytes([SLIP_ESC, SLIP_ESC_ESC])) \
+                         .replace(bytes([SLIP_END]), bytes([SLIP_ESC, SLIP_ESC_END]))
+
+def _encode_message_id(message_id):
+    return _slip_escape(struct.pack('>H', message_id)) + bytes([SLIP_END])
+
+# SLIP encoded data word, including parity, for each data byte value.
+_ENCODED_DATA_WORDS = [_slip_escape(bytes([_DATA_WORD_LO[byte], _DATA_WORD_HI[byte]])) for byte in range(256)]
+
+def _slip_unescape(packet):
+    end_count = packet.count(bytes([SLIP_ESC, SLIP_ESC_END]))
+    esc_count = packet.count(bytes([SLIP_ESC, SLIP_ESC_ESC]))
+
+    if packet.count(SLIP_ESC) != end_count + esc_count:
+        raise ProtocolError(bytes(packet))
 
-        return byte
+    # The END escape sequence must be replaced first, an ESC escape sequence
+    # followed by ESC_END would otherwise be decoded as END.
+    return (packet.replace(bytes([SLIP_ESC, SLIP_ESC_END]), bytes([SLIP_END]))
+                  .replace(bytes([SLIP_ESC, SLIP_ESC_ESC]), bytes([SLIP_ESC])))
 
 # Based on workaround detailed in https://github.com/pyserial/pyserial/issues/362
 class WindowsSafeSerial(Serial):
@@ -0,0 +1,236 @@
+"""
+coax.session
+~~~~~~~~~~~~
+"""
+
+from .interface import _normalize_commands, _get_execute_result
+from .protocol import Poll, PollAck, PowerOnResetCompletePollResponse, ReadStatus, ReadTerminalId, \
+                      ReadExtendedId, ReadAddressCounterHi, ReadAddressCounterLo, ReadMultiple, Reset, \
+                      LoadControlRegister, LoadSecondaryControl, LoadMask, LoadAddressCounterHi, \
+                      LoadAddressCounterLo, WriteData, InsertByte, DiagnosticReset, ReadFeatureId, \
+                      EABLoadMask, EABWriteAlternate, EABWriteUnderMask, EABReadStatus, Data
+
+class Session:
+    """Terminal session.
+
+    Wraps an interface for a single terminal, optionally attached to a 3299
+    multiplexer, and tracks the terminal address counter as commands are
+    executed. LOAD_ADDRESS_COUNTER_HI and LOAD_ADDRESS_COUNTER_LO commands
+    that would not change the address counter are not sent.
+
+    The control, secondary control, mask and EAB mask registers are also
+    cached, loads of values already in place are not sent.
+
+    Writes only move a tracked address counter once the control register has
+    been loaded through the session, as step inhibit is otherwise unknown.
+    Tracking is invalidated on errors, terminal resets and power-on-reset
+    complete POLL responses.
+    """
+
+    def __init__(self, interface, device_address=None):
+        self.interface = interface
+        self.device_address = device_address
+
+        self.state = _TerminalState()
+
+    @property
+    def address_counter(self):
+        """Tracked address counter, None if unknown."""
+        return self.state.get_address_counter()
+
+    def reset(self):
+        """Reset the interface."""
+        self.invalidate()
+
+        self.interface.reset()
+
+    def invalidate(self):
+        """Discard all tracked terminal state."""
+        self.state = _TerminalState()
+
+    def execute(self, commands, timeout=None):
+        """Execute one or more commands, skipping commands that would not
+        change the terminal state.
+
+        Commands are sent to the session device address, an (address,
+        command) tuple with an address of None is sent to the session device
+        and any other address must match it.
+        """
+        (normalized_commands, has_multiple_commands) = _normalize_commands(commands)
+
+        if any(address is not None and address != self.device_address for (address, _) in normalized_commands):
+            raise ValueError(f'Command address does not match session device address: {self.device_address}')
+
+        commands = [command for (_, command) in normalized_commands]
+
+        # Plan which commands need to be sent using a copy of the tracked state,
+        # the effect of some commands is only known from the response.
+        state = self.state.copy()
+
+        send_indexes = []
+
+        for (index, command) in enumerate(commands):
+            if state.is_redundant(command):
+                continue
+
+            send_indexes.append(index)
+
+            state.apply(command)
+
+        responses = [None] * len(commands)
+
+        if not send_indexes:
+            return _get_execute_result(responses, has_multiple_commands)
+
+        try:
+            sent_responses = self.interface.execute([(self.device_address, commands[index]) for index in send_indexes],
+                                                    timeout)
+        except BaseException:
+            self.invalidate()
+            raise
+
+        for (index, response) in zip(send_indexes, sent_responses):
+            responses[index] = response
+
+        if any(isinstance(response, BaseException) for response in sent_responses):
+            self.invalidate()
+        else:
+            for index in send_indexes:
+                self.state.apply(commands[index], responses[index])
+
+        return _get_execute_result(responses, has_multiple_commands)
+
+# Placeholder for a response that is not known, while planning.
+_UNKNOWN_RESPONSE = object()
+
+# Commands that do not change the address counter.
+_ADDRESS_COUNTER_NEUTRAL_COMMANDS = (
+    PollAck,
+    ReadStatus,
+    ReadTerminalId,
+    ReadExtendedId,
+    ReadFeatureId,
+    EABReadStatus
+)
+
+_CONTROL_STEP_INHIBIT = 0x10
+
+class _TerminalState:
+    def __init__(self):
+        self.address_counter_hi = None
+        self.address_counter_lo = None
+
+        self.control = None
+        self.secondary_control = None
+        self.mask = None
+        self.eab_masks = {}
+
+    def copy(self):
+        state = _TerminalState()
+
+        state.address_counter_hi = self.address_counter_hi
+        state.address_counter_lo = self.address_counter_lo
+
+        state.control = self.control
+        state.secondary_control = self.secondary_control
+        state.mask = self.mask
+        state.eab_masks = dict(self.eab_masks)
+
+        return state
+
+    def get_address_counter(self):
+        if self.address_counter_hi is None or self.address_counter_lo is None:
+            return None
+
+        return (self.address_counter_hi << 8) | self.address_counter_lo
+
+    def is_redundant(self, command):
+        if isinstance(command, LoadAddressCounterHi):
+            return command.address == self.address_counter_hi
+
+        if isinstance(command, LoadAddressCounterLo):
+            return command.address == self.address_counter_lo
+
+        if isinstance(command, LoadControlRegister):
+            return command.control.value == self.control
+
+        if isinstance(command, LoadSecondaryControl):
+            return command.control.value == self.secondary_control
+
+        if isinstance(command, LoadMask):
+            return command.mask == self.mask
+
+        if isinstance(command, EABLoadMask):
+            return command.mask == self.eab_masks.get(command.feature_address)
+
+        return False
+
+    def apply(self, command, response=_UNKNOWN_RESPONSE):
+        if isinstance(command, LoadAddressCounterHi):
+            self.address_counter_hi = command.address
+        elif isinstance(command, LoadAddressCounterLo):
+            self.address_counter_lo = command.address
+        elif isinstance(command, ReadAddressCounterHi):
+            if isinstance(response, int):
+                self.address_counter_hi = response
+        elif isinstance(command, ReadAddressCounterLo):
+            if isinstance(response, int):
+                self.address_counter_lo = response
+        elif isinstance(command, (WriteData, Data)):
+            self._advance_address_counter(_get_data_length(command.data), True)
+        elif isinstance(command, EABWriteAlternate):
+            self._advance_address_counter(_get_data_length(command.data) // 2, True)
+        elif isinstance(command, (EABWriteUnderMask, InsertByte)):
+            self._advance_address_counter(1, True)
+        elif isinstance(command, ReadMultiple):
+            if isinstance(response, (bytes, bytearray)):
+                self._advance_address_counter(len(response), False)
+            else:
+                self._invalidate_address_counter()
+        elif isinstance(command, LoadControlRegister):
+            self.control = command.control.value
+        elif isinstance(command, LoadSecondaryControl):
+            self.secondary_control = command.control.value
+        elif isinstance(command, LoadMask):
+            self.mask = command.mask
+        elif isinstance(command, EABLoadMask):
+            self.eab_masks[command.feature_address] = command.mask
+        elif isinstance(command, Poll):
+            # A power-on-reset terminal has lost all state, while planning the
+            # response is not known.
+            if response is _UNKNOWN_RESPONSE or isinstance(response, PowerOnResetCompletePollResponse):
+                self.__init__()
+        elif isinstance(command, (Reset, DiagnosticReset)):
+            self.__init__()
+        elif not isinstance(command, _ADDRESS_COUNTER_NEUTRAL_COMMANDS):
+            # Searches, CLEAR and any other command move the address counter to
+            # an unknown position.
+            self._invalidate_address_counter()
+
+    def _advance_address_counter(self, count, is_write):
+        address_counter = self.get_address_counter()
+
+        if is_write:
+            if self.control is None:
+                address_counter = None
+            elif self.control & _CONTROL_STEP_INHIBIT:
+                return
+
+        if address_counter is None or address_counter + count > 0xffff:
+            self._invalidate_address_counter()
+            return
+
+        address_counter += count
+
+        self.address_counter_hi = address_counter >> 8
+        self.address_counter_lo = address_counter & 0xff
+
+    def _invalidate_address_counter(self):
+        self.address_counter_hi = None
+        self.address_counter_lo = None
+
+def _get_data_length(data):
+    if isinstance(data, tuple):
+        return len(data[0]) * data[1]
+
+    return len(data)
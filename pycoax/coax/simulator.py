@@ -0,0 +1,558 @@
+"""
+coax.simulator
+~~~~~~~~~~~~~~
+
+Simulated interface and CUT terminals, for testing and benchmarking without
+an interface or terminals attached.
+"""
+
+import time
+from collections import deque
+
+from .interface import Interface, InterfaceFeature
+from .protocol import FrameFormat, Command, PollAction, PollResponse, TerminalId, pack_data_word, \
+                      is_data_word, unpack_data_words
+from .multiplexer import PORT_MAP_3299
+from .features import Feature
+from .exceptions import ReceiveTimeout
+
+class SimulatedInterface(Interface):
+    """Simulated interface with one or more attached CUT terminals.
+
+    The terminals are either a single SimulatedTerminal, attached directly,
+    or a dictionary of 3299 multiplexer port to SimulatedTerminal - in this
+    case unaddressed frames are sent to port 0. Frames sent to a port with no
+    terminal attached result in a ReceiveTimeout.
+
+    The wire time of each frame, and response, is accumulated in wire_time
+    based on the 2.3587 Mb/s coax bit rate. If realtime is true, execute
+    blocks for the wire time so that throughput and latency can be measured.
+    """
+
+    def __init__(self, terminals, realtime=False):
+        super().__init__()
+
+        if isinstance(terminals, SimulatedTerminal):
+            self.terminals = {None: terminals}
+        else:
+            if any(port < 0 or port > 7 for port in terminals):
+                raise ValueError('Port must be between 0 and 7')
+
+            self.terminals = {PORT_MAP_3299[port]: terminal for (port, terminal) in terminals.items()}
+
+            self.features = {InterfaceFeature.PROTOCOL_3299}
+
+        self.realtime = realtime
+
+        self.wire_time = 0
+
+    def reset(self):
+        """Reset the interface."""
+        self.wire_time = 0
+
+    def _transmit_receive(self, outbound_frames, response_lengths, timeout):
+        if len(response_lengths) != len(outbound_frames):
+            raise ValueError('Response lengths length must equal outbound frames length')
+
+        if any(address is not None for (address, _) in outbound_frames) and InterfaceFeature.PROTOCOL_3299 not in self.features:
+            raise NotImplementedError('Interface does not support 3299 protocol')
+
+        responses = []
+
+        wire_time = 0
+
+        for ((address, frame), response_length) in zip(outbound_frames, response_lengths):
+            (command_word, data) = _unpack_frame(frame)
+
+            if address is None and None not in self.terminals:
+                address = PORT_MAP_3299[0]
+
+            terminal = self.terminals.get(address)
+
+            response = terminal.execute(command_word, data) if terminal is not None else None
+
+            word_count = (address is not None) + (command_word is not None) + len(data)
+
+            wire_time += _get_frame_wire_time(word_count)
+
+            if response is None:
+                wire_time += timeout or _RECEIVE_TIMEOUT
+
+                responses.append(ReceiveTimeout())
+            else:
+                response = response[:response_length]
+
+                wire_time += _TURNAROUND_TIME + _get_frame_wire_time(len(response))
+
+                responses.append(response)
+
+        self.wire_time += wire_time
+
+        if self.realtime:
+            time.sleep(wire_time)
+
+        return responses
+
+class SimulatedTerminal:
+    """Simulated CUT terminal.
+
+    The terminal models the regen buffer, address counter, control, secondary
+    control and mask registers, features and POLL responses - CLEAR follows
+    examples/14_clear.py and is not verified against a terminal. If an EAB
+    feature address is provided the terminal also has an EAB.
+
+    Keystrokes are injected, optionally spaced by an interval, and returned
+    as POLL responses until acknowledged. The terminal returns a power-on
+    reset complete POLL response until acknowledged, unless power_on_reset is
+    false.
+    """
+
+    def __init__(self, model=2, keyboard=1, buffer_size=4096, eab_feature_address=None,
+                 power_on_reset=True, clock=time.perf_counter):
+        if model not in _MODEL_BITS:
+            raise ValueError(f'Invalid model: {model}')
+
+        if buffer_size < 256 or buffer_size % 256 != 0:
+            raise ValueError('Buffer size must be a multiple of 256')
+
+        self.model = model
+        self.keyboard = keyboard
+        self.eab_feature_address = eab_feature_address
+        self.clock = clock
+
+        self.regen_buffer = bytearray(buffer_size)
+        self.eab_buffer = bytearray(buffer_size) if eab_feature_address is not None else None
+
+        self.features = {}
+
+        if eab_feature_address is not None:
+            self.features[eab_feature_address] = Feature.EAB.value
+
+        self.keystrokes = deque()
+
+        self.alarm_count = 0
+        self.keyboard_clicker = False
+
+        self._reset()
+
+        self.is_power_on_reset_pending = power_on_reset
+
+    @property
+    def terminal_id(self):
+        """Terminal identifier."""
+        return TerminalId((self.keyboard << 4) | (_MODEL_BITS[self.model] << 1))
+
+    def inject_keystrokes(self, scan_codes, interval=0):
+        """Queue keystrokes, each keystroke is available interval seconds after
+        the previous one."""
+        scan_codes = list(scan_codes)
+
+        for scan_code in scan_codes:
+            if scan_code < 0 or scan_code > 255:
+                raise ValueError('Scan code is out of range')
+
+            # The POLL response for the scan code must not be decoded as a
+            # status response, such as power-on reset complete.
+            if PollResponse.is_power_on_reset_complete((scan_code << 2) | 0b10):
+                raise ValueError(f'Scan code is a status POLL response: {scan_code}')
+
+        available_time = self.clock()
+
+        if self.keystrokes:
+            available_time = max(available_time, self.keystrokes[-1][0])
+
+        for (index, scan_code) in enumerate(scan_codes):
+            self.keystrokes.append((available_time + (index * interval), scan_code))
+
+    def get_text(self, address, length):
+        """Get the regen buffer bytes starting at address."""
+        return bytes(self._buffer_slice(self.regen_buffer, address, length))
+
+    def get_eab_text(self, address, length):
+        """Get the EAB bytes starting at address."""
+        return bytes(self._buffer_slice(self.eab_buffer, address, length))
+
+    def execute(self, command_word, data):
+        """Execute a command, or unaccompanied data if the command word is
+        None, returning the response words or None if there is no response."""
+        if command_word is None:
+            if self._data_handler is None:
+                return None
+
+            self._data_handler(data)
+
+            return _TT_AR
+
+        command = (command_word >> 2) & 0x1f
+
+        feature_address = command_word >> 6
+
+        # POLL includes the action in the bits otherwise used for the feature
+        # address, and base commands from 0x10 use the lowest of these bits.
+        if command == Command.POLL.value:
+            return self._poll(PollAction(feature_address >> 2))
+
+        self._data_handler = None
+
+        if feature_address <= 1:
+            handler = self._BASE_COMMANDS.get(command)
+
+            if handler is None:
+                return None
+
+            return handler(self, data)
+
+        command &= 0xf
+
+        if feature_address != self.eab_feature_address:
+            if command == Command.READ_FEATURE_ID.value:
+                return _pack_byte(self.features[feature_address]) if feature_address in self.features else _TT_AR
+
+            return None
+
+        handler = self._EAB_COMMANDS.get(command)
+
+        if handler is None:
+            return None
+
+        return handler(self, data)
+
+    def _reset(self):
+        self.address_counter = 0
+
+        self.control = 0
+        self.secondary_control = 0
+        self.mask = 0xff
+        self.eab_mask = 0xff
+
+        self.is_busy = False
+        self.is_operation_complete = False
+
+        self._data_handler = None
+
+    def _poll(self, action):
+        if action == PollAction.ALARM:
+            self.alarm_count += 1
+        elif action == PollAction.ENABLE_KEYBOARD_CLICKER:
+            self.keyboard_clicker = True
+        elif action == PollAction.DISABLE_KEYBOARD_CLICKER:
+            self.keyboard_clicker = False
+
+        if self.is_power_on_reset_pending:
+            return [0b00000010_10]
+
+        if self.keystrokes and self.keystrokes[0][0] <= self.clock():
+            return [(self.keystrokes[0][1] << 2) | 0b10]
+
+        return _TT_AR
+
+    def _poll_ack(self, data):
+        if self.is_power_on_reset_pending:
+            self.is_power_on_reset_pending = False
+        elif self.keystrokes and self.keystrokes[0][0] <= self.clock():
+            self.keystrokes.popleft()
+
+        return _TT_AR
+
+    def _read_status(self, data):
+        # A busy operation completes after it is reported once.
+        if self.is_busy:
+            self.is_busy = False
+            self.is_operation_complete = True
+
+            return _pack_byte(0)
+
+        # Bit 5 is set when the terminal is not busy.
+        status = 0x20
+
+        if self.is_operation_complete:
+            status |= 0x02
+
+        self.is_operation_complete = False
+
+        return _pack_byte(status)
+
+    def _read_terminal_id(self, data):
+        return _pack_byte(self.terminal_id.value)
+
+    def _read_extended_id(self, data):
+        return _TT_AR
+
+    def _read_address_counter_hi(self, data):
+        return _pack_byte(self.address_counter >> 8)
+
+    def _read_address_counter_lo(self, data):
+        return _pack_byte(self.address_counter & 0xff)
+
+    def _read_data(self, data):
+        byte = self.regen_buffer[self._get_index()]
+
+        self._advance_address_counter(1)
+
+        return _pack_byte(byte)
+
+    def _read_multiple(self, data):
+        # Reads until the address counter crosses a 32 byte boundary.
+        count = 32 - (self.address_counter & 0x1f)
+
+        bytes_ = self._buffer_slice(self.regen_buffer, self.address_counter, count)
+
+        self._advance_address_counter(count)
+
+        return [pack_data_word(byte) for byte in bytes_]
+
+    def _reset_command(self, data):
+        self._reset()
+
+        return _TT_AR
+
+    def _load_control_register(self, data):
+        self.control = self._get_byte(data)
+
+        return _TT_AR
+
+    def _load_secondary_control(self, data):
+        self.secondary_control = self._get_byte(data)
+
+        return _TT_AR
+
+    def _load_mask(self, data):
+        self.mask = self._get_byte(data)
+
+        return _TT_AR
+
+    def _load_address_counter_hi(self, data):
+        self.address_counter = (self._get_byte(data) << 8) | (self.address_counter & 0xff)
+
+        return _TT_AR
+
+    def _load_address_counter_lo(self, data):
+        self.address_counter = (self.address_counter & 0xff00) | self._get_byte(data)
+
+        return _TT_AR
+
+    def _write_data(self, data):
+        self._data_handler = self._write_regen_data
+
+        self._write_regen_data(data)
+
+        return _TT_AR
+
+    def _write_regen_data(self, data):
+        for byte in data:
+            self.regen_buffer[self._get_index()] = byte
+
+            self._advance_address_counter(1, is_write=True)
+
+    def _clear(self, data):
+        pattern = self._get_byte(data)
+
+        # This model of CLEAR follows examples/14_clear.py and has not been
+        # verified against a terminal: bytes from the address counter to the
+        # end of the buffer that match the pattern under the mask are cleared,
+        # the address counter is left at the end of the buffer and the
+        # terminal is busy until the next READ_STATUS.
+        for index in range(self._get_index(), len(self.regen_buffer)):
+            if (self.regen_buffer[index] & self.mask) == (pattern & self.mask):
+                self.regen_buffer[index] = 0
+
+        self.address_counter = len(self.regen_buffer) & 0xffff
+
+        self.is_busy = True
+
+        return _TT_AR
+
+    def _search_forward(self, data):
+        return self._search(self._get_byte(data), 1)
+
+    def _search_backward(self, data):
+        return self._search(self._get_byte(data), -1)
+
+    def _search(self, pattern, step):
+        # The address counter is moved to the first byte, from the address
+        # counter, matching the pattern under the mask - or left unchanged if
+        # there is no match.
+        for count in range(len(self.regen_buffer)):
+            index = (self._get_index() + (count * step)) % len(self.regen_buffer)
+
+            if (self.regen_buffer[index] & self.mask) == (pattern & self.mask):
+                self.address_counter = (self.address_counter + (count * step)) & 0xffff
+                break
+
+        self.is_operation_complete = True
+
+        return _TT_AR
+
+    def _insert_byte(self, data):
+        byte = self._get_byte(data)
+
+        index = self._get_index()
+
+        # Bytes are shifted up to the first null byte, or the end of the buffer.
+        end = self.regen_buffer.find(0, index)
+
+        if end == -1:
+            end = len(self.regen_buffer) - 1
+
+        self.regen_buffer[index + 1:end + 1] = self.regen_buffer[index:end]
+        self.regen_buffer[index] = byte
+
+        self._advance_address_counter(1, is_write=True)
+
+        return _TT_AR
+
+    def _eab_read_data(self, data):
+        byte = self.eab_buffer[self._get_index()]
+
+        self._advance_address_counter(1)
+
+        return _pack_byte(byte)
+
+    def _eab_load_mask(self, data):
+        self.eab_mask = self._get_byte(data)
+
+        return _TT_AR
+
+    def _eab_write_alternate(self, data):
+        self._data_handler = self._write_alternate_data
+
+        self._write_alternate_data(data)
+
+        return _TT_AR
+
+    def _write_alternate_data(self, data):
+        for (byte, eab_byte) in zip(data[0::2], data[1::2]):
+            index = self._get_index()
+
+            self.regen_buffer[index] = byte
+            self.eab_buffer[index] = eab_byte
+
+            self._advance_address_counter(1, is_write=True)
+
+    def _eab_read_multiple(self, data):
+        count = 32 - (self.address_counter & 0x1f)
+
+        bytes_ = self._buffer_slice(self.eab_buffer, self.address_counter, count)
+
+        self._advance_address_counter(count)
+
+        return [pack_data_word(byte) for byte in bytes_]
+
+    def _eab_write_under_mask(self, data):
+        byte = self._get_byte(data)
+
+        index = self._get_index()
+
+        self.eab_buffer[index] = (self.eab_buffer[index] & ~self.eab_mask & 0xff) | (byte & self.eab_mask)
+
+        self._advance_address_counter(1, is_write=True)
+
+        return _TT_AR
+
+    def _eab_read_status(self, data):
+        return _pack_byte(0)
+
+    def _read_feature_id(self, data):
+        return _pack_byte(Feature.EAB.value)
+
+    def _get_index(self):
+        return self.address_counter % len(self.regen_buffer)
+
+    def _advance_address_counter(self, count, is_write=False):
+        # Writes do not move the address counter when step inhibit is set.
+        if is_write and self.control & 0x10:
+            return
+
+        self.address_counter = (self.address_counter + count) & 0xffff
+
+    def _buffer_slice(self, buffer, address, length):
+        start = address % len(buffer)
+
+        if start + length <= len(buffer):
+            return buffer[start:start + length]
+
+        return buffer[start:] + buffer[:(start + length) - len(buffer)]
+
+    def _get_byte(self, data):
+        return data[0] if data else 0
+
+    _BASE_COMMANDS = {
+        Command.POLL_ACK.value: _poll_ack,
+        Command.READ_STATUS.value: _read_status,
+        Command.READ_TERMINAL_ID.value: _read_terminal_id,
+        Command.READ_EXTENDED_ID.value: _read_extended_id,
+        Command.READ_ADDRESS_COUNTER_HI.value: _read_address_counter_hi,
+        Command.READ_ADDRESS_COUNTER_LO.value: _read_address_counter_lo,
+        Command.READ_DATA.value: _read_data,
+        Command.READ_MULTIPLE.value: _read_multiple,
+        Command.RESET.value: _reset_command,
+        Command.LOAD_CONTROL_REGISTER.value: _load_control_register,
+        Command.LOAD_SECONDARY_CONTROL.value: _load_secondary_control,
+        Command.LOAD_MASK.value: _load_mask,
+        Command.LOAD_ADDRESS_COUNTER_HI.value: _load_address_counter_hi,
+        Command.LOAD_ADDRESS_COUNTER_LO.value: _load_address_counter_lo,
+        Command.WRITE_DATA.value: _write_data,
+        Command.CLEAR.value: _clear,
+        Command.SEARCH_FORWARD.value: _search_forward,
+        Command.SEARCH_BACKWARD.value: _search_backward,
+        Command.INSERT_BYTE.value: _insert_byte
+    }
+
+    _EAB_COMMANDS = {
+        Command.READ_FEATURE_ID.value: _read_feature_id,
+        Command.EAB_READ_DATA.value: _eab_read_data,
+        Command.EAB_LOAD_MASK.value: _eab_load_mask,
+        Command.EAB_WRITE_ALTERNATE.value: _eab_write_alternate,
+        Command.EAB_READ_MULTIPLE.value: _eab_read_multiple,
+        Command.EAB_WRITE_UNDER_MASK.value: _eab_write_under_mask,
+        Command.EAB_READ_STATUS.value: _eab_read_status
+    }
+
+_MODEL_BITS = {model: bits for (bits, model) in TerminalId._MODEL_MAP.items()}
+
+_TT_AR = [0]
+
+# Approximate coax timing - each word is a sync bit, 10 bits and a parity bit
+# and each frame has a start and end sequence.
+_BIT_TIME = 1 / 2_358_700
+
+_FRAME_OVERHEAD_BITS = 12
+
+_WORD_BITS = 12
+
+_TURNAROUND_TIME = 5e-6
+
+# Time spent waiting for a response that does not arrive, if no timeout is
+# provided.
+_RECEIVE_TIMEOUT = 1e-3
+
+def _get_frame_wire_time(word_count):
+    return (_FRAME_OVERHEAD_BITS + (word_count * _WORD_BITS)) * _BIT_TIME
+
+def _pack_byte(byte):
+    return [pack_data_word(byte)]
+
+def _unpack_frame(frame):
+    # Split a frame into the command word, if any, and data bytes.
+    if frame[0] == FrameFormat.WORDS:
+        words = frame[1]
+
+        if isinstance(words, tuple):
+            words = list(words[0]) * words[1]
+
+        # Unaccompanied data starts with a data word.
+        if is_data_word(words[0]):
+            return (None, unpack_data_words(words))
+
+        return (words[0], unpack_data_words(words[1:]))
+
+    if frame[0] == FrameFormat.WORD_DATA:
+        return (frame[1], _expand_data(frame[2]) if len(frame) > 2 else b'')
+
+    return (None, _expand_data(frame[1]))
+
+def _expand_data(data):
+    if isinstance(data, tuple):
+        return bytes(data[0]) * data[1]
+
+    return bytes(data)
@@ -0,0 +1,318 @@
+import os
+import sys
+import tty
+import time
+import select
+import struct
+import argparse
+import threading
+from array import array
+from collections import deque
+from sliplib import encode, ProtocolError
+
+from coax.protocol import FrameFormat
+from coax.serial_interface import SlipDecoder
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.exceptions import ReceiveTimeout
+
+COMMAND_RESET = 0x01
+COMMAND_TRANSMIT_RECEIVE = 0x06
+COMMAND_INFO = 0xf0
+COMMAND_TEST = 0xf1
+
+INFO_SUPPORTED_QUERIES = 0x01
+INFO_HARDWARE_TYPE = 0x02
+INFO_FIRMWARE_VERSION = 0x05
+INFO_MESSAGE_BUFFER_SIZE = 0x06
+INFO_FEATURES = 0x07
+
+FEATURE_PROTOCOL_3299 = 0x10
+
+TEST_SUPPORTED_TESTS = 0x01
+
+ERROR_INVALID_MESSAGE = 1
+ERROR_UNKNOWN_COMMAND = 2
+
+ERROR_RECEIVER_ACTIVE = 101
+ERROR_RECEIVE_TIMEOUT = 102
+ERROR_RECEIVER_BUFFER_OVERFLOW = 103
+ERROR_RECEIVER_ERROR = 104
+
+# Matches the interface2 firmware, room for the largest coax write.
+MESSAGE_BUFFER_SIZE = ((1 + (3696 * 2)) * 2) + 32
+
+class FirmwareStandIn:
+    """Stand-in for the interface2 firmware on a pseudo-terminal.
+
+    Messages are handled as the firmware does, with TRANSMIT_RECEIVE frames
+    executed by a SimulatedInterface - open the port with
+    open_serial_interface() to exercise the SLIP framing and serial path end
+    to end.
+
+    The USB latency, in seconds, delays each response and if a baud rate is
+    provided messages are paced to the serial data rate.
+    """
+
+    def __init__(self, interface, message_buffer_size=MESSAGE_BUFFER_SIZE, usb_latency=0, baud_rate=None):
+        self.interface = interface
+        self.message_buffer_size = message_buffer_size
+        self.usb_latency = usb_latency
+        self.baud_rate = baud_rate
+
+        (self._master_fd, self._slave_fd) = os.openpty()
+
+        # The slave end is kept open so that the master can be read while no
+        # client has the port open.
+        tty.setraw(self._slave_fd)
+
+        self.port = os.ttyname(self._slave_fd)
+
+        self._decoder = SlipDecoder()
+
+        self._errors = deque()
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def inject_error(self, code, description=None):
+        """Fail the next TRANSMIT_RECEIVE with a receiver error code."""
+        if code not in (ERROR_RECEIVER_ACTIVE, ERROR_RECEIVE_TIMEOUT, ERROR_RECEIVER_BUFFER_OVERFLOW,
+                        ERROR_RECEIVER_ERROR):
+            raise ValueError(f'Invalid error code: {code}')
+
+        self._errors.append((code, description))
+
+    def start(self):
+        """Start handling messages in a background thread."""
+        if self._thread is not None:
+            raise RuntimeError('Stand-in already started')
+
+        self._stop_event.clear()
+
+        self._thread = threading.Thread(target=self.run, args=(self._stop_event,), name='FirmwareStandIn',
+                                        daemon=True)
+
+        self._thread.start()
+
+    def stop(self):
+        """Stop handling messages in the background thread."""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+
+        self._thread.join()
+
+        self._thread = None
+
+    def close(self):
+        """Stop and close the pseudo-terminal."""
+        self.stop()
+
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def run(self, stop_event=None):
+        """Handle messages until the stop event is set."""
+        while stop_event is None or not stop_event.is_set():
+            (readable, _, _) = select.select([self._master_fd], [], [], 0.1)
+
+            if not readable:
+                continue
+
+            self._decoder.feed(os.read(self._master_fd, 4096))
+
+            while True:
+                try:
+                    message = self._decoder.decode_msg()
+                except ProtocolError:
+                    self._send(_pack_error(ERROR_INVALID_MESSAGE, 'SLIP_PROTOCOL_ERROR'), 0)
+                    continue
+
+                if message is None:
+                    break
+
+                self._pace(len(message) + 2)
+
+                self._send(*self.handle_message(bytes(message)))
+
+    def handle_message(self, message):
+        """Handle a message, returning the response and message identifier."""
+        if len(message) < 4:
+            return (_pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_MESSAGE_BUFFER_COUNT_4'), 0)
+
+        (message_id,) = struct.unpack('>H', message[-2:])
+
+        (count,) = struct.unpack('>H', message[:2])
+
+        if len(message) > self.message_buffer_size:
+            return (_pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_MESSAGE_BUFFER_OVERFLOW'), message_id)
+
+        if len(message) - 4 != count:
+            return (_pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_MESSAGE_BUFFER_COUNT_MISMATCH'), message_id)
+
+        if count < 1:
+            return (_pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_COMMAND_BUFFER_COUNT_1'), message_id)
+
+        command = message[2]
+        buffer = message[3:-2]
+
+        if command == COMMAND_RESET:
+            self.interface.reset()
+
+            return (bytes([0x01, 0x32, 0x70]), message_id)
+
+        if command == COMMAND_TRANSMIT_RECEIVE:
+            return (self._handle_transmit_receive(buffer), message_id)
+
+        if command == COMMAND_INFO:
+            return (self._handle_info(buffer), message_id)
+
+        if command == COMMAND_TEST:
+            return (self._handle_test(buffer), message_id)
+
+        return (_pack_error(ERROR_UNKNOWN_COMMAND), message_id)
+
+    def _handle_transmit_receive(self, buffer):
+        if len(buffer) < 6:
+            return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_TXRX_BUFFER_COUNT_6')
+
+        (repeat,) = struct.unpack('>H', buffer[:2])
+        (response_length, timeout_milliseconds) = struct.unpack('>HH', buffer[-4:])
+
+        words = array('H')
+
+        words.frombytes(buffer[2:-4])
+
+        if sys.byteorder == 'big':
+            words.byteswap()
+
+        if not words:
+            return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_TXRX_TX_BUFFER_COUNT_1')
+
+        # Expand the repeated words, following the offset.
+        repeat_count = repeat & 0x7fff
+        repeat_offset = repeat >> 15
+
+        if repeat_count > 1:
+            words += words[repeat_offset:] * (repeat_count - 1)
+
+        address = None
+
+        # The 3299 mode flag is set on the address word.
+        if words[0] & 0x8000:
+            address = words[0] & 0x3f
+
+            words = words[1:]
+
+        if self._errors:
+            return _pack_error(*self._errors.popleft())
+
+        if not words:
+            return _pack_error(ERROR_RECEIVE_TIMEOUT)
+
+        try:
+            (response,) = self.interface._transmit_receive([(address, (FrameFormat.WORDS, list(words)))],
+                                                           [response_length],
+                                                           timeout_milliseconds / 1000 or None)
+        except NotImplementedError:
+            response = ReceiveTimeout()
+
+        if isinstance(response, ReceiveTimeout):
+            return _pack_error(ERROR_RECEIVE_TIMEOUT)
+
+        return bytes([0x01]) + struct.pack(f'<{len(response)}H', *response)
+
+    def _handle_info(self, buffer):
+        if len(buffer) < 1:
+            return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_INFO_BUFFER_COUNT_1')
+
+        query = buffer[0]
+
+        if query == INFO_SUPPORTED_QUERIES:
+            return bytes([0x01, INFO_SUPPORTED_QUERIES, INFO_HARDWARE_TYPE, INFO_FIRMWARE_VERSION,
+                          INFO_MESSAGE_BUFFER_SIZE, INFO_FEATURES])
+
+        if query == INFO_HARDWARE_TYPE:
+            return bytes([0x01]) + b'interface2'
+
+        if query == INFO_FIRMWARE_VERSION:
+            return bytes([0x01]) + b'0.0.0 (stand-in)'
+
+        if query == INFO_MESSAGE_BUFFER_SIZE:
+            return bytes([0x01]) + struct.pack('>I', self.message_buffer_size)
+
+        if query == INFO_FEATURES:
+            return bytes([0x01, FEATURE_PROTOCOL_3299])
+
+        return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_INFO_UNKNOWN_QUERY')
+
+    def _handle_test(self, buffer):
+        if len(buffer) < 1:
+            return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_TEST_BUFFER_COUNT_1')
+
+        if buffer[0] == TEST_SUPPORTED_TESTS:
+            return bytes([0x01, TEST_SUPPORTED_TESTS])
+
+        return _pack_error(ERROR_INVALID_MESSAGE, 'HANDLE_TEST_UNKNOWN_TEST')
+
+    def _send(self, response, message_id):
+        packet = encode(struct.pack('>H', len(response)) + response + struct.pack('>H', message_id))
+
+        if self.usb_latency:
+            time.sleep(self.usb_latency)
+
+        self._pace(len(packet))
+
+        while packet:
+            count = os.write(self._master_fd, packet)
+
+            packet = packet[count:]
+
+    def _pace(self, count):
+        # Each byte is sent as a start bit, 8 data bits and a stop bit.
+        if self.baud_rate:
+            time.sleep((count * 10) / self.baud_rate)
+
+def _pack_error(code, description=None):
+    message = bytes([0x02, code])
+
+    if description is not None:
+        message += description.encode('ascii')
+
+    return message
+
+def main():
+    parser = argparse.ArgumentParser(description='interface2 firmware stand-in on a pseudo-terminal')
+
+    parser.add_argument('--ports', type=int, nargs='+', help='3299 multiplexer ports with a terminal attached')
+    parser.add_argument('--eab-feature-address', type=int, help='EAB feature address')
+    parser.add_argument('--usb-latency', type=float, default=0, help='USB latency in milliseconds')
+    parser.add_argument('--baud-rate', type=int, help='Serial baud rate to pace messages to')
+    parser.add_argument('--realtime', action='store_true', help='Delay responses by the coax wire time')
+
+    args = parser.parse_args()
+
+    def create_terminal():
+        return SimulatedTerminal(eab_feature_address=args.eab_feature_address)
+
+    if args.ports:
+        terminals = {port: create_terminal() for port in args.ports}
+    else:
+        terminals = create_terminal()
+
+    interface = SimulatedInterface(terminals, realtime=args.realtime)
+
+    stand_in = FirmwareStandIn(interface, usb_latency=args.usb_latency / 1000, baud_rate=args.baud_rate)
+
+    print(stand_in.port, flush=True)
+
+    try:
+        stand_in.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.close()
+
+if __name__ == '__main__':
+    main()
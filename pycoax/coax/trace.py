@@ -0,0 +1,276 @@
+"""
+coax.trace
+~~~~~~~~~~
+
+Wire trace recording and replay.
+
+A TraceRecorder attached to a SerialInterface records every message sent and
+received, before SLIP encoding, with a monotonic timestamp. The trace can be
+saved and then replayed with open_replay_interface(), which serves the
+recorded responses to the same sequence of messages without an interface or
+terminal attached.
+"""
+
+import time
+import json
+import struct
+from collections import deque
+from sliplib import encode
+
+from .interface import InterfaceFeature
+from .serial_interface import SerialInterface, SlipDecoder, TRACE_SENT as SENT, TRACE_RECEIVED as RECEIVED
+from .exceptions import ReplayError
+
+_MAGIC = b'COAXTRC'
+_VERSION = 1
+
+# Magic, version and metadata length followed by the JSON metadata.
+_HEADER = struct.Struct('<7sBI')
+
+# Timestamp in nanoseconds, direction and message length followed by the
+# message.
+_RECORD = struct.Struct('<QBI')
+
+class TraceRecorder:
+    """Ring buffer of messages sent and received by a SerialInterface.
+
+    Once capacity messages have been recorded the oldest are discarded, so
+    the recorder can be left attached indefinitely. Each record is a
+    (timestamp, direction, message) tuple, the timestamp is in nanoseconds
+    from the clock.
+    """
+
+    def __init__(self, capacity=65536, clock=time.monotonic_ns):
+        if capacity < 1:
+            raise ValueError('Capacity must be at least 1')
+
+        self.records = deque(maxlen=capacity)
+        self.clock = clock
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, direction, message):
+        """Record a message."""
+        self.records.append((self.clock(), direction, bytes(message)))
+
+    def clear(self):
+        """Discard all records."""
+        self.records.clear()
+
+    def save(self, path, interface=None):
+        """Save the trace to a file.
+
+        If the interface is provided its configuration and negotiated
+        capabilities are saved, so that the trace can be replayed even if
+        the reset has been discarded from the ring buffer.
+        """
+        metadata = _get_interface_state(interface) if interface is not None else {}
+
+        save_trace(path, list(self.records), metadata)
+
+def save_trace(path, records, metadata=None):
+    """Save (timestamp, direction, message) records to a trace file."""
+    encoded_metadata = json.dumps(metadata or {}).encode('utf-8')
+
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(encoded_metadata)))
+        file.write(encoded_metadata)
+
+        for (timestamp, direction, message) in records:
+            file.write(_RECORD.pack(timestamp, direction, len(message)))
+            file.write(message)
+
+def load_trace(path):
+    """Load a trace file, returning the records and metadata."""
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if len(data) < _HEADER.size:
+        raise ValueError('Invalid trace file')
+
+    (magic, version, metadata_length) = _HEADER.unpack_from(data)
+
+    if magic != _MAGIC:
+        raise ValueError('Invalid trace file')
+
+    if version != _VERSION:
+        raise ValueError(f'Unsupported trace file version: {version}')
+
+    offset = _HEADER.size
+
+    metadata = json.loads(data[offset:offset + metadata_length].decode('utf-8'))
+
+    offset += metadata_length
+
+    records = []
+
+    while offset < len(data):
+        if offset + _RECORD.size > len(data):
+            raise ValueError('Truncated trace file')
+
+        (timestamp, direction, length) = _RECORD.unpack_from(data, offset)
+
+        offset += _RECORD.size
+
+        if offset + length > len(data):
+            raise ValueError('Truncated trace file')
+
+        records.append((timestamp, direction, data[offset:offset + length]))
+
+        offset += length
+
+    return (records, metadata)
+
+class ReplaySerial:
+    """Serial port replacement that replays the responses from a trace.
+
+    Each message written must match the next message sent in the trace,
+    ignoring the message identifier, otherwise a ReplayError is raised. The
+    messages received following it in the trace are then returned by read(),
+    with their message identifiers mapped to the identifiers written.
+
+    If realtime is true responses are delayed as they were when recorded,
+    otherwise they are available immediately. Reading when no response is
+    pending returns no data, as for a serial port timeout.
+    """
+
+    def __init__(self, records, realtime=False):
+        self.records = records
+        self.realtime = realtime
+
+        self.timeout = None
+        self.closed = False
+
+        self._index = 0
+
+        # Responses that were received before the first message sent in the
+        # trace, if the ring buffer discarded the message, are skipped.
+        while self._index < len(records) and records[self._index][1] != SENT:
+            self._index += 1
+
+        self._decoder = SlipDecoder()
+        self._message_ids = {}
+
+        self._pending = deque()
+        self._buffer = bytearray()
+
+    @property
+    def is_exhausted(self):
+        """Have all messages in the trace been sent, and responses read?"""
+        return self._index >= len(self.records) and not self._pending and not self._buffer
+
+    @property
+    def in_waiting(self):
+        self._release()
+
+        return len(self._buffer)
+
+    def write(self, data):
+        self._decoder.feed(data)
+
+        while True:
+            message = self._decoder.decode_msg()
+
+            if message is None:
+                break
+
+            self._replay_message(bytes(message))
+
+        return len(data)
+
+    def read(self, size=1):
+        self._release()
+
+        if not self._buffer and self._pending:
+            time.sleep(max(self._pending[0][0] - time.perf_counter(), 0))
+
+            self._release()
+
+        data = bytes(self._buffer[:size])
+
+        del self._buffer[:size]
+
+        return data
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._release()
+
+        self._buffer.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def _replay_message(self, message):
+        if self._index >= len(self.records):
+            raise ReplayError(f'Message sent after end of trace: {message.hex()}')
+
+        (sent_timestamp, _, expected_message) = self.records[self._index]
+
+        if message[:-2] != expected_message[:-2]:
+            raise ReplayError(f'Message does not match trace: expected {expected_message.hex()}, '
+                              f'sent {message.hex()}')
+
+        self._message_ids[expected_message[-2:]] = message[-2:]
+
+        self._index += 1
+
+        now = time.perf_counter()
+
+        while self._index < len(self.records) and self.records[self._index][1] == RECEIVED:
+            (timestamp, _, response) = self.records[self._index]
+
+            delay = (timestamp - sent_timestamp) / 1e9 if self.realtime else 0
+
+            response = response[:-2] + self._message_ids.get(response[-2:], response[-2:])
+
+            self._pending.append((now + delay, encode(response)))
+
+            self._index += 1
+
+    def _release(self):
+        now = time.perf_counter()
+
+        while self._pending and self._pending[0][0] <= now:
+            self._buffer += self._pending.popleft()[1]
+
+def open_replay_interface(path, realtime=False):
+    """Create a SerialInterface that replays a trace file.
+
+    The interface configuration and negotiated capabilities are restored from
+    the trace, if saved, so the interface does not need to be reset unless
+    the reset was recorded.
+    """
+    (records, metadata) = load_trace(path)
+
+    interface = SerialInterface(ReplaySerial(records, realtime=realtime),
+                                pipeline_depth=metadata.get('pipeline_depth', 1),
+                                compress=metadata.get('compress', False))
+
+    _set_interface_state(interface, metadata)
+
+    return interface
+
+# Interface attributes saved in the trace metadata.
+_INTERFACE_STATE_ATTRIBUTES = ['pipeline_depth', 'compress', 'legacy_firmware_detected', 'legacy_firmware_version',
+                               'hardware_type', 'firmware_version', 'message_buffer_size']
+
+def _get_interface_state(interface):
+    state = {name: getattr(interface, name) for name in _INTERFACE_STATE_ATTRIBUTES}
+
+    state['features'] = sorted(feature.value for feature in interface.features)
+
+    return state
+
+def _set_interface_state(interface, state):
+    for name in _INTERFACE_STATE_ATTRIBUTES:
+        if name in state:
+            setattr(interface, name, state[name])
+
+    interface.features = {InterfaceFeature(value) for value in state.get('features', [])}
@@ -0,0 +1,201 @@
+import struct
+import socket
+import asyncio
+import unittest
+from unittest.mock import Mock
+import sliplib
+
+import context
+
+from coax.interface import InterfaceFeature
+from coax.protocol import ReadAddressCounterHi, ReadAddressCounterLo, LoadAddressCounterHi, Slot
+from coax.async_serial_interface import AsyncSerialInterface
+from coax.serial_interface import SlipDecoder
+from coax.exceptions import InterfaceError, InterfaceTimeout, ReceiveTimeout
+
+class AsyncSerialInterfaceTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        (self.port, self.device) = socket.socketpair()
+
+        self.port.setblocking(False)
+        self.device.setblocking(False)
+
+        self.serial = Mock()
+
+        self.serial.fileno = self.port.fileno
+
+        self.decoder = SlipDecoder()
+
+        self.interface = AsyncSerialInterface(self.serial, timeout=1)
+
+    async def asyncTearDown(self):
+        self.interface.close()
+
+        self.port.close()
+        self.device.close()
+
+    async def test_reset(self):
+        # Arrange
+        task = asyncio.create_task(self.interface.reset())
+
+        # Act and assert
+        (message, message_id) = await self._receive_message()
+
+        self.assertEqual(message, bytes.fromhex('01'))
+
+        self._send_message(bytes.fromhex('01 32 70'), message_id)
+
+        for (query, response) in [('f0 01', '01 01 02 06 07'), ('f0 02', '01 69 32'), ('f0 06', '01 00 00 01 00'), ('f0 07', '01 10')]:
+            (message, message_id) = await self._receive_message()
+
+            self.assertEqual(message, bytes.fromhex(query))
+
+            self._send_message(bytes.fromhex(response), message_id)
+
+        await task
+
+        self.assertFalse(self.interface.legacy_firmware_detected)
+        self.assertEqual(self.interface.hardware_type, 'i2')
+        self.assertIsNone(self.interface.firmware_version)
+        self.assertEqual(self.interface.message_buffer_size, 256)
+        self.assertEqual(self.interface.features, { InterfaceFeature.PROTOCOL_3299 })
+
+    async def test_execute(self):
+        # Arrange
+        task = asyncio.create_task(self.interface.execute(ReadAddressCounterHi()))
+
+        # Act
+        (message, message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('01 08 00'), message_id)
+
+        response = await task
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('06 00 00 15 00 00 01 00 00'))
+        self.assertEqual(response, 0x02)
+
+    async def test_execute_program(self):
+        # Arrange
+        program = self.interface.compile(LoadAddressCounterHi(Slot('hi')))
+
+        task = asyncio.create_task(self.interface.execute_program(program, {'hi': 0x02}))
+
+        # Act
+        (message, message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('01 00 00'), message_id)
+
+        response = await task
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('06 00 00 11 00 08 00 00 01 00 00'))
+        self.assertIsNone(response)
+
+    async def test_receive_timeout_is_mapped_to_command(self):
+        # Arrange
+        self.interface.pipeline_depth = 2
+
+        task = asyncio.create_task(self.interface.execute([ReadAddressCounterHi(), ReadAddressCounterLo()]))
+
+        # Act
+        (_, first_message_id) = await self._receive_message()
+        (_, second_message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('02 66'), first_message_id)
+        self._send_message(bytes.fromhex('01 10 00'), second_message_id)
+
+        responses = await task
+
+        # Assert
+        self.assertIsInstance(responses[0], ReceiveTimeout)
+        self.assertEqual(responses[1], 0x04)
+
+    async def test_interface_error(self):
+        # Arrange
+        task = asyncio.create_task(self.interface.execute(ReadAddressCounterHi()))
+
+        # Act
+        (_, message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('02 01'), message_id)
+
+        # Assert
+        with self.assertRaises(InterfaceError):
+            await task
+
+    async def test_timeout(self):
+        # Arrange
+        self.interface.timeout = 0.01
+
+        # Act and assert
+        with self.assertRaises(InterfaceTimeout):
+            await self.interface.execute(ReadAddressCounterHi())
+
+    async def test_stale_message_is_discarded(self):
+        # Arrange
+        self.interface.timeout = 0.01
+
+        with self.assertRaises(InterfaceTimeout):
+            await self.interface.execute(ReadAddressCounterHi())
+
+        (_, stale_message_id) = await self._receive_message()
+
+        task = asyncio.create_task(self.interface.execute(ReadAddressCounterLo()))
+
+        # Act
+        (_, message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('01 08 00'), stale_message_id)
+        self._send_message(bytes.fromhex('01 10 00'), message_id)
+
+        response = await task
+
+        # Assert
+        self.assertEqual(response, 0x04)
+
+    async def test_concurrent_executes_are_not_interleaved(self):
+        # Arrange
+        first_task = asyncio.create_task(self.interface.execute(ReadAddressCounterHi()))
+        second_task = asyncio.create_task(self.interface.execute(ReadAddressCounterLo()))
+
+        # Act
+        (first_message, first_message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('01 08 00'), first_message_id)
+
+        (second_message, second_message_id) = await self._receive_message()
+
+        self._send_message(bytes.fromhex('01 10 00'), second_message_id)
+
+        # Assert
+        self.assertEqual(await first_task, 0x02)
+        self.assertEqual(await second_task, 0x04)
+
+        self.assertEqual(first_message[3], 0x15)
+        self.assertEqual(second_message[3], 0x55)
+
+    async def _receive_message(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            message = self.decoder.decode_msg()
+
+            if message is not None:
+                break
+
+            self.decoder.feed(await asyncio.wait_for(loop.sock_recv(self.device, 4096), 1))
+
+        (length,) = struct.unpack('>H', message[:2])
+
+        self.assertEqual(len(message), length + 4)
+
+        (message_id,) = struct.unpack('>H', message[-2:])
+
+        return (bytes(message[2:-2]), message_id)
+
+    def _send_message(self, message, message_id):
+        self.device.send(sliplib.encode(struct.pack('>H', len(message)) + message + struct.pack('>H', message_id)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from serial import Serial
+
+import context
+
+from coax.interface import InterfaceFeature
+from coax.protocol import Poll, PollAck, ReadTerminalId, LoadAddressCounterHi, LoadAddressCounterLo, WriteData, \
+                          EABWriteAlternate, KeystrokePollResponse
+from coax.serial_interface import SerialInterface
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.multiplexer import get_device_address
+from coax.tools.firmware_standin import FirmwareStandIn
+from coax.exceptions import ReceiveTimeout, ReceiveError, InterfaceError
+
+class FirmwareStandInTestCase(unittest.TestCase):
+    def setUp(self):
+        self.terminals = {0: SimulatedTerminal(power_on_reset=False), 2: SimulatedTerminal(power_on_reset=False)}
+
+        self.stand_in = FirmwareStandIn(SimulatedInterface(self.terminals))
+
+        self.stand_in.start()
+
+        self.serial = Serial(self.stand_in.port, 115200, timeout=1)
+
+        self.interface = SerialInterface(self.serial, pipeline_depth=4)
+
+        self.interface.reset()
+
+    def tearDown(self):
+        self.serial.close()
+
+        self.stand_in.close()
+
+    def test_reset(self):
+        self.assertFalse(self.interface.legacy_firmware_detected)
+        self.assertEqual(self.interface.hardware_type, 'interface2')
+        self.assertEqual(self.interface.message_buffer_size, 14818)
+        self.assertEqual(self.interface.features, {InterfaceFeature.PROTOCOL_3299})
+
+    def test_execute(self):
+        # Act
+        responses = self.interface.execute([ReadTerminalId(), LoadAddressCounterHi(0), LoadAddressCounterLo(0x50),
+                                            WriteData(b'\x01\x02' + bytes(64))])
+
+        # Assert
+        self.assertEqual(responses[0].model, 2)
+        self.assertEqual(responses[1:], [None, None, None])
+
+        self.assertEqual(self.terminals[0].get_text(0x50, 66), b'\x01\x02' + bytes(64))
+
+    def test_execute_compressed(self):
+        # Arrange
+        self.interface.compress = True
+
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0), WriteData(b'\x01' + bytes(100) + b'\x02')])
+
+        # Assert
+        self.assertEqual(self.terminals[0].get_text(0, 103), b'\x01' + bytes(100) + b'\x02\x00')
+
+    def test_execute_addressed(self):
+        # Arrange
+        self.terminals[2].inject_keystrokes([0x51])
+
+        # Act
+        responses = self.interface.execute([(get_device_address(2), Poll()), (get_device_address(2), PollAck()),
+                                            (get_device_address(5), Poll())])
+
+        # Assert
+        self.assertIsInstance(responses[0], KeystrokePollResponse)
+        self.assertEqual(responses[0].scan_code, 0x51)
+
+        self.assertIsNone(responses[1])
+
+        self.assertIsInstance(responses[2], ReceiveTimeout)
+
+    def test_injected_receiver_error(self):
+        # Arrange
+        self.stand_in.inject_error(104, 'Parity error')
+
+        # Act
+        responses = self.interface.execute([Poll(), Poll()])
+
+        # Assert
+        self.assertIsInstance(responses[0], ReceiveError)
+        self.assertEqual(responses[0].args, ('Receiver error: Parity error',))
+
+        self.assertIsNone(responses[1])
+
+    def test_injected_receiver_active(self):
+        # Arrange
+        self.stand_in.inject_error(101)
+
+        # Act and assert
+        with self.assertRaisesRegex(InterfaceError, 'Receiver active'):
+            self.interface.execute(Poll())
+
+class FirmwareStandInEABTestCase(unittest.TestCase):
+    def setUp(self):
+        self.terminal = SimulatedTerminal(eab_feature_address=7, power_on_reset=False)
+
+        self.stand_in = FirmwareStandIn(SimulatedInterface(self.terminal), message_buffer_size=40)
+
+        self.stand_in.start()
+
+        self.serial = Serial(self.stand_in.port, 115200, timeout=1)
+
+        self.interface = SerialInterface(self.serial)
+
+        self.interface.reset()
+
+    def tearDown(self):
+        self.serial.close()
+
+        self.stand_in.close()
+
+    def test_split_eab_write_alternate(self):
+        # Arrange
+        regen_data = bytes(range(0x01, 0x29))
+        eab_data = bytes(range(0x81, 0xa9))
+
+        data = bytes(byte for pair in zip(regen_data, eab_data) for byte in pair)
+
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), EABWriteAlternate(7, data)])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x50, 40), regen_data)
+        self.assertEqual(self.terminal.get_eab_text(0x50, 40), eab_data)
+
+    def test_compressed_eab_write_alternate(self):
+        # Arrange
+        self.interface.compress = True
+
+        regen_data = b'\xc1' + bytes(40)
+        eab_data = b'\x01' * 41
+
+        data = bytes(byte for pair in zip(regen_data, eab_data) for byte in pair)
+
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), EABWriteAlternate(7, data)])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x50, 41), regen_data)
+        self.assertEqual(self.terminal.get_eab_text(0x50, 41), eab_data)
+
+if __name__ == '__main__':
+    unittest.main()
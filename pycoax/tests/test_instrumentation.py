@@ -0,0 +1,183 @@
+import unittest
+
+import context
+
+from coax.protocol import Poll, PollAck, ReadStatus, WriteData, FrameFormat
+from coax.multiplexer import get_device_address
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.instrumentation import Histogram, MetricsObserver, count_frame_words
+
+class HistogramTestCase(unittest.TestCase):
+    def test_observe(self):
+        # Arrange
+        histogram = Histogram([1, 2, 4])
+
+        # Act
+        for value in [0.5, 1, 1.5, 3, 10]:
+            histogram.observe(value)
+
+        # Assert
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 16)
+
+    def test_quantile(self):
+        # Arrange
+        histogram = Histogram([1, 2, 4])
+
+        for value in [0.5, 1, 1.5, 3]:
+            histogram.observe(value)
+
+        # Act and assert
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.75), 2)
+        self.assertEqual(histogram.quantile(1), 4)
+
+    def test_quantile_empty(self):
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            Histogram([2, 1])
+
+class CountFrameWordsTestCase(unittest.TestCase):
+    def test_words(self):
+        self.assertEqual(count_frame_words(None, (FrameFormat.WORDS, [1, 2])), 2)
+
+    def test_words_with_repeat(self):
+        self.assertEqual(count_frame_words(None, (FrameFormat.WORDS, ([1, 2], 3))), 6)
+
+    def test_word_data(self):
+        self.assertEqual(count_frame_words(None, (FrameFormat.WORD_DATA, 1, b'\x01\x02')), 3)
+
+    def test_word_data_with_repeat(self):
+        self.assertEqual(count_frame_words(None, (FrameFormat.WORD_DATA, 1, (b'\x01\x02', 4))), 9)
+
+    def test_data(self):
+        self.assertEqual(count_frame_words(None, (FrameFormat.DATA, b'\x01\x02')), 2)
+
+    def test_address(self):
+        self.assertEqual(count_frame_words(0x10, (FrameFormat.WORDS, [1])), 2)
+
+class MetricsObserverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = SimulatedInterface({0: SimulatedTerminal(power_on_reset=False)})
+
+        self.observer = MetricsObserver()
+
+        self.interface.add_observer(self.observer)
+
+    def test_commands(self):
+        # Act
+        self.interface.execute([Poll(), ReadStatus(), (get_device_address(1), Poll()), WriteData(bytes(8))])
+
+        self.interface.execute(Poll())
+
+        # Assert
+        self.assertEqual(self.observer.executions, 2)
+
+        self.assertEqual(self.observer.commands[('Poll', None)].count, 2)
+        self.assertEqual(self.observer.commands[('Poll', None)].latency.count, 2)
+        self.assertEqual(self.observer.commands[('ReadStatus', None)].count, 1)
+
+        self.assertEqual(self.observer.commands[('Poll', get_device_address(1))].receive_timeouts, 1)
+
+        self.assertEqual(self.observer.words_written, 1 + 1 + 2 + 9 + 1)
+        self.assertEqual(self.observer.words_read, 1 + 1 + 1 + 1)
+
+        self.assertEqual(self.observer.execute_latency.count, 2)
+
+    def test_error(self):
+        # Arrange
+        interface = SimulatedInterface(SimulatedTerminal())
+
+        interface.add_observer(self.observer)
+
+        # Act
+        with self.assertRaises(NotImplementedError):
+            interface.execute((get_device_address(1), Poll()))
+
+        # Assert
+        self.assertEqual(self.observer.errors, {'NotImplementedError': 1})
+
+        self.assertEqual(self.observer.execute_latency.count, 0)
+
+    def test_to_dict(self):
+        # Arrange
+        self.interface.execute([Poll(), PollAck()])
+
+        # Act
+        metrics = self.observer.to_dict()
+
+        # Assert
+        self.assertEqual(metrics['executions'], 1)
+
+        self.assertEqual([(command['command'], command['address'], command['count']) for command in metrics['commands']],
+                         [('Poll', None, 1), ('PollAck', None, 1)])
+
+    def test_to_text(self):
+        # Arrange
+        self.interface.execute(Poll())
+
+        # Act
+        text = self.observer.to_text()
+
+        # Assert
+        self.assertIn('coax_executions_total 1\n', text)
+        self.assertIn('coax_commands_total{command="Poll",address=""} 1\n', text)
+        self.assertIn('coax_command_latency_seconds_bucket{command="Poll",address="",le="+Inf"} 1\n', text)
+        self.assertIn('coax_wire_words_total{direction="written"} 1\n', text)
+
+    def test_to_text_types(self):
+        # Arrange
+        self.interface.execute([Poll(), ReadStatus()])
+
+        # Act
+        lines = self.observer.to_text().splitlines()
+
+        # Assert
+        type_lines = [line for line in lines if line.startswith('# TYPE')]
+
+        self.assertIn('# TYPE coax_executions_total counter', type_lines)
+        self.assertIn('# TYPE coax_commands_total counter', type_lines)
+        self.assertIn('# TYPE coax_command_latency_seconds histogram', type_lines)
+        self.assertIn('# TYPE coax_phase_latency_seconds histogram', type_lines)
+
+        self.assertEqual(len(type_lines), len(set(type_lines)))
+
+        # All samples for a family follow its type line.
+        families = [line.split()[2] for line in type_lines]
+
+        for (index, family) in enumerate(families):
+            start = lines.index(type_lines[index])
+            end = lines.index(type_lines[index + 1]) if index + 1 < len(type_lines) else len(lines)
+
+            self.assertTrue(all(line.startswith(family) for line in lines[start + 1:end]))
+
+class InterfaceObserverTestCase(unittest.TestCase):
+    def test_remove_observer(self):
+        # Arrange
+        interface = SimulatedInterface(SimulatedTerminal(power_on_reset=False))
+
+        executions = []
+
+        interface.add_observer(executions.append)
+
+        interface.execute(Poll())
+
+        # Act
+        interface.remove_observer(executions.append)
+
+        interface.execute(Poll())
+
+        # Assert
+        self.assertEqual(len(executions), 1)
+
+        self.assertEqual(interface.observers, ())
+
+    def test_remove_unknown_observer(self):
+        with self.assertRaises(ValueError):
+            SimulatedInterface(SimulatedTerminal()).remove_observer(print)
+
+if __name__ == '__main__':
+    unittest.main()
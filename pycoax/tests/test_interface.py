@@ -153,6 +153,46 @@ class InterfaceExecuteTestCase(unittest.TestCase):
         self.assertEqual(response[0], 0x02)
         self.assertIsInstance(response[1], ProtocolError)
 
+    def test_invalid_command(self):
+        for commands in [None, (0b111000, None), ('address', ReadAddressCounterHi()), [ReadAddressCounterHi(), None]]:
+            with self.subTest(commands=commands):
+                with self.assertRaises(TypeError):
+                    self.interface.execute(commands)
+
+class InterfaceExecuteBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = Interface()
+
+        self.interface._transmit_receive = Mock()
+
+    def test(self):
+        # Arrange
+        self.interface._transmit_receive.return_value=[[0b00000010_00]]
+
+        # Act
+        responses = self.interface.execute_batch([(None, ReadAddressCounterHi())], timeout=0.1)
+
+        # Assert
+        self.assertEqual(responses, [0x02])
+
+        self.interface._transmit_receive.assert_called_once()
+
+        (outbound_frames, response_lengths, timeout) = self.interface._transmit_receive.call_args[0]
+
+        self.assertEqual(outbound_frames, [(None, (FrameFormat.WORD_DATA, 0b000_00101_01))])
+        self.assertEqual(response_lengths, [1])
+        self.assertEqual(timeout, 0.1)
+
+    def test_receive_timeout(self):
+        # Arrange
+        self.interface._transmit_receive.return_value=[ReceiveTimeout()]
+
+        # Act
+        responses = self.interface.execute_batch([(0b111000, ReadAddressCounterHi())])
+
+        # Assert
+        self.assertIsInstance(responses[0], ReceiveTimeout)
+
 class NormalizeFrameTestCase(unittest.TestCase):
     def test_words_with_no_address_no_repeat(self):
         # Arrange
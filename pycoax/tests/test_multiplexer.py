@@ -0,0 +1,138 @@
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import Poll, PollAck, KeystrokePollResponse
+from coax.multiplexer import MultiplexerPoller, get_device_address
+from coax.exceptions import ReceiveTimeout
+
+class MultiplexerPollerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = Mock()
+
+        self.responses = {}
+
+        self.interface.execute = Mock(side_effect=self._execute)
+
+        self.poller = MultiplexerPoller(self.interface, ports=[0, 1, 2])
+
+    def test_all_ports_are_polled_in_single_execute(self):
+        # Act
+        events = self.poller.poll(block=False)
+
+        # Assert
+        self.assertEqual(events, [])
+
+        self.interface.execute.assert_called_once()
+
+        self.assertEqual(self._get_commands(), [(0, Poll), (1, Poll), (2, Poll)])
+
+    def test_poll_ack_is_sent_in_next_batch(self):
+        # Arrange
+        keystroke = KeystrokePollResponse(0b0101010110)
+
+        self.responses[(1, Poll)] = keystroke
+
+        # Act
+        events = self.poller.poll(block=False)
+
+        self.responses.clear()
+
+        self.poller.poll(block=False)
+
+        # Assert
+        self.assertEqual(events, [(1, keystroke)])
+
+        self.assertEqual(self._get_commands(), [(1, PollAck), (1, Poll)])
+
+    def test_failed_poll_ack_is_sent_again(self):
+        # Arrange
+        keystroke = KeystrokePollResponse(0b0101010110)
+
+        self.responses[(1, Poll)] = keystroke
+
+        self.poller.poll(block=False)
+
+        self.responses[(1, PollAck)] = ReceiveTimeout()
+
+        # Act
+        events = self.poller.poll(block=False)
+
+        self.responses.clear()
+
+        self.poller.poll(block=False)
+
+        # Assert
+        self.assertEqual(events, [])
+
+        self.assertEqual(self._get_commands(), [(1, PollAck), (1, Poll)])
+
+    def test_poll_ack_is_not_sent_again_after_success(self):
+        # Arrange
+        self.responses[(1, Poll)] = KeystrokePollResponse(0b0101010110)
+
+        self.poller.poll(block=False)
+
+        self.responses.clear()
+
+        # Act
+        self.poller.poll(block=False)
+
+        # Assert
+        self.assertGreater(self.poller.time_until_next_poll(), 0)
+
+    def test_absent_port_is_polled_at_absent_interval(self):
+        # Arrange
+        self.responses[(2, Poll)] = ReceiveTimeout()
+
+        # Act
+        events = self.poller.poll(block=False)
+
+        # Assert
+        self.assertEqual(events, [])
+
+        self.assertFalse(self.poller.is_present(2))
+        self.assertTrue(self.poller.is_present(0))
+
+    def test_no_execute_when_no_ports_are_due(self):
+        # Arrange
+        self.poller.poll(block=False)
+
+        # Act
+        events = self.poller.poll(block=False)
+
+        # Assert
+        self.assertEqual(events, [])
+
+        self.interface.execute.assert_called_once()
+
+    def test_time_until_next_poll(self):
+        # Arrange
+        self.poller.poll(block=False)
+
+        # Act and assert
+        self.assertGreater(self.poller.time_until_next_poll(), 0)
+
+    def test_time_until_next_poll_with_pending_ack(self):
+        # Arrange
+        self.responses[(0, Poll)] = KeystrokePollResponse(0b0101010110)
+
+        self.poller.poll(block=False)
+
+        # Act and assert
+        self.assertEqual(self.poller.time_until_next_poll(), 0)
+
+    def _execute(self, commands, timeout=None):
+        return [self.responses.get((self._get_port(address), type(command))) for (address, command) in commands]
+
+    def _get_commands(self):
+        commands = self.interface.execute.call_args[0][0]
+
+        return [(self._get_port(address), type(command)) for (address, command) in commands]
+
+    def _get_port(self, address):
+        return [get_device_address(port) for port in range(8)].index(address)
+
+if __name__ == '__main__':
+    unittest.main()
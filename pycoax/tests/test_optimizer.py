@@ -0,0 +1,193 @@
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import ReadStatus, LoadControlRegister, Control, LoadMask, \
+                          LoadAddressCounterHi, LoadAddressCounterLo, WriteData, Data
+from coax.interface import Interface
+from coax.optimizer import optimize_commands, map_optimized_responses
+from coax.exceptions import ReceiveTimeout
+
+class OptimizeCommandsTestCase(unittest.TestCase):
+    def test_consecutive_writes_are_merged(self):
+        # Arrange
+        commands = [(None, WriteData(b'\x01\x02')), (None, WriteData(b'\x03')), (None, Data(b'\x04'))]
+
+        # Act
+        (optimized_commands, response_indexes) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(_describe(optimized_commands), [('WriteData', b'\x01\x02\x03\x04')])
+
+        self.assertEqual(response_indexes, [[0], [0], [0]])
+
+    def test_writes_separated_by_adjacent_address_load_are_merged(self):
+        # Arrange
+        commands = [
+            (None, LoadAddressCounterHi(0)),
+            (None, LoadAddressCounterLo(0x80)),
+            (None, WriteData(b'\x01\x02')),
+            (None, LoadAddressCounterLo(0x82)),
+            (None, WriteData(b'\x03'))
+        ]
+
+        # Act
+        (optimized_commands, response_indexes) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(_describe(optimized_commands), [
+            ('LoadAddressCounterHi', 0),
+            ('LoadAddressCounterLo', 0x80),
+            ('WriteData', b'\x01\x02\x03')
+        ])
+
+        self.assertEqual(response_indexes, [[0], [1], [2], [2], [2]])
+
+    def test_writes_separated_by_other_address_load_are_not_merged(self):
+        # Arrange
+        commands = [
+            (None, LoadAddressCounterHi(0)),
+            (None, LoadAddressCounterLo(0x80)),
+            (None, WriteData(b'\x01\x02')),
+            (None, LoadAddressCounterLo(0x90)),
+            (None, WriteData(b'\x03'))
+        ]
+
+        # Act
+        (optimized_commands, _) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(len(optimized_commands), 5)
+
+    def test_writes_to_different_addresses_are_not_merged(self):
+        # Arrange
+        commands = [(1, WriteData(b'\x01')), (2, WriteData(b'\x02'))]
+
+        # Act
+        (optimized_commands, _) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(_describe(optimized_commands), [('WriteData', b'\x01'), ('WriteData', b'\x02')])
+
+    def test_writes_with_step_inhibit_are_not_merged_across_loads(self):
+        # Arrange
+        commands = [
+            (None, LoadControlRegister(Control(step_inhibit=True))),
+            (None, LoadAddressCounterHi(0)),
+            (None, LoadAddressCounterLo(0x80)),
+            (None, WriteData(b'\x01')),
+            (None, LoadAddressCounterLo(0x81)),
+            (None, WriteData(b'\x02'))
+        ]
+
+        # Act
+        (optimized_commands, _) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(len(optimized_commands), 6)
+
+    def test_overwritten_loads_are_dropped(self):
+        # Arrange
+        commands = [
+            (None, LoadAddressCounterHi(1)),
+            (None, LoadAddressCounterLo(2)),
+            (None, LoadAddressCounterHi(3)),
+            (None, WriteData(b'\x01'))
+        ]
+
+        # Act
+        (optimized_commands, response_indexes) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(_describe(optimized_commands), [
+            ('LoadAddressCounterLo', 2),
+            ('LoadAddressCounterHi', 3),
+            ('WriteData', b'\x01')
+        ])
+
+        self.assertEqual(response_indexes, [[1], [0], [1], [2]])
+
+    def test_loads_followed_by_other_command_are_not_dropped(self):
+        # Arrange
+        commands = [(None, LoadAddressCounterHi(1)), (None, ReadStatus()), (None, LoadAddressCounterHi(3))]
+
+        # Act
+        (optimized_commands, _) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(len(optimized_commands), 3)
+
+    def test_repeated_read_status_is_collapsed(self):
+        # Arrange
+        commands = [(None, ReadStatus()), (None, ReadStatus()), (None, ReadStatus()), (1, ReadStatus())]
+
+        # Act
+        (optimized_commands, response_indexes) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(optimized_commands, [commands[0], commands[3]])
+
+        self.assertEqual(response_indexes, [[0], [0], [0], [1]])
+
+    def test_fill_is_not_cleared(self):
+        # Arrange
+        commands = [
+            (None, LoadMask(0x00)),
+            (None, LoadAddressCounterHi(0)),
+            (None, LoadAddressCounterLo(0x50)),
+            (None, WriteData((b'\x00', 0x1000 - 0x50)))
+        ]
+
+        # Act
+        (optimized_commands, _) = optimize_commands(commands)
+
+        # Assert
+        self.assertEqual(optimized_commands, commands)
+
+class MapOptimizedResponsesTestCase(unittest.TestCase):
+    def test(self):
+        # Arrange
+        error = ReceiveTimeout()
+
+        # Act
+        responses = map_optimized_responses(['a', error, 'c'], [[0], [0, 1, 2], [2], []])
+
+        # Assert
+        self.assertEqual(responses, ['a', error, 'c', None])
+
+class InterfaceExecuteOptimizeTestCase(unittest.TestCase):
+    def test(self):
+        # Arrange
+        interface = Interface()
+
+        interface._execute = Mock(side_effect=lambda commands, timeout: [None] * len(commands))
+
+        # Act
+        responses = interface.execute([WriteData(b'\x01'), WriteData(b'\x02'), ReadStatus(), ReadStatus()],
+                                      optimize=True)
+
+        # Assert
+        self.assertEqual(responses, [None, None, None, None])
+
+        self.assertEqual(len(interface._execute.call_args[0][0]), 2)
+
+def _describe(commands):
+    descriptions = []
+
+    for (_, command) in commands:
+        name = type(command).__name__
+
+        if isinstance(command, (WriteData, Data)):
+            descriptions.append((name, command.data))
+        elif isinstance(command, (LoadAddressCounterHi, LoadAddressCounterLo)):
+            descriptions.append((name, command.address))
+        elif isinstance(command, LoadMask):
+            descriptions.append((name, command.mask))
+        else:
+            descriptions.append(name)
+
+    return descriptions
+
+if __name__ == '__main__':
+    unittest.main()
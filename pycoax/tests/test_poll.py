@@ -0,0 +1,196 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import Poll, PollAck, KeystrokePollResponse
+from coax.poll import AdaptivePollInterval, PollDriver
+from coax.exceptions import InterfaceError, ReceiveTimeout
+
+class AdaptivePollIntervalTestCase(unittest.TestCase):
+    def test_idle_backs_off_to_max_interval(self):
+        # Arrange
+        interval = AdaptivePollInterval(min_interval=0.01, max_interval=0.05, backoff=2)
+
+        # Act and assert
+        self.assertEqual(interval.idle(), 0.02)
+        self.assertEqual(interval.idle(), 0.04)
+        self.assertEqual(interval.idle(), 0.05)
+        self.assertEqual(interval.idle(), 0.05)
+
+    def test_activity_resets_to_min_interval(self):
+        # Arrange
+        interval = AdaptivePollInterval(min_interval=0.01, max_interval=0.05)
+
+        interval.idle()
+
+        # Act and assert
+        self.assertEqual(interval.activity(), 0.01)
+
+    def test_invalid_interval_range(self):
+        with self.assertRaises(ValueError):
+            AdaptivePollInterval(min_interval=0.1, max_interval=0.05)
+
+class PollDriverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = Mock()
+
+        self.keystroke = KeystrokePollResponse(0b0101010110)
+
+        self.interface.execute = Mock(return_value=[None])
+
+        self.driver = PollDriver(self.interface, min_interval=0.001, max_interval=0.001)
+
+    def tearDown(self):
+        self.driver.stop()
+
+    def test_poll_with_no_response(self):
+        # Act
+        event = self.driver.poll()
+
+        # Assert
+        self.assertIsNone(event)
+
+        self.assertEqual(self._get_commands(), [Poll])
+
+    def test_poll_ack_is_sent_with_next_poll(self):
+        # Arrange
+        self.interface.execute.return_value = [self.keystroke]
+
+        self.assertEqual(self.driver.poll(), self.keystroke)
+
+        self.interface.execute.return_value = [None, None]
+
+        # Act
+        event = self.driver.poll()
+
+        # Assert
+        self.assertIsNone(event)
+        self.assertFalse(self.driver.needs_ack)
+
+        self.assertEqual(self._get_commands(), [PollAck, Poll])
+
+    def test_failed_poll_ack_is_retried(self):
+        # Arrange
+        self.interface.execute.return_value = [self.keystroke]
+
+        self.driver.poll()
+
+        self.interface.execute.return_value = [ReceiveTimeout(), self.keystroke]
+
+        # Act
+        event = self.driver.poll()
+
+        # Assert
+        self.assertIsNone(event)
+        self.assertTrue(self.driver.needs_ack)
+
+    def test_receive_timeout_event(self):
+        # Arrange
+        self.interface.execute.return_value = [ReceiveTimeout()]
+
+        # Act
+        event = self.driver.poll()
+
+        # Assert
+        self.assertIsInstance(event, ReceiveTimeout)
+
+    def test_interface_error_is_raised(self):
+        # Arrange
+        self.interface.execute.side_effect = InterfaceError('Error')
+
+        # Act and assert
+        with self.assertRaises(InterfaceError):
+            self.driver.poll()
+
+    def test_iterator(self):
+        # Arrange
+        self.interface.execute.side_effect = [[None], [self.keystroke], [None, None]]
+
+        # Act
+        event = next(iter(self.driver))
+
+        # Assert
+        self.assertEqual(event, self.keystroke)
+
+    def test_run(self):
+        # Arrange
+        stop_event = threading.Event()
+
+        events = []
+
+        def callback(event):
+            events.append(event)
+
+            stop_event.set()
+
+        self.interface.execute.side_effect = [[None], [self.keystroke]]
+
+        # Act
+        self.driver.run(callback, stop_event)
+
+        # Assert
+        self.assertEqual(events, [self.keystroke])
+
+    def test_polling_is_paused_when_buffer_is_full(self):
+        # Arrange
+        self.driver = PollDriver(self.interface, min_interval=0.001, max_interval=0.001, max_events=2)
+
+        self.interface.execute.return_value = [self.keystroke]
+
+        # Act
+        self.driver.start()
+
+        self.assertEqual(self.driver.get_event(timeout=1), self.keystroke)
+
+        threading.Event().wait(0.05)
+
+        call_count = self.interface.execute.call_count
+
+        threading.Event().wait(0.05)
+
+        # Assert
+        self.assertEqual(self.interface.execute.call_count, call_count)
+
+    def test_background_interface_error_is_raised(self):
+        # Arrange
+        self.interface.execute.side_effect = InterfaceError('Error')
+
+        # Act
+        self.driver.start()
+
+        # Assert
+        with self.assertRaises(InterfaceError):
+            self.driver.get_event(timeout=1)
+
+    def _get_commands(self):
+        commands = self.interface.execute.call_args[0][0]
+
+        return [type(command) for (_, command) in commands]
+
+class PollDriverAsyncTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_async_iterator(self):
+        # Arrange
+        keystroke = KeystrokePollResponse(0b0101010110)
+
+        responses = iter([[None], [keystroke]])
+
+        async def execute(commands, timeout=None):
+            return next(responses)
+
+        interface = Mock()
+
+        interface.execute = execute
+
+        driver = PollDriver(interface, min_interval=0.001, max_interval=0.001)
+
+        # Act
+        async for event in driver:
+            break
+
+        # Assert
+        self.assertEqual(event, keystroke)
+
+if __name__ == '__main__':
+    unittest.main()
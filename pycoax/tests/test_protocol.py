@@ -1,4 +1,7 @@
+import copy
+import pickle
 import unittest
+from array import array
 
 import context
 
@@ -102,6 +105,31 @@ class PollTestCase(unittest.TestCase):
 
         self.assertEqual(poll_response.scan_code, 0x51)
 
+    def test_unpack_response_is_shared(self):
+        self.assertIs(Poll().unpack_inbound_frame([0b01010001_10]), Poll().unpack_inbound_frame([0b01010001_10]))
+
+    def test_unpack_response_is_immutable(self):
+        poll_response = Poll().unpack_inbound_frame([0b01010001_10])
+
+        with self.assertRaises(AttributeError):
+            poll_response.scan_code = 0x52
+
+    def test_unpack_response_can_be_copied(self):
+        poll_response = Poll().unpack_inbound_frame([0b01010001_10])
+
+        self.assertIs(copy.copy(poll_response), poll_response)
+        self.assertIs(copy.deepcopy(poll_response), poll_response)
+
+    def test_unpack_response_can_be_pickled(self):
+        poll_response = pickle.loads(pickle.dumps(Poll().unpack_inbound_frame([0b01010001_10])))
+
+        self.assertIsInstance(poll_response, KeystrokePollResponse)
+
+        self.assertEqual(poll_response.scan_code, 0x51)
+
+        with self.assertRaises(AttributeError):
+            poll_response.scan_code = 0x52
+
     def test_unpack_invalid_response(self):
         for words in [[], [1, 2]]:
             with self.subTest(words=words):
@@ -141,6 +169,22 @@ class ReadStatusTestCase(unittest.TestCase):
         self.assertTrue(status.feature_error)
         self.assertTrue(status.operation_complete)
 
+    def test_unpack_status_is_shared(self):
+        self.assertIs(ReadStatus().unpack_inbound_frame([0b00100000_00]), ReadStatus().unpack_inbound_frame([0b00100000_00]))
+
+    def test_unpack_status_is_immutable(self):
+        status = ReadStatus().unpack_inbound_frame([0b00100000_00])
+
+        with self.assertRaises(AttributeError):
+            status.busy = True
+
+    def test_unpack_status_can_be_copied(self):
+        status = ReadStatus().unpack_inbound_frame([0b10000110_00])
+
+        self.assertIs(copy.deepcopy(status), status)
+
+        self.assertTrue(pickle.loads(pickle.dumps(status)).busy)
+
     def test_unpack_invalid_response(self):
         for words in [[], [0b1010101011], [1, 2]]:
             with self.subTest(words=words):
@@ -165,12 +209,19 @@ class ReadTerminalIdTestCase(unittest.TestCase):
         self.assertIsNone(terminal_id.model)
         self.assertIsNone(terminal_id.keyboard)
 
+    def test_unpack_terminal_id_is_shared(self):
+        self.assertIs(ReadTerminalId().unpack_inbound_frame([0b1111_010_0_00]), ReadTerminalId().unpack_inbound_frame([0b1111_010_0_00]))
+
     def test_unpack_invalid_response(self):
         for words in [[], [0b1010101011], [1, 2]]:
             with self.subTest(words=words):
                 with self.assertRaises(ProtocolError):
                     ReadTerminalId().unpack_inbound_frame(words)
 
+    def test_unpack_invalid_terminal_id(self):
+        with self.assertRaises(ValueError):
+            ReadTerminalId().unpack_inbound_frame([0b0000_000_0_00])
+
 class ReadExtendedIdTestCase(unittest.TestCase):
     def test_pack(self):
         self.assertEqual(ReadExtendedId().pack_outbound_frame(), (FrameFormat.WORD_DATA, 0b000_00111_01))
@@ -470,5 +521,33 @@ class UnpackDataWordsTestCase(unittest.TestCase):
     def test(self):
         self.assertEqual(unpack_data_words([0b00000000_10, 0b11111111_10]), bytes.fromhex('00 ff'))
 
+    def test_array(self):
+        self.assertEqual(unpack_data_words(array('H', [0b00000000_10, 0b11111111_10])), bytes.fromhex('00 ff'))
+
+    def test_check_parity(self):
+        self.assertEqual(unpack_data_words([0b00000000_10, 0b00000001_00], check_parity=True), bytes.fromhex('00 01'))
+
+    def test_array_check_parity(self):
+        self.assertEqual(unpack_data_words(array('H', [0b00000000_10, 0b00000001_00]), check_parity=True), bytes.fromhex('00 01'))
+
+    def test_array_data_bit_not_set_error(self):
+        with self.assertRaisesRegex(ProtocolError, 'Word does not have data bit set'):
+            unpack_data_words(array('H', [0b00000000_10, 0b00000000_11]))
+
+    def test_array_parity_error(self):
+        with self.assertRaisesRegex(ProtocolError, 'Parity error'):
+            unpack_data_words(array('H', [0b00000000_10, 0b00000000_00]), check_parity=True)
+
+    def test_data_bit_not_set_error(self):
+        with self.assertRaisesRegex(ProtocolError, 'Word does not have data bit set'):
+            unpack_data_words([0b00000000_10, 0b00000000_11])
+
+    def test_parity_error(self):
+        with self.assertRaisesRegex(ProtocolError, 'Parity error'):
+            unpack_data_words([0b00000000_10, 0b00000000_00], check_parity=True)
+
+    def test_word_out_of_range(self):
+        self.assertEqual(unpack_data_words([0b1_11111111_10]), bytes.fromhex('ff'))
+
 if __name__ == '__main__':
     unittest.main()
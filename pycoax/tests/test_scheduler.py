@@ -0,0 +1,159 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import Poll, ReadAddressCounterHi, ReadAddressCounterLo, ReadStatus, LoadAddressCounterHi, \
+                          LoadAddressCounterLo, WriteData
+from coax.scheduler import CommandScheduler, Priority
+from coax.exceptions import InterfaceError, ReceiveTimeout
+
+class CommandSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        self.interface = Mock(pipeline_depth=1)
+
+        self.interface._execute = Mock(side_effect=self._execute)
+
+        self.scheduler = CommandScheduler(self.interface)
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def test_single_command(self):
+        # Act
+        response = self.scheduler.execute(ReadAddressCounterHi())
+
+        # Assert
+        self.assertEqual(response, 'ReadAddressCounterHi')
+
+    def test_multiple_commands_are_split(self):
+        # Act
+        responses = self.scheduler.execute([ReadAddressCounterHi(), ReadAddressCounterLo(), ReadStatus()])
+
+        # Assert
+        self.assertEqual(responses, ['ReadAddressCounterHi', 'ReadAddressCounterLo', 'ReadStatus'])
+
+        self.assertEqual(self.calls, [['ReadAddressCounterHi'], ['ReadAddressCounterLo'], ['ReadStatus']])
+
+    def test_max_step_commands(self):
+        # Arrange
+        self.scheduler.close()
+
+        self.scheduler = CommandScheduler(self.interface, max_step_commands=2)
+
+        # Act
+        self.scheduler.execute([ReadAddressCounterHi(), ReadAddressCounterLo(), ReadStatus()])
+
+        # Assert
+        self.assertEqual(self.calls, [['ReadAddressCounterHi', 'ReadAddressCounterLo'], ['ReadStatus']])
+
+    def test_high_priority_batch_is_executed_between_steps(self):
+        # Arrange
+        started = threading.Event()
+        release = threading.Event()
+
+        def execute(commands, timeout):
+            if not started.is_set():
+                started.set()
+                release.wait()
+
+            return self._execute(commands, timeout)
+
+        self.interface._execute.side_effect = execute
+
+        low_future = self.scheduler.submit([ReadAddressCounterHi(), ReadAddressCounterLo(), ReadStatus()], Priority.LOW)
+
+        started.wait()
+
+        # Act
+        high_future = self.scheduler.submit(Poll(), Priority.HIGH)
+
+        release.set()
+
+        low_future.result()
+        high_future.result()
+
+        # Assert
+        self.assertEqual(self.calls, [['ReadAddressCounterHi'], ['Poll'], ['ReadAddressCounterLo'], ['ReadStatus']])
+
+    def test_high_priority_batch_is_not_executed_between_atomic_steps(self):
+        # Arrange
+        started = threading.Event()
+        release = threading.Event()
+
+        def execute(commands, timeout):
+            if not started.is_set():
+                started.set()
+                release.wait()
+
+            return self._execute(commands, timeout)
+
+        self.interface._execute.side_effect = execute
+
+        low_future = self.scheduler.submit([LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), WriteData(b'\x01')],
+                                           Priority.LOW, atomic=True)
+
+        started.wait()
+
+        # Act
+        high_future = self.scheduler.submit([LoadAddressCounterLo(0x10), ReadStatus()], Priority.HIGH)
+
+        release.set()
+
+        low_future.result()
+        high_future.result()
+
+        # Assert
+        self.assertEqual(self.calls, [['LoadAddressCounterHi'], ['LoadAddressCounterLo'], ['WriteData'],
+                                      ['LoadAddressCounterLo'], ['ReadStatus']])
+
+    def test_receive_timeout_is_raised_for_single_command(self):
+        # Arrange
+        self.interface._execute.side_effect = lambda commands, timeout: [ReceiveTimeout()]
+
+        # Act and assert
+        with self.assertRaises(ReceiveTimeout):
+            self.scheduler.execute(Poll())
+
+    def test_interface_error_is_raised(self):
+        # Arrange
+        self.interface._execute.side_effect = InterfaceError('Error')
+
+        # Act
+        future = self.scheduler.submit([Poll(), ReadStatus()])
+
+        # Assert
+        with self.assertRaises(InterfaceError):
+            future.result()
+
+        self.assertEqual(self.interface._execute.call_count, 1)
+
+    def test_timeout_is_passed_to_interface(self):
+        # Act
+        self.scheduler.execute(Poll(), timeout=0.5)
+
+        # Assert
+        self.interface._execute.assert_called_once()
+
+        self.assertEqual(self.interface._execute.call_args[0][1], 0.5)
+
+    def test_submit_after_close(self):
+        # Arrange
+        self.scheduler.close()
+
+        # Act and assert
+        with self.assertRaises(RuntimeError):
+            self.scheduler.submit(Poll())
+
+    def _execute(self, commands, timeout):
+        names = [type(command).__name__ for (_, command) in commands]
+
+        self.calls.append(names)
+
+        return names
+
+if __name__ == '__main__':
+    unittest.main()
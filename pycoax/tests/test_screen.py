@@ -0,0 +1,196 @@
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import LoadAddressCounterHi, LoadAddressCounterLo, WriteData, EABWriteAlternate, EABLoadMask, EABWriteUnderMask
+from coax.screen import Screen
+from coax.exceptions import ReceiveTimeout
+
+class ScreenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.screen = Screen(1920, address=80)
+
+        self.interface = Mock()
+
+        self.interface.execute = Mock(side_effect=lambda commands: [None] * len(commands))
+
+    def test_first_update_writes_all_bytes(self):
+        # Act
+        commands = self.screen.plan(bytes(1920))
+
+        # Assert
+        self.assertEqual(self._describe(commands), [('hi', 0), ('lo', 80), ('write', bytes(1920))])
+
+    def test_unchanged_frame(self):
+        # Arrange
+        self.screen.update(self.interface, bytes(1920))
+
+        # Act
+        commands = self.screen.plan(bytes(1920))
+
+        # Assert
+        self.assertEqual(commands, [])
+
+    def test_changed_runs_are_written(self):
+        # Arrange
+        self.screen.update(self.interface, bytes(1920))
+
+        frame = bytearray(1920)
+
+        frame[10:12] = b'\x01\x02'
+        frame[500] = 0x03
+
+        # Act
+        commands = self.screen.plan(frame)
+
+        # Assert
+        self.assertEqual(self._describe(commands), [('hi', 0), ('lo', 90), ('write', b'\x01\x02'), ('hi', 2), ('lo', 68), ('write', b'\x03')])
+
+    def test_nearby_runs_are_merged(self):
+        # Arrange
+        self.screen.update(self.interface, bytes(1920))
+
+        frame = bytearray(1920)
+
+        frame[10] = 0x01
+        frame[20] = 0x02
+
+        # Act
+        commands = self.screen.plan(frame)
+
+        # Assert
+        self.assertEqual(self._describe(commands), [('hi', 0), ('lo', 90), ('write', bytes(frame[10:21]))])
+
+    def test_update_sets_shadow(self):
+        # Arrange
+        frame = bytes(range(256)) * 7 + bytes(128)
+
+        # Act
+        self.screen.update(self.interface, frame)
+
+        # Assert
+        self.assertEqual(self.screen.buffer, frame)
+
+    def test_error_invalidates_shadow(self):
+        # Arrange
+        self.screen.update(self.interface, bytes(1920))
+
+        self.interface.execute.side_effect = lambda commands: [ReceiveTimeout()] * len(commands)
+
+        # Act and assert
+        with self.assertRaises(ReceiveTimeout):
+            self.screen.update(self.interface, b'\x01' + bytes(1919))
+
+        self.assertIsNone(self.screen.buffer)
+
+    def test_device_address(self):
+        # Arrange
+        screen = Screen(4, device_address=0b111000)
+
+        # Act
+        commands = screen.plan(bytes(4))
+
+        # Assert
+        self.assertTrue(all(address == 0b111000 for (address, _) in commands))
+
+    def test_invalid_frame_size(self):
+        with self.assertRaises(ValueError):
+            self.screen.plan(bytes(10))
+
+    def _describe(self, commands):
+        return _describe(commands)
+
+class ScreenEABTestCase(unittest.TestCase):
+    def setUp(self):
+        self.screen = Screen(80, eab_feature_address=7)
+
+        self.interface = Mock()
+
+        self.interface.execute = Mock(side_effect=lambda commands: [None] * len(commands) if isinstance(commands, list) else None)
+
+        self.screen.update(self.interface, bytes(80), bytes(80))
+
+    def test_first_update_writes_alternate(self):
+        # Arrange
+        screen = Screen(2, eab_feature_address=7)
+
+        # Act
+        commands = screen.plan(b'\x01\x02', b'\x10\x20')
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('alternate', b'\x01\x10\x02\x20')])
+
+    def test_regen_only_change_is_written_with_write_data(self):
+        # Act
+        commands = self.screen.plan(b'\x01' + bytes(79), bytes(80))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('write', b'\x01')])
+
+    def test_regen_and_eab_change_is_written_with_alternate(self):
+        # Act
+        commands = self.screen.plan(b'\x01' + bytes(79), b'\x10' + bytes(79))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('alternate', b'\x01\x10')])
+
+    def test_eab_only_change_is_written_under_loaded_mask(self):
+        # Arrange
+        self.screen.load_eab_mask(self.interface, 0x38)
+
+        # Act
+        commands = self.screen.plan(bytes(80), b'\x10' + bytes(79))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('under_mask', 0x10)])
+
+    def test_eab_change_not_covered_by_loaded_mask_is_written_with_alternate(self):
+        # Arrange
+        self.screen.load_eab_mask(self.interface, 0x38)
+
+        # Act
+        commands = self.screen.plan(bytes(80), b'\x40' + bytes(79))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('alternate', b'\x00\x40')])
+
+    def test_eab_only_change_without_loaded_mask_is_written_with_alternate(self):
+        # Act
+        commands = self.screen.plan(bytes(80), b'\x10' + bytes(79))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('alternate', b'\x00\x10')])
+
+    def test_long_eab_only_change_is_written_with_alternate(self):
+        # Act
+        commands = self.screen.plan(bytes(80), b'\x10' * 20 + bytes(60))
+
+        # Assert
+        self.assertEqual(_describe(commands), [('hi', 0), ('lo', 0), ('alternate', b'\x00\x10' * 20)])
+
+    def test_eab_frame_is_required(self):
+        with self.assertRaises(ValueError):
+            self.screen.plan(bytes(80))
+
+def _describe(commands):
+    descriptions = []
+
+    for command in commands:
+        if isinstance(command, LoadAddressCounterHi):
+            descriptions.append(('hi', command.address))
+        elif isinstance(command, LoadAddressCounterLo):
+            descriptions.append(('lo', command.address))
+        elif isinstance(command, WriteData):
+            descriptions.append(('write', bytes(command.data)))
+        elif isinstance(command, EABWriteAlternate):
+            descriptions.append(('alternate', bytes(command.data)))
+        elif isinstance(command, EABLoadMask):
+            descriptions.append(('mask', command.mask))
+        elif isinstance(command, EABWriteUnderMask):
+            descriptions.append(('under_mask', command.byte))
+
+    return descriptions
+
+if __name__ == '__main__':
+    unittest.main()
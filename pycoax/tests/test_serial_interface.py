@@ -1,4 +1,6 @@
+import struct
 import unittest
+from array import array
 from unittest.mock import Mock, create_autospec, call
 from serial import Serial
 import sliplib
@@ -6,8 +8,12 @@ import sliplib
 import context
 
 from coax.interface import InterfaceFeature, FrameFormat
-from coax.serial_interface import SerialInterface
-from coax.exceptions import InterfaceError, ReceiveTimeout
+from coax.interface import normalize_frame
+from coax.protocol import Poll, LoadAddressCounterHi, LoadAddressCounterLo, WriteData, EABWriteAlternate, Data, \
+                          Slot, pack_data_words
+from coax.serial_interface import SerialInterface, SlipSerial, _pack_message, _pack_transmit_receive_message, \
+                                  _unpack_transmit_receive_response
+from coax.exceptions import InterfaceError, InterfaceTimeout, ReceiveTimeout
 
 class SerialInterfaceResetTestCase(unittest.TestCase):
     def setUp(self):
@@ -80,6 +86,44 @@ class SerialInterfaceResetTestCase(unittest.TestCase):
         with self.assertRaisesRegex(InterfaceError, 'Invalid request message: Error description'):
             self.interface.reset()
 
+    def test_capabilities_are_negotiated(self):
+        # Arrange
+        self.interface._read_message.side_effect = [bytes.fromhex(message) for message in ['01 32 70', '01 01 02 05 06 07', '01 69 32', '01 31 2e 30', '01 00 00 1c f2', '01 10']]
+
+        # Act
+        self.interface.reset()
+
+        # Assert
+        self.assertEqual(self.interface.hardware_type, 'i2')
+        self.assertEqual(self.interface.firmware_version, '1.0')
+        self.assertEqual(self.interface.message_buffer_size, 7410)
+        self.assertEqual(self.interface.features, { InterfaceFeature.PROTOCOL_3299 })
+
+        self.interface._write_message.assert_has_calls([call(bytes.fromhex(message)) for message in ['01', 'f0 01', 'f0 02', 'f0 05', 'f0 06', 'f0 07']])
+
+    def test_features_are_queried_if_supported_queries_is_not_supported(self):
+        # Arrange
+        self.interface._read_message.side_effect = [bytes.fromhex(message) for message in ['01 32 70', '02 01', '01 10']]
+
+        # Act
+        self.interface.reset()
+
+        # Assert
+        self.assertIsNone(self.interface.message_buffer_size)
+        self.assertEqual(self.interface.features, { InterfaceFeature.PROTOCOL_3299 })
+
+        self.assertEqual(self.interface._write_message.call_args_list, [call(bytes.fromhex(message)) for message in ['01', 'f0 01', 'f0 07']])
+
+    def test_capabilities_are_not_negotiated_with_legacy_firmware(self):
+        # Arrange
+        self.interface._read_message.return_value=bytes.fromhex('01 01 02 03')
+
+        # Act
+        self.interface.reset()
+
+        # Assert
+        self.interface._write_message.assert_called_once_with(bytes.fromhex('01'))
+
 class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
     def setUp(self):
         self.serial = create_autospec(Serial, instance=True)
@@ -99,7 +143,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.WORDS, [0b1111111111, 0b0000000000]))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 00 ff 03 00 00 00 01 00 00'))
 
@@ -111,7 +155,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.WORDS, ([0b1111111111, 0b0000000000], 2)))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 02 ff 03 00 00 00 01 00 00'))
 
@@ -123,7 +167,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b1111111111, [0x00, 0xff]))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 00 ff 03 02 00 fe 03 00 01 00 00'))
 
@@ -135,7 +179,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b1111111111, ([0x00, 0xff], 2)))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 80 02 ff 03 02 00 fe 03 00 01 00 00'))
 
@@ -147,7 +191,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.DATA, [0x00, 0xff]))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 00 02 00 fe 03 00 01 00 00'))
 
@@ -159,7 +203,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.DATA, ([0x00, 0xff], 2)))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 02 02 00 fe 03 00 01 00 00'))
 
@@ -181,6 +225,14 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         with self.assertRaises(InterfaceError):
             self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b1111111111, [0x00, 0xff]))], [1], 0.5)
 
+    def test_invalid_response_length(self):
+        # Arrange
+        self.interface._read_message.return_value=bytes.fromhex('01 00 00 00')
+
+        # Act and assert
+        with self.assertRaisesRegex(InterfaceError, 'Invalid response length'):
+            self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b1111111111, [0x00, 0xff]))], [1], 0.5)
+
     def test_timeout(self):
         # Arrange
         self.interface._read_message.return_value=bytes.fromhex('01 00 00')
@@ -201,7 +253,7 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(0b111000, (FrameFormat.WORDS, [0b1111111111, 0b0000000000]))], [1], None)
 
         # Assert
-        self.assertEqual(responses, [[0]])
+        self.assertEqual(responses, [array('H', [0])])
 
         self.interface._write_message.assert_called_with(bytes.fromhex('06 00 00 38 80 ff 03 00 00 00 01 00 00'))
 
@@ -221,10 +273,418 @@ class SerialInterfaceTransmitReceiveTestCase(unittest.TestCase):
         responses = self.interface._transmit_receive([(None, (FrameFormat.WORDS, [0b1111111111, 0b0000000000])), (None, (FrameFormat.WORD_DATA, 0b1111111111, [0x00, 0xff]))], [1, 1], None)
 
         # Assert
-        self.assertEqual(responses, [[0], [0]])
+        self.assertEqual(responses, [array('H', [0]), array('H', [0])])
 
         self.interface._write_message.assert_has_calls([call(bytes.fromhex('06 00 00 ff 03 00 00 00 01 00 00')), call(bytes.fromhex('06 00 00 ff 03 02 00 fe 03 00 01 00 00'))])
 
+class SerialInterfaceSplitTestCase(unittest.TestCase):
+    def setUp(self):
+        self.serial = create_autospec(Serial, instance=True)
+
+        self.serial.timeout = None
+
+        self.interface = SerialInterface(self.serial)
+
+        # Room for 4 words, including the command word.
+        self.interface.message_buffer_size = 19
+
+        self.interface._write_message = Mock(wraps=self.interface._write_message)
+        self.interface._read_message = Mock(return_value=bytes.fromhex('01 00 00'))
+
+    def test_frame_that_fits_is_not_split(self):
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02 03')))], [1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0])])
+
+        self.interface._write_message.assert_called_once()
+
+    def test_data_is_split_into_data_frames(self):
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02 03 04 05 06 07 08')))], [1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0])])
+
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02 03')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('04 05 06 07')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('08')), 1, 0))
+        ])
+
+    def test_repeat_is_split_into_data_frames(self):
+        # Act
+        self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, (bytes.fromhex('00'), 10)))], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, (bytes.fromhex('00'), 3)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00'), 4)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00'), 3)), 1, 0))
+        ])
+
+    def test_addressed_frame_is_split_with_address(self):
+        # Arrange
+        self.interface.features.add(InterfaceFeature.PROTOCOL_3299)
+
+        # Act
+        self.interface._transmit_receive([(0b111000, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02 03 04')))], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(0b111000, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02')), 1, 0)),
+            call(_pack_transmit_receive_message(0b111000, (FrameFormat.DATA, bytes.fromhex('03 04')), 1, 0))
+        ])
+
+    def test_eab_write_alternate_is_split_on_pairs(self):
+        # Arrange
+        frame = EABWriteAlternate(7, bytes.fromhex('01 81 02 82 03 83 04 84')).pack_outbound_frame()
+
+        # Act
+        self.interface._transmit_receive([(None, frame)], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, frame[1], bytes.fromhex('01 81')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('02 82 03 83')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('04 84')), 1, 0))
+        ])
+
+    def test_split_response_is_first_error(self):
+        # Arrange
+        self.interface._read_message.side_effect = [bytes.fromhex('01 00 00'), bytes.fromhex('02 66'), bytes.fromhex('01 00 00'), bytes.fromhex('01 00 00')]
+
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.DATA, bytes.fromhex('01 02 03 04 05 06 07 08 09'))), (None, (FrameFormat.WORDS, [0b1111111111]))], [1, 1], None)
+
+        # Assert
+        self.assertIsInstance(responses[0], ReceiveTimeout)
+        self.assertEqual(responses[1], array('H', [0]))
+
+class SerialInterfaceCompressTestCase(unittest.TestCase):
+    def setUp(self):
+        self.serial = create_autospec(Serial, instance=True)
+
+        self.serial.timeout = None
+
+        self.interface = SerialInterface(self.serial, compress=True)
+
+        self.interface._write_message = Mock(wraps=self.interface._write_message)
+        self.interface._read_message = Mock(return_value=bytes.fromhex('01 00 00'))
+
+    def test_short_runs_are_not_compressed(self):
+        # Arrange
+        data = bytes(range(1, 9)) + bytes(31) + bytes(range(1, 9))
+
+        # Act
+        self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, data))], [1], None)
+
+        # Assert
+        self.interface._write_message.assert_called_once_with(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, data), 1, 0))
+
+    def test_run_is_compressed(self):
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02') + bytes(100) + bytes.fromhex('03')))], [1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0])])
+
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00'), 100)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('03')), 1, 0))
+        ])
+
+    def test_run_at_start_is_sent_with_command_word(self):
+        # Act
+        self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes(100)))], [1], None)
+
+        # Assert
+        self.interface._write_message.assert_called_once_with(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, (bytes.fromhex('00'), 100)), 1, 0))
+
+    def test_addressed_run_at_start_is_sent_separately(self):
+        # Arrange
+        self.interface.features.add(InterfaceFeature.PROTOCOL_3299)
+
+        # Act
+        responses = self.interface._transmit_receive([(0x10, WriteData(bytes(100)).pack_outbound_frame())], [1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0])])
+
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.WORD_DATA, 0b0000110001), 1, 0)),
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.DATA, (bytes.fromhex('00'), 100)), 1, 0))
+        ])
+
+    def test_addressed_run_is_compressed(self):
+        # Arrange
+        self.interface.features.add(InterfaceFeature.PROTOCOL_3299)
+
+        # Act
+        self.interface._transmit_receive([(0x10, WriteData(bytes.fromhex('01 02') + bytes(100)).pack_outbound_frame())], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.WORD_DATA, 0b0000110001, bytes.fromhex('01 02')), 1, 0)),
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.DATA, (bytes.fromhex('00'), 100)), 1, 0))
+        ])
+
+    def test_addressed_eab_write_alternate_run_is_sent_separately(self):
+        # Arrange
+        self.interface.features.add(InterfaceFeature.PROTOCOL_3299)
+
+        frame = EABWriteAlternate(7, bytes.fromhex('00 10') * 40).pack_outbound_frame()
+
+        # Act
+        self.interface._transmit_receive([(0x10, frame)], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.WORD_DATA, frame[1]), 1, 0)),
+            call(_pack_transmit_receive_message(0x10, (FrameFormat.DATA, (bytes.fromhex('00 10'), 40)), 1, 0))
+        ])
+
+    def test_eab_write_alternate_run_is_compressed_on_pairs(self):
+        # Arrange
+        frame = EABWriteAlternate(7, bytes.fromhex('c1 01') + bytes.fromhex('00 01') * 40).pack_outbound_frame()
+
+        # Act
+        self.interface._transmit_receive([(None, frame)], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, frame[1], bytes.fromhex('c1 01')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00 01'), 40)), 1, 0))
+        ])
+
+    def test_eab_write_alternate_single_byte_run_is_compressed_on_pairs(self):
+        # Arrange
+        frame = EABWriteAlternate(7, bytes.fromhex('c1') + bytes(80) + bytes.fromhex('01')).pack_outbound_frame()
+
+        # Act
+        self.interface._transmit_receive([(None, frame)], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, frame[1], bytes.fromhex('c1 00')), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00 00'), 39)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, bytes.fromhex('00 01')), 1, 0))
+        ])
+
+    def test_byte_pair_run_is_compressed(self):
+        # Act
+        self.interface._transmit_receive([(None, (FrameFormat.DATA, bytes.fromhex('00 10') * 40))], [1], None)
+
+        # Assert
+        self.interface._write_message.assert_called_once_with(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00 10'), 40)), 1, 0))
+
+    def test_compressed_run_is_split(self):
+        # Arrange
+        self.interface.message_buffer_size = 111
+
+        # Act
+        self.interface._transmit_receive([(None, (FrameFormat.WORD_DATA, 0b0000110001, bytes(120)))], [1], None)
+
+        # Assert
+        self.assertEqual(self.interface._write_message.call_args_list, [
+            call(_pack_transmit_receive_message(None, (FrameFormat.WORD_DATA, 0b0000110001, (bytes.fromhex('00'), 49)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00'), 50)), 1, 0)),
+            call(_pack_transmit_receive_message(None, (FrameFormat.DATA, (bytes.fromhex('00'), 21)), 1, 0))
+        ])
+
+class SerialInterfaceProgramTestCase(unittest.TestCase):
+    def setUp(self):
+        self.serial = create_autospec(Serial, instance=True)
+
+        self.serial.timeout = None
+
+        self.interface = SerialInterface(self.serial)
+
+        self.interface.slip_serial = Mock(wraps=self.interface.slip_serial)
+
+        self.interface._read_message = Mock(return_value=bytes.fromhex('01 00 00'))
+
+    def test_program_matches_execute(self):
+        # Arrange
+        commands = [Poll(), LoadAddressCounterHi(0x01), WriteData(bytes.fromhex('c0 db 70 b0'))]
+
+        program = self.interface.compile(commands, timeout=0.5)
+
+        # Act
+        self.interface.execute_program(program)
+        self.interface.execute(commands, timeout=0.5)
+
+        # Assert
+        packets = [call[0][0] for call in self.interface.slip_serial.send_bytes.call_args_list]
+
+        self.assertEqual(packets[:3], [
+            sliplib.encode(_pack_message(_pack_reference_message(None, command.pack_outbound_frame(), 1, 500), message_id))
+            for (message_id, command) in enumerate(commands, 1)
+        ])
+
+        self.assertEqual(self.interface._read_message.call_count, 6)
+
+    def test_program_with_slots(self):
+        # Arrange
+        program = self.interface.compile([LoadAddressCounterHi(Slot('hi')), LoadAddressCounterLo(Slot('lo')),
+                                          WriteData([0x01, Slot('hi')])])
+
+        # Act
+        responses = self.interface.execute_program(program, {'hi': 0x70, 'lo': 0xb0})
+
+        # Assert
+        self.assertEqual(responses, [None, None, None])
+
+        packets = [call[0][0] for call in self.interface.slip_serial.send_bytes.call_args_list]
+
+        self.assertEqual(packets, [
+            sliplib.encode(_pack_message(_pack_reference_message(None, command.pack_outbound_frame(), 1, 0), message_id))
+            for (message_id, command) in enumerate([LoadAddressCounterHi(0x70), LoadAddressCounterLo(0xb0),
+                                                    WriteData(bytes([0x01, 0x70]))], 1)
+        ])
+
+    def test_program_can_be_executed_repeatedly(self):
+        # Arrange
+        program = self.interface.compile(LoadAddressCounterHi(Slot('hi')))
+
+        # Act
+        self.interface.execute_program(program, {'hi': 0x01})
+        self.interface.execute_program(program, {'hi': 0x02})
+
+        # Assert
+        packets = [call[0][0] for call in self.interface.slip_serial.send_bytes.call_args_list]
+
+        self.assertEqual(packets, [
+            sliplib.encode(_pack_message(_pack_reference_message(None, LoadAddressCounterHi(address).pack_outbound_frame(), 1, 0), message_id))
+            for (message_id, address) in [(1, 0x01), (2, 0x02)]
+        ])
+
+    def test_program_is_split(self):
+        # Arrange
+        self.interface.message_buffer_size = 19
+
+        program = self.interface.compile(WriteData([0x01, 0x02, 0x03, 0x04, Slot('x')]))
+
+        # Act
+        response = self.interface.execute_program(program, {'x': 0x05})
+
+        # Assert
+        self.assertIsNone(response)
+
+        self.assertEqual(len(program.messages), 2)
+        self.assertEqual(program.split_counts, (2,))
+
+        self.assertEqual(self.interface._read_message.call_count, 2)
+
+    def test_missing_slot_value(self):
+        # Arrange
+        program = self.interface.compile(LoadAddressCounterHi(Slot('hi')))
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Missing slot values: hi'):
+            self.interface.execute_program(program)
+
+    def test_unknown_slot_value(self):
+        # Arrange
+        program = self.interface.compile(Poll())
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Unknown slots: hi'):
+            self.interface.execute_program(program, {'hi': 0x01})
+
+    def test_slot_value_out_of_range(self):
+        # Arrange
+        program = self.interface.compile(LoadAddressCounterHi(Slot('hi')))
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Slot value is out of range'):
+            self.interface.execute_program(program, {'hi': 0x100})
+
+    def test_slot_in_repeated_data(self):
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Slots are not supported in repeated data'):
+            self.interface.compile(WriteData(([Slot('x')], 8)))
+
+class SerialInterfacePipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.serial = create_autospec(Serial, instance=True)
+
+        self.serial.timeout = None
+
+        self.interface = SerialInterface(self.serial, pipeline_depth=2)
+
+        self.events = []
+
+        self.responses = []
+
+        self.interface._write_message = Mock(side_effect=self._write_message)
+        self.interface._read_message = Mock(side_effect=self._read_message)
+
+    def test_invalid_pipeline_depth(self):
+        with self.assertRaises(ValueError):
+            SerialInterface(self.serial, pipeline_depth=0)
+
+    def test_messages_are_sent_ahead_of_responses(self):
+        # Arrange
+        self.responses = [bytes.fromhex('01 00 00'), bytes.fromhex('01 02 00'), bytes.fromhex('01 04 00')]
+
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.WORDS, [1])), (None, (FrameFormat.WORDS, [2])), (None, (FrameFormat.WORDS, [3]))], [1, 1, 1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0]), array('H', [2]), array('H', [4])])
+
+        self.assertEqual(self.events, ['write', 'write', 'read', 'write', 'read', 'read'])
+
+    def test_receive_timeout_is_mapped_to_command(self):
+        # Arrange
+        self.responses = [bytes.fromhex('01 00 00'), bytes.fromhex('02 66'), bytes.fromhex('01 04 00')]
+
+        # Act
+        responses = self.interface._transmit_receive([(None, (FrameFormat.WORDS, [1])), (None, (FrameFormat.WORDS, [2])), (None, (FrameFormat.WORDS, [3]))], [1, 1, 1], None)
+
+        # Assert
+        self.assertEqual(responses[0], array('H', [0]))
+        self.assertIsInstance(responses[1], ReceiveTimeout)
+        self.assertEqual(responses[2], array('H', [4]))
+
+    def test_interface_error_drains_in_flight_messages(self):
+        # Arrange
+        self.responses = [bytes.fromhex('02 65'), bytes.fromhex('01 02 00')]
+
+        # Act and assert
+        with self.assertRaisesRegex(InterfaceError, 'Receiver active'):
+            self.interface._transmit_receive([(None, (FrameFormat.WORDS, [1])), (None, (FrameFormat.WORDS, [2])), (None, (FrameFormat.WORDS, [3]))], [1, 1, 1], None)
+
+        self.assertEqual(self.events, ['write', 'write', 'read', 'read'])
+
+    def test_messages_sent_together_are_coalesced(self):
+        # Arrange
+        stream = MockStream()
+
+        stream.timeout = None
+        stream.chunks = [bytes.fromhex('c0 00 03 01 00 00 00 01 c0 c0 00 03 01 02 00 00 02 c0')]
+
+        interface = SerialInterface(stream, pipeline_depth=2)
+
+        # Act
+        responses = interface._transmit_receive([(None, (FrameFormat.WORDS, [1])), (None, (FrameFormat.WORDS, [2]))], [1, 1], None)
+
+        # Assert
+        self.assertEqual(responses, [array('H', [0]), array('H', [2])])
+
+        self.assertEqual(len(stream.written), 1)
+
+    def _write_message(self, message):
+        self.events.append('write')
+
+    def _read_message(self):
+        self.events.append('read')
+
+        return self.responses.pop(0)
+
 class SerialInterfaceReadMessageTestCase(unittest.TestCase):
     def setUp(self):
         self.serial = create_autospec(Serial, instance=True)
@@ -275,6 +735,76 @@ class SerialInterfaceReadMessageTestCase(unittest.TestCase):
         with self.assertRaisesRegex(InterfaceError, 'Empty response message'):
             self.interface._read_message()
 
+    def test_message_id_is_matched(self):
+        # Arrange
+        self.interface._message_ids.in_flight.extend([7, 8])
+
+        self.interface.slip_serial.recv_msg.return_value=bytes.fromhex('00 04 01 02 03 04 00 07')
+
+        # Act
+        message = self.interface._read_message()
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('01 02 03 04'))
+
+        self.assertEqual(list(self.interface._message_ids.in_flight), [8])
+
+        self.assertTrue(self.interface._message_ids.has_response_ids)
+
+    def test_stale_message_is_discarded(self):
+        # Arrange
+        self.interface._message_ids.in_flight.extend([7])
+
+        self.interface.slip_serial.recv_msg.side_effect=[bytes.fromhex('00 01 05 00 03'), bytes.fromhex('00 01 01 00 07')]
+
+        # Act
+        message = self.interface._read_message()
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('01'))
+
+        self.assertEqual(self.interface.slip_serial.recv_msg.call_count, 2)
+
+    def test_zero_message_id_matches_oldest_message_for_legacy_firmware(self):
+        # Arrange
+        self.interface._message_ids.in_flight.extend([7, 8])
+
+        self.interface.slip_serial.recv_msg.return_value=bytes.fromhex('00 01 01 00 00')
+
+        # Act
+        message = self.interface._read_message()
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('01'))
+
+        self.assertEqual(list(self.interface._message_ids.in_flight), [8])
+
+    def test_zero_message_id_error_does_not_remove_message_in_flight(self):
+        # Arrange
+        self.interface._message_ids.has_response_ids = True
+        self.interface._message_ids.in_flight.extend([7, 8])
+
+        self.interface.slip_serial.recv_msg.side_effect=[bytes.fromhex('00 02 02 01 00 00'),
+                                                         bytes.fromhex('00 01 01 00 07')]
+
+        # Act
+        message = self.interface._read_message()
+
+        # Assert
+        self.assertEqual(message, bytes.fromhex('01'))
+
+        self.assertEqual(list(self.interface._message_ids.in_flight), [8])
+
+    def test_out_of_sequence_message_is_handled_correctly(self):
+        # Arrange
+        self.interface._message_ids.in_flight.extend([7, 8])
+
+        self.interface.slip_serial.recv_msg.return_value=bytes.fromhex('00 01 01 00 08')
+
+        # Act and assert
+        with self.assertRaisesRegex(InterfaceError, 'Unexpected response message identifier'):
+            self.interface._read_message()
+
 class SerialInterfaceWriteMessageTestCase(unittest.TestCase):
     def setUp(self):
         self.serial = create_autospec(Serial, instance=True)
@@ -288,7 +818,295 @@ class SerialInterfaceWriteMessageTestCase(unittest.TestCase):
         self.interface._write_message(bytes.fromhex('01 02 03 04'))
 
         # Assert
-        self.interface.slip_serial.send_msg.assert_called_with(bytes.fromhex('00 04 01 02 03 04 00 00'))
+        self.interface.slip_serial.send_msg.assert_called_with(bytes.fromhex('00 04 01 02 03 04 00 01'))
+
+    def test_message_id_is_incremented(self):
+        # Act
+        self.interface._write_message(bytes.fromhex('01'))
+        self.interface._write_message(bytes.fromhex('01'))
+
+        # Assert
+        self.interface.slip_serial.send_msg.assert_called_with(bytes.fromhex('00 01 01 00 02'))
+
+        self.assertEqual(list(self.interface._message_ids.in_flight), [1, 2])
+
+    def test_message_id_wraps_around(self):
+        # Arrange
+        self.interface._message_ids.next_id = 0xffff
+
+        # Act
+        self.interface._write_message(bytes.fromhex('01'))
+        self.interface._write_message(bytes.fromhex('01'))
+
+        # Assert
+        self.interface.slip_serial.send_msg.assert_called_with(bytes.fromhex('00 01 01 00 01'))
+
+class SerialInterfaceObserverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream = MockStream()
+
+        self.stream.timeout = None
+
+        self.interface = SerialInterface(self.stream, pipeline_depth=2)
+
+        self.executions = []
+
+        self.interface.add_observer(self.executions.append)
+
+    def test_execution_is_recorded(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 00 03 01 00 00 00 01 c0'), bytes.fromhex('c0 00 03 01 00 00 00 02 c0')]
+
+        # Act
+        responses = self.interface.execute([Poll(), Poll()])
+
+        # Assert
+        self.assertEqual(responses, [None, None])
+
+        (execution,) = self.executions
+
+        self.assertEqual(execution.responses, [None, None])
+        self.assertIsNone(execution.error)
+
+        self.assertEqual(execution.bytes_written, len(self.stream.written[0]))
+        self.assertEqual(execution.bytes_read, 18)
+        self.assertEqual(execution.words_written, 2)
+        self.assertEqual(execution.words_read, 2)
+
+        self.assertEqual(len(execution.command_times), 2)
+
+        self.assertTrue(execution.start <= execution.packed <= execution.written <= execution.first_byte
+                        <= execution.received <= execution.decoded)
+
+        (written, first_byte, received) = execution.command_times[1]
+
+        self.assertTrue(execution.written <= written <= first_byte <= received)
+
+    def test_split_frame_times_are_merged(self):
+        # Arrange
+        self.interface.message_buffer_size = 64
+
+        self.stream.chunks = [bytes.fromhex('c0 00 03 01 00 00 00 01 c0'), bytes.fromhex('c0 00 03 01 00 00 00 02 c0')]
+
+        # Act
+        self.interface.execute(WriteData(bytes(32)))
+
+        # Assert
+        self.assertEqual(self.stream.chunks, [])
+
+        (execution,) = self.executions
+
+        self.assertEqual(len(execution.command_times), 1)
+
+        self.assertEqual(execution.words_written, 33)
+
+    def test_error_is_recorded(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 00 02 02 65 00 01 c0')]
+
+        # Act and assert
+        with self.assertRaisesRegex(InterfaceError, 'Receiver active'):
+            self.interface.execute(Poll())
+
+        (execution,) = self.executions
+
+        self.assertIsInstance(execution.error, InterfaceError)
+        self.assertIsNone(execution.responses)
+        self.assertEqual(execution.bytes_read, 8)
+
+class PackTransmitReceiveMessageTestCase(unittest.TestCase):
+    def test_full_regen_and_eab_buffer_write(self):
+        # Arrange
+        data = bytes(range(256)) * 28 + bytes(224)
+
+        for command in [WriteData(data), EABWriteAlternate(7, data), Data(data), WriteData(memoryview(data)), WriteData(list(data))]:
+            for address in [None, 0b111000]:
+                with self.subTest(command=command, address=address):
+                    frame = command.pack_outbound_frame()
+
+                    # Act
+                    message = _pack_transmit_receive_message(address, frame, 1, 500)
+
+                    # Assert
+                    self.assertEqual(message, _pack_reference_message(address, frame, 1, 500))
+
+    def test_repeat_frames(self):
+        for frame in [(FrameFormat.WORDS, ([0b1111111111, 0b0000000000], 2)), (FrameFormat.WORD_DATA, 0b1111111111, (bytes.fromhex('00 ff'), 80)), (FrameFormat.DATA, (bytes.fromhex('00 ff'), 80))]:
+            with self.subTest(frame=frame):
+                # Act
+                message = _pack_transmit_receive_message(None, frame, 1, 0)
+
+                # Assert
+                self.assertEqual(message, _pack_reference_message(None, frame, 1, 0))
+
+    def test_invalid_data_byte(self):
+        with self.assertRaises(ValueError):
+            _pack_transmit_receive_message(None, (FrameFormat.DATA, [256]), 1, 0)
+
+def _pack_reference_message(address, frame, response_length, timeout_milliseconds):
+    (words, repeat_count, repeat_offset) = normalize_frame(address, frame)
+
+    if address is not None:
+        words[0] |= 0x8000
+
+    return (bytes([0x06]) + struct.pack('>H', (repeat_offset << 15) | repeat_count) +
+            struct.pack(f'<{len(words)}H', *words) +
+            struct.pack('>HH', response_length, timeout_milliseconds))
+
+class UnpackTransmitReceiveResponseTestCase(unittest.TestCase):
+    def test(self):
+        # Act
+        words = _unpack_transmit_receive_response(memoryview(bytes.fromhex('00 00 fe 03 02 01')))
+
+        # Assert
+        self.assertEqual(words, array('H', [0x0000, 0x03fe, 0x0102]))
+
+    def test_invalid_length(self):
+        with self.assertRaisesRegex(InterfaceError, 'Invalid response length'):
+            _unpack_transmit_receive_response(memoryview(bytes.fromhex('00 00 fe')))
+
+class SlipSerialTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream = MockStream()
+
+        self.slip_serial = SlipSerial(self.stream)
+
+    def test_send_msg(self):
+        # Act
+        self.slip_serial.send_msg(bytes.fromhex('01 c0 02 db 03'))
+
+        # Assert
+        self.assertEqual(self.stream.written, [bytes.fromhex('c0 01 db dc 02 db dd 03 c0')])
+
+    def test_coalesce(self):
+        # Act
+        with self.slip_serial.coalesce():
+            self.slip_serial.send_msg(bytes.fromhex('01'))
+            self.slip_serial.send_msg(bytes.fromhex('02'))
+
+            self.assertEqual(self.stream.written, [])
+
+        # Assert
+        self.assertEqual(self.stream.written, [bytes.fromhex('c0 01 c0 c0 02 c0')])
+
+    def test_recv_msg(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01 02 03 c0')]
+
+        # Act and assert
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('01 02 03'))
+
+    def test_recv_msg_returns_memoryview(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01 02 03 c0')]
+
+        # Act and assert
+        self.assertIsInstance(self.slip_serial.recv_msg(), memoryview)
+
+    def test_recv_msg_split_across_reads(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01'), bytes.fromhex('02'), bytes.fromhex('03 c0')]
+
+        # Act and assert
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('01 02 03'))
+
+    def test_recv_msg_multiple_messages_in_single_read(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01 c0 c0 02 c0 c0 03')]
+
+        # Act and assert
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('01'))
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('02'))
+
+        self.stream.chunks = [bytes.fromhex('c0')]
+
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('03'))
+
+    def test_recv_msg_escape_sequences(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01 db dc db dd dc db dd db dc c0')]
+
+        # Act and assert
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('01 c0 db dc db c0'))
+
+    def test_recv_msg_invalid_escape_sequence(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01 db 02 c0 c0 03 c0')]
+
+        # Act and assert
+        with self.assertRaises(sliplib.ProtocolError):
+            self.slip_serial.recv_msg()
+
+        self.assertEqual(self.slip_serial.recv_msg(), bytes.fromhex('03'))
+
+    def test_recv_msg_timeout(self):
+        # Arrange
+        self.stream.chunks = [bytes.fromhex('c0 01')]
+
+        # Act and assert
+        with self.assertRaises(InterfaceTimeout):
+            self.slip_serial.recv_msg()
+
+    def test_recv_bytes_reads_available_data_in_single_read(self):
+        # Arrange
+        stream = Mock(closed=False, in_waiting=5)
+
+        stream.read.return_value = bytes.fromhex('c0 01 02 03 c0')
+
+        slip_serial = SlipSerial(stream)
+
+        # Act
+        data = slip_serial.recv_bytes()
+
+        # Assert
+        self.assertEqual(data, bytes.fromhex('c0 01 02 03 c0'))
+
+        stream.read.assert_called_once_with(5)
+
+    def test_recv_bytes_waits_for_data_in_single_read(self):
+        # Arrange
+        stream = Mock(closed=False, in_waiting=0)
+
+        stream.read.return_value = bytes.fromhex('c0')
+
+        slip_serial = SlipSerial(stream)
+
+        # Act
+        data = slip_serial.recv_bytes()
+
+        # Assert
+        self.assertEqual(data, bytes.fromhex('c0'))
+
+        stream.read.assert_called_once_with(1)
+
+class MockStream:
+    def __init__(self):
+        self.closed = False
+        self.chunks = []
+        self.written = []
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, count):
+        if not self.chunks:
+            return b''
+
+        chunk = self.chunks[0]
+
+        if count < len(chunk):
+            self.chunks[0] = chunk[count:]
+
+            return chunk[:count]
+
+        return self.chunks.pop(0)
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def flush(self):
+        pass
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,293 @@
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import Control, SecondaryControl, Poll, PowerOnResetCompletePollResponse, ReadAddressCounterHi, \
+                          ReadAddressCounterLo, ReadMultiple, LoadControlRegister, LoadAddressCounterHi, \
+                          LoadAddressCounterLo, WriteData, SearchForward, Reset, LoadSecondaryControl, \
+                          LoadMask, EABLoadMask
+from coax.session import Session
+from coax.exceptions import InterfaceError, ReceiveTimeout
+
+class SessionAddressCounterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = Mock()
+
+        self.interface.execute = Mock(side_effect=lambda commands, timeout: [None] * len(commands))
+
+        self.session = Session(self.interface)
+
+    def test_loads_are_sent_when_address_counter_is_unknown(self):
+        # Act
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadAddressCounterHi, LoadAddressCounterLo])
+
+        self.assertEqual(self.session.address_counter, 80)
+
+    def test_redundant_loads_are_not_sent(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        responses = self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(160)])
+
+        # Assert
+        self.assertEqual(responses, [None, None])
+
+        self.assertEqual(self._get_sent_commands(), [LoadAddressCounterLo])
+
+    def test_all_redundant_commands(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        response = self.session.execute(LoadAddressCounterLo(80))
+
+        # Assert
+        self.assertIsNone(response)
+
+        self.interface.execute.assert_called_once()
+
+    def test_write_advances_address_counter(self):
+        # Arrange
+        self.session.execute([LoadControlRegister(Control()), LoadAddressCounterHi(0), LoadAddressCounterLo(250)])
+
+        # Act
+        self.session.execute([WriteData(bytes(10)), LoadAddressCounterHi(1), LoadAddressCounterLo(4), WriteData((bytes(1), 5))])
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [WriteData, WriteData])
+
+        self.assertEqual(self.session.address_counter, 265)
+
+    def test_write_with_unknown_control_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        self.session.execute(WriteData(bytes(10)))
+
+        # Assert
+        self.assertIsNone(self.session.address_counter)
+
+    def test_write_with_step_inhibit_does_not_advance_address_counter(self):
+        # Arrange
+        self.session.execute([LoadControlRegister(Control(step_inhibit=True)), LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        self.session.execute(WriteData(bytes(10)))
+
+        # Assert
+        self.assertEqual(self.session.address_counter, 80)
+
+    def test_read_multiple_advances_address_counter_by_response_length(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        self.interface.execute.side_effect = lambda commands, timeout: [bytes(32)]
+
+        # Act
+        self.session.execute(ReadMultiple())
+
+        # Assert
+        self.assertEqual(self.session.address_counter, 112)
+
+    def test_read_address_counter_sets_address_counter(self):
+        # Arrange
+        self.interface.execute.side_effect = lambda commands, timeout: [0x01, 0x02]
+
+        # Act
+        self.session.execute([ReadAddressCounterHi(), ReadAddressCounterLo()])
+
+        # Assert
+        self.assertEqual(self.session.address_counter, 0x0102)
+
+    def test_search_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        self.session.execute([SearchForward(0x00), LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [SearchForward, LoadAddressCounterHi, LoadAddressCounterLo])
+
+    def test_reset_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        self.session.execute(Reset())
+
+        # Assert
+        self.assertIsNone(self.session.address_counter)
+
+    def test_power_on_reset_poll_response_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        self.interface.execute.side_effect = lambda commands, timeout: [PowerOnResetCompletePollResponse(0xa)]
+
+        # Act
+        self.session.execute(Poll())
+
+        # Assert
+        self.assertIsNone(self.session.address_counter)
+
+    def test_no_poll_response_does_not_invalidate_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        # Act
+        self.session.execute(Poll())
+
+        # Assert
+        self.assertEqual(self.session.address_counter, 80)
+
+    def test_error_response_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        self.interface.execute.side_effect = lambda commands, timeout: [ReceiveTimeout()]
+
+        # Act and assert
+        with self.assertRaises(ReceiveTimeout):
+            self.session.execute(LoadAddressCounterLo(160))
+
+        self.assertIsNone(self.session.address_counter)
+
+    def test_interface_error_invalidates_address_counter(self):
+        # Arrange
+        self.session.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(80)])
+
+        self.interface.execute.side_effect = InterfaceError('Error')
+
+        # Act and assert
+        with self.assertRaises(InterfaceError):
+            self.session.execute(LoadAddressCounterLo(160))
+
+        self.assertIsNone(self.session.address_counter)
+
+    def test_device_address(self):
+        # Arrange
+        session = Session(self.interface, device_address=0b111000)
+
+        # Act
+        session.execute(LoadAddressCounterHi(0))
+
+        # Assert
+        commands = self.interface.execute.call_args[0][0]
+
+        self.assertEqual(commands[0][0], 0b111000)
+
+    def test_matching_command_address(self):
+        # Arrange
+        session = Session(self.interface, device_address=0b111000)
+
+        # Act
+        session.execute([(0b111000, LoadAddressCounterHi(0)), (None, LoadAddressCounterLo(0))])
+
+        # Assert
+        commands = self.interface.execute.call_args[0][0]
+
+        self.assertEqual([address for (address, _) in commands], [0b111000, 0b111000])
+
+    def test_different_command_address(self):
+        # Arrange
+        session = Session(self.interface, device_address=0b111000)
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'does not match session device address'):
+            session.execute([LoadAddressCounterHi(0), (0b000001, LoadAddressCounterLo(0))])
+
+        self.interface.execute.assert_not_called()
+
+    def test_command_address_without_device_address(self):
+        with self.assertRaises(ValueError):
+            self.session.execute((0b111000, LoadAddressCounterHi(0)))
+
+    def _get_sent_commands(self):
+        commands = self.interface.execute.call_args[0][0]
+
+        return [type(command) for (_, command) in commands]
+
+class SessionRegisterCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.interface = Mock()
+
+        self.interface.execute = Mock(side_effect=lambda commands, timeout: [None] * len(commands))
+
+        self.session = Session(self.interface)
+
+        self.session.execute([LoadControlRegister(Control(cursor_blink=True)), LoadSecondaryControl(SecondaryControl(big=True)),
+                              LoadMask(0xf0), EABLoadMask(7, 0x38)])
+
+    def test_loads_are_sent_when_registers_are_unknown(self):
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadControlRegister, LoadSecondaryControl, LoadMask, EABLoadMask])
+
+    def test_loads_of_cached_values_are_not_sent(self):
+        # Act
+        self.session.execute([LoadControlRegister(Control(cursor_blink=True)), LoadSecondaryControl(SecondaryControl(big=True)),
+                              LoadMask(0xf0), EABLoadMask(7, 0x38)])
+
+        # Assert
+        self.interface.execute.assert_called_once()
+
+    def test_loads_of_changed_values_are_sent(self):
+        # Act
+        self.session.execute([LoadControlRegister(Control()), LoadSecondaryControl(SecondaryControl(big=True)),
+                              LoadMask(0x0f), EABLoadMask(8, 0x38)])
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadControlRegister, LoadMask, EABLoadMask])
+
+    def test_reset_invalidates_registers(self):
+        # Arrange
+        self.session.execute(Reset())
+
+        # Act
+        self.session.execute(LoadMask(0xf0))
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadMask])
+
+    def test_power_on_reset_poll_response_invalidates_registers(self):
+        # Arrange
+        self.interface.execute.side_effect = lambda commands, timeout: [PowerOnResetCompletePollResponse(0xa)]
+
+        self.session.execute(Poll())
+
+        self.interface.execute.side_effect = lambda commands, timeout: [None] * len(commands)
+
+        # Act
+        self.session.execute(LoadMask(0xf0))
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadMask])
+
+    def test_interface_error_invalidates_registers(self):
+        # Arrange
+        self.interface.execute.side_effect = InterfaceError('Error')
+
+        with self.assertRaises(InterfaceError):
+            self.session.execute(LoadMask(0x0f))
+
+        self.interface.execute.side_effect = lambda commands, timeout: [None] * len(commands)
+
+        # Act
+        self.session.execute(LoadMask(0xf0))
+
+        # Assert
+        self.assertEqual(self._get_sent_commands(), [LoadMask])
+
+    def _get_sent_commands(self):
+        commands = self.interface.execute.call_args[0][0]
+
+        return [type(command) for (_, command) in commands]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+import unittest
+from unittest.mock import Mock
+
+import context
+
+from coax.protocol import PollAction, PowerOnResetCompletePollResponse, KeystrokePollResponse, TerminalType, \
+                          Control, Poll, PollAck, ReadStatus, ReadTerminalId, ReadAddressCounterHi, \
+                          ReadAddressCounterLo, ReadData, ReadMultiple, Reset, LoadControlRegister, LoadMask, \
+                          LoadAddressCounterHi, LoadAddressCounterLo, WriteData, Clear, SearchForward, \
+                          SearchBackward, InsertByte, EABReadData, EABLoadMask, \
+                          EABWriteAlternate, EABWriteUnderMask, Data
+from coax.features import Feature, read_feature_ids, parse_features
+from coax.multiplexer import get_device_address
+from coax.screen import Screen
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.exceptions import ReceiveTimeout
+
+class SimulatedTerminalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.terminal = SimulatedTerminal(eab_feature_address=7, power_on_reset=False)
+
+        self.interface = SimulatedInterface(self.terminal)
+
+    def test_read_terminal_id(self):
+        # Act
+        terminal_id = self.interface.execute(ReadTerminalId())
+
+        # Assert
+        self.assertEqual(terminal_id.type, TerminalType.CUT)
+        self.assertEqual(terminal_id.model, 2)
+        self.assertEqual(terminal_id.keyboard, 1)
+
+    def test_read_feature_ids(self):
+        # Arrange
+        commands = read_feature_ids()
+
+        # Act
+        ids = self.interface.execute(commands)
+
+        # Assert
+        self.assertEqual(parse_features(ids, commands), {Feature.EAB: 7})
+
+    def test_write_data(self):
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0x01), LoadAddressCounterLo(0x50), WriteData(b'\x01\x02'),
+                                Data(b'\x03')])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x0150, 3), b'\x01\x02\x03')
+
+        self.assertEqual(self.interface.execute([ReadAddressCounterHi(), ReadAddressCounterLo()]), [0x01, 0x53])
+
+    def test_write_data_with_repeat(self):
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0), WriteData((b'\x01\x02', 4))])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0, 9), b'\x01\x02' * 4 + b'\x00')
+
+    def test_write_data_with_step_inhibit(self):
+        # Act
+        self.interface.execute([LoadControlRegister(Control(step_inhibit=True)), LoadAddressCounterHi(0),
+                                LoadAddressCounterLo(0x10), WriteData(b'\x01\x02')])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x10, 2), b'\x02\x00')
+
+        self.assertEqual(self.terminal.address_counter, 0x10)
+
+    def test_read_data(self):
+        # Arrange
+        self.terminal.regen_buffer[0x20:0x22] = b'\x01\x02'
+
+        # Act
+        responses = self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x20), ReadData(), ReadData()])
+
+        # Assert
+        self.assertEqual(responses[2:], [0x01, 0x02])
+
+    def test_read_multiple_stops_at_boundary(self):
+        # Arrange
+        self.terminal.regen_buffer[0x38:0x48] = bytes(range(1, 17))
+
+        # Act
+        data = self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x38), ReadMultiple()])[2]
+
+        # Assert
+        self.assertEqual(data, bytes(range(1, 9)))
+
+        self.assertEqual(self.terminal.address_counter, 0x40)
+
+    def test_clear_with_mask(self):
+        # Arrange
+        self.terminal.regen_buffer[:] = b'\x31\x42' * (len(self.terminal.regen_buffer) // 2)
+
+        # Act
+        self.interface.execute([LoadMask(0xf0), LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), Clear(0x30)])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x4e, 4), b'\x31\x42\x00\x42')
+        self.assertEqual(self.terminal.get_text(0x0ffe, 2), b'\x00\x42')
+
+    def test_clear_without_mask(self):
+        # Arrange
+        self.terminal.regen_buffer[:] = b'\x01' * len(self.terminal.regen_buffer)
+
+        # Act
+        self.interface.execute([LoadMask(0x00), LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), Clear(0x00)])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0, 0x50), b'\x01' * 0x50)
+        self.assertEqual(self.terminal.regen_buffer[0x50:], bytearray(len(self.terminal.regen_buffer) - 0x50))
+
+        self.assertEqual(self.terminal.address_counter, len(self.terminal.regen_buffer))
+
+    def test_clear_is_busy_until_complete(self):
+        # Act
+        statuses = self.interface.execute([LoadMask(0x00), Clear(0x00), ReadStatus(), ReadStatus(), ReadStatus()])[2:]
+
+        # Assert
+        self.assertEqual([(status.busy, status.operation_complete) for status in statuses],
+                         [(True, False), (False, True), (False, False)])
+
+    def test_search_forward(self):
+        # Arrange
+        self.terminal.regen_buffer[0x30] = 0xc1
+
+        # Act
+        status = self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x10), SearchForward(0xc1),
+                                         ReadStatus()])[3]
+
+        # Assert
+        self.assertEqual(self.terminal.address_counter, 0x30)
+
+        self.assertTrue(status.operation_complete)
+
+    def test_search_backward_under_mask(self):
+        # Arrange
+        self.terminal.regen_buffer[0x08] = 0xc1
+
+        # Act
+        self.interface.execute([LoadMask(0xf0), LoadAddressCounterHi(0), LoadAddressCounterLo(0x10), SearchBackward(0xc0)])
+
+        # Assert
+        self.assertEqual(self.terminal.address_counter, 0x08)
+
+    def test_insert_byte(self):
+        # Arrange
+        self.terminal.regen_buffer[0x10:0x14] = b'\x01\x02\x03\x00'
+
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0x11), InsertByte(0x04)])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0x10, 5), b'\x01\x04\x02\x03\x00')
+
+        self.assertEqual(self.terminal.address_counter, 0x12)
+
+    def test_eab_write_alternate(self):
+        # Act
+        self.interface.execute([LoadAddressCounterHi(0), LoadAddressCounterLo(0), EABWriteAlternate(7, b'\x01\x10\x02\x20')])
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(0, 2), b'\x01\x02')
+        self.assertEqual(self.terminal.get_eab_text(0, 2), b'\x10\x20')
+
+    def test_eab_write_under_mask(self):
+        # Arrange
+        self.terminal.eab_buffer[0] = 0x0f
+
+        # Act
+        self.interface.execute([EABLoadMask(7, 0xf0), LoadAddressCounterHi(0), LoadAddressCounterLo(0),
+                                EABWriteUnderMask(7, 0xa5)])
+
+        # Assert
+        self.assertEqual(self.terminal.eab_buffer[0], 0xaf)
+
+        self.assertEqual(self.interface.execute([LoadAddressCounterLo(0), EABReadData(7)])[1], b'\xaf')
+
+    def test_screen_update(self):
+        # Arrange
+        screen = Screen(80, address=80, eab_feature_address=7)
+
+        screen.update(self.interface, bytes(range(80)), bytes(80))
+
+        # Act
+        screen.update(self.interface, bytes(range(1, 81)), bytes([0x10] * 80))
+
+        # Assert
+        self.assertEqual(self.terminal.get_text(80, 80), bytes(range(1, 81)))
+        self.assertEqual(self.terminal.get_eab_text(80, 80), bytes([0x10] * 80))
+
+    def test_reset(self):
+        # Arrange
+        self.interface.execute([LoadControlRegister(Control(step_inhibit=True)), LoadAddressCounterLo(0x10)])
+
+        # Act
+        self.interface.execute(Reset())
+
+        # Assert
+        self.assertEqual(self.terminal.address_counter, 0)
+        self.assertEqual(self.terminal.control, 0)
+
+    def test_unknown_feature_command(self):
+        # Act and assert
+        with self.assertRaises(ReceiveTimeout):
+            self.interface.execute(EABReadData(5))
+
+class SimulatedTerminalPollTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = Mock(return_value=0)
+
+        self.terminal = SimulatedTerminal(clock=self.clock)
+
+        self.interface = SimulatedInterface(self.terminal)
+
+    def test_power_on_reset_complete(self):
+        # Act and assert
+        self.assertIsInstance(self.interface.execute(Poll()), PowerOnResetCompletePollResponse)
+        self.assertIsInstance(self.interface.execute(Poll()), PowerOnResetCompletePollResponse)
+
+        self.interface.execute(PollAck())
+
+        self.assertIsNone(self.interface.execute(Poll()))
+
+    def test_keystrokes(self):
+        # Arrange
+        self.terminal.is_power_on_reset_pending = False
+
+        self.terminal.inject_keystrokes([0x51, 0x52], interval=0.1)
+
+        # Act and assert
+        self.assertEqual(self.interface.execute(Poll()).scan_code, 0x51)
+        self.assertEqual(self.interface.execute(Poll()).scan_code, 0x51)
+
+        self.interface.execute(PollAck())
+
+        self.assertIsNone(self.interface.execute(Poll()))
+
+        self.clock.return_value = 0.1
+
+        poll_response = self.interface.execute(Poll())
+
+        self.assertIsInstance(poll_response, KeystrokePollResponse)
+        self.assertEqual(poll_response.scan_code, 0x52)
+
+    def test_inject_status_scan_code(self):
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'status POLL response'):
+            self.terminal.inject_keystrokes([0x51, 0x02])
+
+        self.assertEqual(len(self.terminal.keystrokes), 0)
+
+    def test_poll_action(self):
+        # Act
+        self.interface.execute([Poll(PollAction.ALARM), Poll(PollAction.ENABLE_KEYBOARD_CLICKER)])
+
+        # Assert
+        self.assertEqual(self.terminal.alarm_count, 1)
+        self.assertTrue(self.terminal.keyboard_clicker)
+
+class SimulatedInterfaceTestCase(unittest.TestCase):
+    def test_3299_ports(self):
+        # Arrange
+        terminals = {0: SimulatedTerminal(power_on_reset=False), 3: SimulatedTerminal(power_on_reset=False)}
+
+        interface = SimulatedInterface(terminals)
+
+        # Act
+        responses = interface.execute([(get_device_address(3), LoadAddressCounterLo(0x10)),
+                                       (get_device_address(3), WriteData(b'\x01')),
+                                       WriteData(b'\x02'),
+                                       (get_device_address(5), Poll())])
+
+        # Assert
+        self.assertEqual(responses[:3], [None, None, None])
+        self.assertIsInstance(responses[3], ReceiveTimeout)
+
+        self.assertEqual(terminals[3].get_text(0x10, 1), b'\x01')
+        self.assertEqual(terminals[0].get_text(0, 1), b'\x02')
+
+    def test_3299_not_supported_for_single_terminal(self):
+        # Arrange
+        interface = SimulatedInterface(SimulatedTerminal())
+
+        # Act and assert
+        with self.assertRaises(NotImplementedError):
+            interface.execute((get_device_address(1), Poll()))
+
+    def test_wire_time(self):
+        # Arrange
+        interface = SimulatedInterface(SimulatedTerminal())
+
+        # Act
+        interface.execute(Poll())
+
+        poll_wire_time = interface.wire_time
+
+        interface.execute(WriteData(bytes(100)))
+
+        # Assert
+        self.assertAlmostEqual(poll_wire_time, (12 + 12 + 12 + 12) / 2_358_700 + 5e-6)
+
+        self.assertGreater(interface.wire_time - poll_wire_time, 100 * 12 / 2_358_700)
+
+if __name__ == '__main__':
+    unittest.main()
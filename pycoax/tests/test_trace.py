@@ -0,0 +1,228 @@
+import os
+import time
+import tempfile
+import unittest
+from serial import Serial
+
+import context
+
+from coax.interface import InterfaceFeature
+from coax.protocol import Poll, PollAck, ReadTerminalId, LoadAddressCounterHi, LoadAddressCounterLo, WriteData, \
+                          ReadData, Slot
+from coax.serial_interface import SerialInterface
+from coax.simulator import SimulatedInterface, SimulatedTerminal
+from coax.tools.firmware_standin import FirmwareStandIn
+from coax.trace import TraceRecorder, ReplaySerial, SENT, RECEIVED, save_trace, load_trace, open_replay_interface
+from coax.exceptions import ReplayError
+
+class TraceRecorderTestCase(unittest.TestCase):
+    def test_capacity(self):
+        # Arrange
+        recorder = TraceRecorder(capacity=2, clock=iter(range(3)).__next__)
+
+        # Act
+        recorder.record(SENT, b'\x01')
+        recorder.record(RECEIVED, b'\x02')
+        recorder.record(SENT, b'\x03')
+
+        # Assert
+        self.assertEqual(list(recorder.records), [(1, RECEIVED, b'\x02'), (2, SENT, b'\x03')])
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            TraceRecorder(capacity=0)
+
+class TraceFileTestCase(unittest.TestCase):
+    def setUp(self):
+        (fd, self.path) = tempfile.mkstemp(suffix='.trace')
+
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_save_and_load(self):
+        # Arrange
+        records = [(100, SENT, bytes.fromhex('00 01 01 00 01')), (200, RECEIVED, bytes.fromhex('00 03 01 32 70 00 01'))]
+
+        # Act
+        save_trace(self.path, records, {'pipeline_depth': 2})
+
+        # Assert
+        self.assertEqual(load_trace(self.path), (records, {'pipeline_depth': 2}))
+
+    def test_load_invalid_file(self):
+        # Arrange
+        with open(self.path, 'wb') as file:
+            file.write(b'not a trace file')
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Invalid trace file'):
+            load_trace(self.path)
+
+    def test_load_truncated_file(self):
+        # Arrange
+        save_trace(self.path, [(100, SENT, bytes.fromhex('00 01 01 00 01'))])
+
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+
+        # Act and assert
+        with self.assertRaisesRegex(ValueError, 'Truncated trace file'):
+            load_trace(self.path)
+
+class ReplaySerialTestCase(unittest.TestCase):
+    def setUp(self):
+        # Poll, with a response, recorded with message identifier 7.
+        self.records = [(0, SENT, bytes.fromhex('00 09 06 00 00 05 00 00 01 00 00 00 07')),
+                        (50_000_000, RECEIVED, bytes.fromhex('00 03 01 00 00 00 07'))]
+
+    def test_responses_are_mapped_to_message_identifiers(self):
+        # Arrange
+        interface = SerialInterface(ReplaySerial(self.records))
+
+        # Act
+        response = interface.execute(Poll())
+
+        # Assert
+        self.assertIsNone(response)
+
+        self.assertTrue(interface.serial.is_exhausted)
+
+    def test_mismatch(self):
+        # Arrange
+        interface = SerialInterface(ReplaySerial(self.records))
+
+        # Act and assert
+        with self.assertRaisesRegex(ReplayError, 'Message does not match trace'):
+            interface.execute(PollAck())
+
+    def test_end_of_trace(self):
+        # Arrange
+        interface = SerialInterface(ReplaySerial(self.records))
+
+        interface.execute(Poll())
+
+        # Act and assert
+        with self.assertRaisesRegex(ReplayError, 'Message sent after end of trace'):
+            interface.execute(Poll())
+
+    def test_leading_responses_are_skipped(self):
+        # Arrange
+        interface = SerialInterface(ReplaySerial([(0, RECEIVED, bytes.fromhex('00 03 01 00 00 00 06'))] + self.records))
+
+        # Act and assert
+        self.assertIsNone(interface.execute(Poll()))
+
+    def test_realtime(self):
+        # Arrange
+        interface = SerialInterface(ReplaySerial(self.records, realtime=True))
+
+        # Act
+        start = time.perf_counter()
+
+        interface.execute(Poll())
+
+        # Assert
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+class RecordReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.terminal = SimulatedTerminal(power_on_reset=False)
+
+        self.stand_in = FirmwareStandIn(SimulatedInterface(self.terminal))
+
+        self.stand_in.start()
+
+        self.serial = Serial(self.stand_in.port, 115200, timeout=1)
+
+        self.recorder = TraceRecorder()
+
+        self.interface = SerialInterface(self.serial, pipeline_depth=2, trace_recorder=self.recorder)
+
+        (fd, self.path) = tempfile.mkstemp(suffix='.trace')
+
+        os.close(fd)
+
+    def tearDown(self):
+        self.serial.close()
+
+        self.stand_in.close()
+
+        os.remove(self.path)
+
+    def test_replay(self):
+        # Arrange
+        self.interface.reset()
+
+        self.terminal.regen_buffer[0x50] = 0x01
+
+        recorded_responses = self._execute(self.interface)
+
+        self.recorder.save(self.path, self.interface)
+
+        # Act
+        interface = open_replay_interface(self.path)
+
+        interface.reset()
+
+        responses = self._execute(interface)
+
+        # Assert
+        self.assertEqual(interface.pipeline_depth, 2)
+
+        self.assertEqual([type(response) for response in responses], [type(response) for response in recorded_responses])
+        self.assertEqual(responses[1:5], recorded_responses[1:5])
+
+        self.assertTrue(interface.serial.is_exhausted)
+
+    def test_replay_without_reset(self):
+        # Arrange
+        self.interface.reset()
+
+        self.recorder.clear()
+
+        recorded_responses = self._execute(self.interface)
+
+        self.recorder.save(self.path, self.interface)
+
+        # Act
+        interface = open_replay_interface(self.path)
+
+        responses = self._execute(interface)
+
+        # Assert
+        self.assertEqual(interface.hardware_type, 'interface2')
+        self.assertEqual(interface.message_buffer_size, 14818)
+        self.assertEqual(interface.features, {InterfaceFeature.PROTOCOL_3299})
+
+        self.assertEqual(responses[1:5], recorded_responses[1:5])
+
+    def test_replay_program(self):
+        # Arrange
+        self.interface.reset()
+
+        self.recorder.clear()
+
+        program = self.interface.compile([LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), WriteData([Slot('a')])])
+
+        self.interface.execute_program(program, {'a': 0x02})
+
+        self.recorder.save(self.path, self.interface)
+
+        # Act and assert
+        interface = open_replay_interface(self.path)
+
+        interface.execute_program(interface.compile(program.commands), {'a': 0x02})
+
+        interface = open_replay_interface(self.path)
+
+        with self.assertRaisesRegex(ReplayError, 'does not match'):
+            interface.execute_program(interface.compile(program.commands), {'a': 0x03})
+
+    def _execute(self, interface):
+        return interface.execute([ReadTerminalId(), LoadAddressCounterHi(0), LoadAddressCounterLo(0x50), ReadData(),
+                                  WriteData(b'\x02'), (None, Poll())])
+
+if __name__ == '__main__':
+    unittest.main()